@@ -1,17 +1,22 @@
+import csv
 import datetime as dt
+import itertools
+import json
 import os
 import sys
 import typing
+from functools import partial
 from xml.etree.ElementTree import ParseError
 
 import click
 
-from attendance_analyzer.reader import XMLPeopleReader
-
-from . import reader
-from .helpers import PersonWithTime, parse_datetime
-from .logic import GroupingService, PeopleRepository
-from .writer import CSVWriter
+# only modules needed for options are imported here, the rest are imported inside of main: the pipeline once
+# options are validated and optional code paths (parallel, incremental, streaming, numpy, cProfile) once they're
+# chosen, so that --help and short runs don't pay for loading them
+from . import reader, source
+from .helpers import PersonWithTime, parse_datetime, parse_duration
+from .rollup import DEPARTMENT, ROLLUPS, Rollups, read_departments
+from .writer import FORMATS, PYARROW_FORMATS, is_pyarrow_available
 
 
 @click.command(help="Command analyzes attendance of employees basing on xml-file.")
@@ -37,12 +42,184 @@ from .writer import CSVWriter
 @click.option(
     "--regex", "datetime_regex", default="%d-%m-%Y %H:%M:%S", help="Regular expression to use for parsing datetime."
 )
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes parsing parts of the file in parallel.",
+)
+@click.option(
+    "--memory-limit",
+    type=click.IntRange(min=1),
+    help="Memory budget in megabytes for grouped durations, the rest is spilled into temporary files.",
+)
+@click.option(
+    "--cache",
+    "use_cache",
+    is_flag=True,
+    default=False,
+    help="Flag for keeping parsed records next to the input file and reusing them while it is unchanged.",
+)
+@click.option(
+    "--backend",
+    type=click.Choice(["python", "numpy"]),
+    default="python",
+    help="Backend for grouping, numpy one works over arrays and requires numpy to be installed.",
+)
+@click.option(
+    "--split-days",
+    "split_by_day",
+    is_flag=True,
+    default=False,
+    help="Flag for splitting durations crossing midnight between all days they touch.",
+)
+@click.option(
+    "--merge-overlaps",
+    "merge_overlaps",
+    is_flag=True,
+    default=False,
+    help="Flag for merging overlapping records of the same employee, so that duplicates are counted once.",
+)
+@click.option(
+    "--presorted",
+    is_flag=True,
+    default=False,
+    help="Flag telling that records come grouped by employees and sorted by start, so they are merged on the fly.",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Flag for keeping groupings next to the input file and parsing only records appended since the last run.",
+)
+@click.option(
+    "--parser",
+    type=click.Choice(list(reader.PARSERS)),
+    default="etree",
+    help="Backend for reading xml: etree, expat, lxml (requires lxml to be installed) "
+    "or scanner matching records of the plain layout as bytes.",
+)
+@click.option(
+    "--read-buffer",
+    type=click.IntRange(min=1),
+    help="Size in kilobytes of chunks the input file is read and decompressed by.",
+)
+@click.option(
+    "--mmap",
+    "use_mmap",
+    is_flag=True,
+    default=False,
+    help="Flag for feeding the parser with views of the memory-mapped input file instead of reading it.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(list(FORMATS)),
+    default="csv",
+    help="Format of the output: csv, ndjson, packed columnar binary or arrow and parquet "
+    "(both require pyarrow to be installed).",
+)
+@click.option(
+    "--rollup",
+    "rollups",
+    type=click.Choice(list(ROLLUPS)),
+    multiple=True,
+    help="Rollup by day, ISO week, month, employee or department written as a csv section, "
+    "all of them are summed in one pass. Option may be used multiple times.",
+)
+@click.option(
+    "--departments",
+    "departments_file",
+    type=click.File("r"),
+    help="Csv file with rows 'full_name,department' for the rollup by department.",
+)
+@click.option("--top", type=click.IntRange(min=1), help="Write only the given number of the longest rows.")
+@click.option("--bottom", type=click.IntRange(min=1), help="Write only the given number of the shortest rows.")
+@click.option(
+    "--min-duration",
+    type=parse_duration,
+    help="Write only rows with at least the given duration like 40h, 90m, 3600s or 40:00:00.",
+)
+@click.option(
+    "--max-duration",
+    type=parse_duration,
+    help="Write only rows with at most the given duration like 40h, 90m, 3600s or 40:00:00.",
+)
+@click.option(
+    "--distribution",
+    is_flag=True,
+    default=False,
+    help="Flag for writing number, min, max, mean and percentiles of durations of sessions and of their starts "
+    "instead of summed durations, they're estimated by histograms of bounded size.",
+)
+@click.option(
+    "--pipeline",
+    is_flag=True,
+    default=False,
+    help="Flag for reading, parsing, grouping and writing in threads connected by bounded queues of batches.",
+)
+@click.option(
+    "--on-error",
+    type=click.Choice(["strict", "skip", "quarantine"]),
+    default="strict",
+    help="Whether a broken record stops the run (strict), is skipped or is skipped and written with its byte offset "
+    "and reason into the quarantine file, numbers of skipped records are written to stderr.",
+)
+@click.option(
+    "--quarantine",
+    "quarantine_path",
+    type=click.Path(dir_okay=False),
+    help="Csv file for records skipped with --on-error quarantine, by default <input>.attendance-quarantine.csv.",
+)
+@click.option(
+    "--stats",
+    "show_stats",
+    is_flag=True,
+    default=False,
+    help="Flag for writing time, records per second and peak memory of every stage to stderr.",
+)
+@click.option(
+    "--stats-file",
+    type=click.File("w"),
+    help="File for the same stats as json for monitoring, they're collected even without --stats.",
+)
+@click.option(
+    "--profile",
+    "profile_path",
+    type=click.Path(dir_okay=False),
+    help="File for cProfile stats of the run, readable by python -m pstats.",
+)
 def main(
     filename: str,
     group: bool,
     datetime_regex: str,
     output: typing.TextIO,
     people_to_filter: tuple,
+    workers: int = 1,
+    memory_limit: typing.Optional[int] = None,
+    use_cache: bool = False,
+    backend: str = "python",
+    split_by_day: bool = False,
+    merge_overlaps: bool = False,
+    presorted: bool = False,
+    incremental: bool = False,
+    parser: str = "etree",
+    read_buffer: typing.Optional[int] = None,
+    use_mmap: bool = False,
+    output_format: str = "csv",
+    rollups: typing.Tuple[str, ...] = (),
+    departments_file: typing.Optional[typing.TextIO] = None,
+    top: typing.Optional[int] = None,
+    bottom: typing.Optional[int] = None,
+    min_duration: typing.Optional[int] = None,
+    max_duration: typing.Optional[int] = None,
+    distribution: bool = False,
+    pipeline: bool = False,
+    on_error: str = "strict",
+    quarantine_path: typing.Optional[str] = None,
+    show_stats: bool = False,
+    stats_file: typing.Optional[typing.TextIO] = None,
+    profile_path: typing.Optional[str] = None,
     start_date: typing.Optional[str] = None,
     end_date: typing.Optional[str] = None,
 ):
@@ -54,36 +231,278 @@ def main(
         end_dt = dt.datetime.combine(parse_datetime(end_date, "%d-%m-%Y"), dt.time.max) if end_date else None
     except ValueError:
         raise click.BadOptionUsage("end_date", "Provided end date does not match '%d-%m-%Y'.")
+    if backend == "numpy":
+        from . import vectorized
+
+        if not vectorized.is_available():
+            raise click.BadOptionUsage("backend", "Backend numpy requires numpy to be installed.")
+    if merge_overlaps and workers > 1:
+        raise click.BadOptionUsage("merge_overlaps", "Overlapping records cannot be merged across workers.")
+    if incremental and (workers > 1 or memory_limit is not None or use_cache or merge_overlaps):
+        raise click.BadOptionUsage(
+            "incremental",
+            "Option --incremental can't be used with --workers, --memory-limit, --cache or --merge-overlaps.",
+        )
+    if parser == "lxml" and not reader.is_lxml_available():
+        raise click.BadOptionUsage("parser", "Parser lxml requires lxml to be installed.")
+    reader_class = reader.PARSERS[parser]
+    if output_format in PYARROW_FORMATS and not is_pyarrow_available():
+        raise click.BadOptionUsage("output_format", f"Format {output_format} requires pyarrow to be installed.")
+    writer_class = FORMATS[output_format]
+    if rollups and (group or output_format != "csv"):
+        raise click.BadOptionUsage("rollups", "Option --rollup can't be used with --group-employees or --format.")
+    if (DEPARTMENT in rollups) != (departments_file is not None):
+        raise click.BadOptionUsage("departments_file", "Options --rollup department and --departments go together.")
+    if distribution and (rollups or output_format != "csv" or memory_limit is not None or incremental):
+        raise click.BadOptionUsage(
+            "distribution",
+            "Option --distribution can't be used with --rollup, --format, --memory-limit or --incremental.",
+        )
+    selecting = top is not None or bottom is not None or min_duration is not None or max_duration is not None
+    if top is not None and bottom is not None:
+        raise click.BadOptionUsage("top", "Options --top and --bottom can't be used together.")
+    if selecting and distribution:
+        raise click.BadOptionUsage(
+            "distribution",
+            "Option --distribution can't be used with --top, --bottom, --min-duration or --max-duration.",
+        )
+    if distribution and backend == "numpy":
+        raise click.BadOptionUsage("distribution", "Option --distribution can't be used with backend numpy.")
+    if pipeline and (workers > 1 or incremental or use_cache):
+        raise click.BadOptionUsage(
+            "pipeline", "Option --pipeline can't be used with --workers, --incremental or --cache."
+        )
+    if on_error != "strict" and (workers > 1 or incremental or use_cache):
+        raise click.BadOptionUsage(
+            "on_error", "Option --on-error can't be used with --workers, --incremental or --cache."
+        )
+    if quarantine_path is not None and on_error != "quarantine":
+        raise click.BadOptionUsage("quarantine_path", "Option --quarantine requires --on-error quarantine.")
+    if on_error != "strict" and not reader_class.tolerates_record_errors:
+        reader_class = reader.ExpatPeopleReader  # it reads the same records as etree and lxml and knows offsets
+    compression = source.detect_compression(filename) if filename else None
+    if compression and (workers > 1 or incremental):
+        raise click.BadOptionUsage("filename", "Compressed input can't be used with --workers or --incremental.")
+    if compression == source.ZSTD and not source.is_zstd_available():
+        raise click.BadOptionUsage("filename", "Input compressed with zstd requires zstandard to be installed.")
+    from . import stats
+    from .cache import AttendanceCache
+    from .logic import (
+        GroupingService,
+        PeopleRepository,
+        UnsortedPeopleException,
+        merge_overlapping_people,
+        select_durations,
+    )
+
+    # rows of the grouping are selected with heaps of --top or --bottom size instead of sorting all of them
+    select = partial(select_durations, top=top, bottom=bottom, min_duration=min_duration, max_duration=max_duration)
+
+    rollup_sums = None
+    if rollups:
+        try:
+            rollup_sums = Rollups(rollups, read_departments(departments_file) if departments_file else None)
+        except ValueError as e:
+            raise click.BadOptionUsage("departments_file", str(e))
+        group = True  # rollups are summed from the finest grouping by employee and day
+
+    input_file: reader.Source = filename
+    if read_buffer is not None or use_mmap:
+        input_file = source.InputFile(
+            filename, read_buffer * 1024 if read_buffer else source.DEFAULT_READ_BUFFER, use_mmap
+        )
+    if pipeline:
+        from .pipeline import PrefetchedSource, ThreadedOutput, iter_in_thread
 
-    repository = PeopleRepository(reader_obj=XMLPeopleReader(filename, datetime_regex))
-    filtered_people_with_full_name_and_time: typing.Iterable[PersonWithTime] = repository.get_filtered_people(
-        people_to_filter, start_dt, end_dt
+        input_file = PrefetchedSource(input_file)  # the input is read and decompressed by a thread of its own
+    grouping_service_factory = partial(
+        vectorized.ArrayGroupingService if backend == "numpy" else GroupingService, split_by_day=split_by_day
     )
+    if distribution:
+        from .distribution import DistributionGroupingService, write_out_distributions
+
+        grouping_service_factory = partial(DistributionGroupingService, split_by_day=split_by_day)
+
+    record_errors, quarantine_file = None, None
+    if on_error == "quarantine":
+        try:
+            quarantine_file = open(quarantine_path or f"{filename}.attendance-quarantine.csv", "w", newline="")
+        except OSError as e:
+            raise click.BadOptionUsage("quarantine_path", f"Quarantine can't be written: {e.strerror}: {e.filename}")
+    pipeline_stats, profiler, threaded_output = None, None, None
     try:
-        grouping_service = GroupingService(filtered_people_with_full_name_and_time)
-        csv_writer = CSVWriter(output)
-        if group:
-            person_date_to_duration_mapping: dict[
-                typing.Tuple[dt.date, str], int
-            ] = grouping_service.group_people_with_time_by_person_and_day()
-
-            csv_writer.write_out_person_and_date_to_duration_in_seconds_mapping(person_date_to_duration_mapping)
+        if quarantine_file is not None:
+            quarantine_writer = csv.writer(quarantine_file)
+            quarantine_writer.writerow(("offset", "full_name", "reason"))
+            record_errors = reader.RecordErrors(
+                lambda record_error: quarantine_writer.writerow(
+                    (record_error.offset, record_error.full_name or "", reader.describe_error(record_error.error))
+                )
+            )
+        elif on_error == "skip":
+            record_errors = reader.RecordErrors()
+
+        pipeline_stats = stats.PipelineStats(os.path.getsize(filename)) if show_stats or stats_file else None
+        if pipeline_stats is not None:
+            reader_obj = pipeline_stats.counting_reader(
+                reader_class(input_file, datetime_regex, pipeline_stats.datetime_parser_factory, record_errors)
+            )
+        elif record_errors is not None:
+            reader_obj = reader_class(input_file, datetime_regex, record_errors=record_errors)
         else:
-            date_to_duration_mapping: typing.DefaultDict[
-                dt.date, int
-            ] = grouping_service.group_people_with_time_by_day()
-
-            csv_writer.write_out_date_to_duration_in_seconds_mapping(date_to_duration_mapping)
-    except reader.UnknownPersonFullNameException:
-        raise click.ClickException("Attribute full_name is not found in tag person.")
-    except reader.UnrecognizableDateTimeException as e:
-        raise click.ClickException(f"'{e.text}' does not match datetime pattern '{e.pattern}'.")
-    except reader.WrongStructureOfFileException:
-        raise click.ClickException("Wrong structure of the given file.")
-    except reader.WrongTimeException as e:
-        raise click.ClickException(e.text)
+            reader_obj = reader_class(input_file, datetime_regex)
+        repository = PeopleRepository(
+            reader_obj=reader_obj, cache=AttendanceCache(filename, datetime_regex) if use_cache else None
+        )
+        filtered_people_with_full_name_and_time: typing.Iterable[PersonWithTime] = repository.get_filtered_people(
+            people_to_filter, start_dt, end_dt
+        )
+        if pipeline_stats is not None:
+            filtered_people_with_full_name_and_time = pipeline_stats.count(
+                stats.FILTER, filtered_people_with_full_name_and_time, upstream=stats.READ
+            )
+        if merge_overlaps:
+            filtered_people_with_full_name_and_time = merge_overlapping_people(
+                filtered_people_with_full_name_and_time, presorted
+            )
+            if pipeline_stats is not None:
+                filtered_people_with_full_name_and_time = pipeline_stats.count(
+                    stats.MERGE, filtered_people_with_full_name_and_time, upstream=stats.FILTER
+                )
+        grouping_upstream = stats.MERGE if merge_overlaps else stats.FILTER
+        if pipeline:  # records are parsed, filtered and merged by a thread ahead of grouping
+            filtered_people_with_full_name_and_time = iter_in_thread(filtered_people_with_full_name_and_time)
+
+        if profile_path is not None:
+            import cProfile
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+        grouping_service = grouping_service_factory(filtered_people_with_full_name_and_time)
+        writer_output = output.buffer if writer_class.binary else output
+        if pipeline and output_format not in PYARROW_FORMATS:  # pyarrow writes into files by itself
+            writer_output = threaded_output = ThreadedOutput(writer_output)
+        writer = writer_class(writer_output)
+        if memory_limit is not None:
+            from .streaming import SpillingAggregator
+
+            if workers > 1:
+                from . import parallel
+
+                durations = itertools.chain.from_iterable(
+                    grouping.items()
+                    for grouping in parallel.iter_groupings_of_shards(
+                        filename,
+                        datetime_regex,
+                        workers,
+                        group,
+                        people_to_filter,
+                        start_dt,
+                        end_dt,
+                        grouping_service_factory=grouping_service_factory,
+                        reader_class=reader_class,
+                    )
+                )
+            elif group:
+                durations = grouping_service.iter_durations_by_person_and_day()
+            else:
+                durations = grouping_service.iter_durations_by_day()
+
+            with SpillingAggregator(memory_limit * 1024 * 1024) as aggregator:
+                with stats.timed(pipeline_stats, stats.GROUP, grouping_upstream):
+                    aggregator.update(durations)
+                with stats.timed(pipeline_stats, stats.WRITE):
+                    rows = aggregator.items()
+                    if rollup_sums is not None:
+                        rollup_sums.update(rows)
+                        rollup_sums.write_out(writer_output, select if selecting else None)
+                    elif group:
+                        writer.write_out_sorted_person_and_date_durations_in_seconds(
+                            select(rows, presorted=True) if selecting else rows
+                        )
+                    else:
+                        writer.write_out_sorted_date_durations_in_seconds(
+                            select(rows, presorted=True) if selecting else rows
+                        )
+                    if threaded_output is not None:
+                        threaded_output.close()
+            return
+
+        grouping: typing.Union[typing.Dict[typing.Tuple[dt.date, str], int], typing.Dict[dt.date, int]]
+        with stats.timed(pipeline_stats, stats.GROUP, grouping_upstream):
+            if incremental:
+                from .incremental import IncrementalGrouping
+
+                grouping = IncrementalGrouping(
+                    filename,
+                    datetime_regex,
+                    group,
+                    people_to_filter,
+                    start_dt,
+                    end_dt,
+                    split_by_day=split_by_day,
+                    grouping_service_factory=grouping_service_factory,
+                    reader_class=reader_class,
+                ).group()
+            elif workers > 1:
+                from . import parallel
+
+                grouping = parallel.group_people_in_parallel(
+                    filename,
+                    datetime_regex,
+                    workers,
+                    group,
+                    people_to_filter,
+                    start_dt,
+                    end_dt,
+                    grouping_service_factory=grouping_service_factory,
+                    reader_class=reader_class,
+                )
+            elif group:
+                grouping = grouping_service.group_people_with_time_by_person_and_day()
+            else:
+                grouping = grouping_service.group_people_with_time_by_day()
+
+        with stats.timed(pipeline_stats, stats.WRITE, records=len(grouping)):
+            if rollup_sums is not None:
+                rollup_sums.update(grouping.items())
+                rollup_sums.write_out(writer_output, select if selecting else None)
+            elif distribution:
+                write_out_distributions(writer_output, grouping, group)
+            elif selecting and group:
+                writer.write_out_sorted_person_and_date_durations_in_seconds(select(grouping.items()))
+            elif selecting:
+                writer.write_out_sorted_date_durations_in_seconds(select(grouping.items()))
+            elif group:
+                writer.write_out_person_and_date_to_duration_in_seconds_mapping(grouping)
+            else:
+                writer.write_out_date_to_duration_in_seconds_mapping(grouping)
+            if threaded_output is not None:
+                threaded_output.close()
+    except reader.RECORD_EXCEPTIONS as e:
+        raise click.ClickException(reader.describe_error(e))
+    except UnsortedPeopleException:
+        raise click.ClickException("Records are not grouped by employees and sorted by start.")
     except (ParseError, Exception):
         raise click.BadArgumentUsage(f"Impossible to parse {filename}.")
+    finally:
+        if threaded_output is not None:  # the thread is stopped after errors, it's finished already otherwise
+            threaded_output.cancel()
+        if quarantine_file is not None:
+            quarantine_file.close()
+        if record_errors:
+            counts = ", ".join(f"{name}: {count}" for name, count in sorted(record_errors.counts.items()))
+            quarantined = f", they're written to {quarantine_file.name}" if quarantine_file is not None else ""
+            click.echo(f"Skipped {len(record_errors)} broken records ({counts}){quarantined}.", err=True)
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+        if pipeline_stats is not None:
+            report = pipeline_stats.report()
+            if show_stats:
+                click.echo(pipeline_stats.format(report), err=True)
+            if stats_file is not None:
+                json.dump(report, stats_file, indent=2)
 
 
 if __name__ == "__main__":
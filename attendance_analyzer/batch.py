@@ -0,0 +1,276 @@
+import csv
+import datetime as dt
+import glob
+import os
+import sys
+import time
+import typing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from xml.etree.ElementTree import ParseError
+
+import click
+
+from . import reader, vectorized
+from .helpers import PersonWithTime, parse_datetime
+from .logic import GroupingService, GroupingServiceFactory, PeopleRepository, merge_groupings
+from .writer import FastCSVWriter
+
+__all__ = ("BatchJob", "BatchResult", "jobs_from_patterns", "jobs_from_manifest", "run_batch", "main")
+
+FilePath = str
+
+
+class BatchJob(typing.NamedTuple):
+    input: FilePath
+    output: FilePath
+
+
+class BatchResult(typing.NamedTuple):
+    job: BatchJob
+    records: int
+    size: int  # bytes of the input file
+    seconds: float
+    grouping: typing.Optional[dict]  # kept only for the combined output
+    error: typing.Optional[str]
+
+
+def jobs_from_patterns(patterns: typing.Iterable[str], output_dir: FilePath) -> typing.List[BatchJob]:
+    """Jobs for files matching glob patterns, outputs are <output_dir>/<input name without extensions>.csv"""
+    inputs = sorted({path for pattern in patterns for path in glob.glob(pattern, recursive=True)})
+    jobs = [BatchJob(path, os.path.join(output_dir, os.path.basename(path).split(".")[0] + ".csv")) for path in inputs]
+    outputs = [job.output for job in jobs]
+    duplicated = sorted({output for output in outputs if outputs.count(output) > 1})
+    if duplicated:
+        raise ValueError(f"Several inputs are written to {', '.join(duplicated)}.")
+    return jobs
+
+
+def jobs_from_manifest(manifest: typing.TextIO) -> typing.List[BatchJob]:
+    """Jobs from csv rows of input and output paths, blank lines are skipped"""
+    jobs = []
+    for row in csv.reader(manifest):
+        if not row:
+            continue
+        if len(row) != 2:
+            raise ValueError(f"Row {row} of the manifest has to contain input and output paths.")
+        jobs.append(BatchJob(*row))
+    return jobs
+
+
+def _describe_error(error: Exception, filename: FilePath) -> str:
+    """The same messages as the command of a single file shows"""
+    if isinstance(error, reader.RECORD_EXCEPTIONS):
+        return reader.describe_error(error)
+    elif isinstance(error, OSError):
+        return f"{error.strerror}: {error.filename}"
+    return f"Impossible to parse {filename}."
+
+
+def _process_job(
+    job: BatchJob,
+    datetime_regex: str,
+    group: bool,
+    people_to_filter: typing.Optional[typing.Tuple[str]],
+    start_dt: typing.Optional[dt.datetime],
+    end_dt: typing.Optional[dt.datetime],
+    grouping_service_factory: GroupingServiceFactory,
+    reader_class: typing.Type[reader.PeopleReader],
+    keep_grouping: bool,
+) -> BatchResult:
+    started = time.perf_counter()
+    size = os.path.getsize(job.input) if os.path.isfile(job.input) else 0
+    records = 0
+
+    def count(people: typing.Iterable[PersonWithTime]) -> typing.Iterator[PersonWithTime]:
+        nonlocal records
+        for person in people:
+            records += 1
+            yield person
+
+    try:
+        repository = PeopleRepository(reader_obj=reader_class(job.input, datetime_regex))
+        grouping_service = grouping_service_factory(
+            count(repository.get_filtered_people(people_to_filter, start_dt, end_dt))
+        )
+        if group:
+            grouping = grouping_service.group_people_with_time_by_person_and_day()
+        else:
+            grouping = grouping_service.group_people_with_time_by_day()
+        with open(job.output, "w") as output:
+            if group:
+                FastCSVWriter(output).write_out_person_and_date_to_duration_in_seconds_mapping(grouping)
+            else:
+                FastCSVWriter(output).write_out_date_to_duration_in_seconds_mapping(grouping)
+    except (ParseError, Exception) as error:
+        return BatchResult(job, records, size, time.perf_counter() - started, None, _describe_error(error, job.input))
+    return BatchResult(
+        job, records, size, time.perf_counter() - started, dict(grouping) if keep_grouping else None, None
+    )
+
+
+def run_batch(
+    jobs: typing.Sequence[BatchJob],
+    datetime_regex: str,
+    workers: int,
+    group: bool,
+    people_to_filter: typing.Optional[typing.Tuple[str]] = None,
+    start_dt: typing.Optional[dt.datetime] = None,
+    end_dt: typing.Optional[dt.datetime] = None,
+    grouping_service_factory: GroupingServiceFactory = GroupingService,
+    reader_class: typing.Type[reader.PeopleReader] = reader.XMLPeopleReader,
+    keep_groupings: bool = False,
+) -> typing.Iterator[BatchResult]:
+    """
+    Groups every input like the command for a single file does and writes it to its output,
+    jobs are shared by one pool of processes. Results are yielded in the order of jobs.
+    """
+    process_job = partial(
+        _process_job,
+        datetime_regex=datetime_regex,
+        group=group,
+        people_to_filter=people_to_filter,
+        start_dt=start_dt,
+        end_dt=end_dt,
+        grouping_service_factory=grouping_service_factory,
+        reader_class=reader_class,
+        keep_grouping=keep_groupings,
+    )
+    if workers == 1:
+        yield from map(process_job, jobs)
+        return
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for future in [executor.submit(process_job, job) for job in jobs]:
+            yield future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _format_result(result: BatchResult) -> str:
+    megabytes = result.size / 1024 / 1024
+    throughput = f"{megabytes / result.seconds:.1f} MB/s" if result.seconds else "-"
+    summary = (
+        f"{result.job.input}: {result.records} records, {megabytes:.1f} MB in {result.seconds:.2f} s ({throughput})"
+    )
+    return f"{summary}, failed: {result.error}" if result.error else summary
+
+
+@click.command(help="Command analyzes attendance of employees in many xml-files sharing a pool of processes.")
+@click.option(
+    "--input", "-in", "patterns", multiple=True, help="Glob pattern of input files. Option may be used multiple times."
+)
+@click.option(
+    "--output-dir",
+    type=click.Path(file_okay=False),
+    default=".",
+    help="Directory for outputs of files matching --input, they're named after inputs with csv extension.",
+)
+@click.option("--manifest", type=click.File("r"), help="CSV file with rows of input and output paths.")
+@click.option("--combined", type=click.File("w"), help="File for durations of all inputs grouped together.")
+@click.option("--group-employees", "group", is_flag=True, help="Flag for grouping by employees.", default=False)
+@click.option(
+    "--filter-person",
+    "people_to_filter",
+    help="Filter records against given full_name. Option may be used multiple times.",
+    multiple=True,
+)
+@click.option("--start-date", "start_date", help="Filter records against given starting date matching '%d-%m-%Y'.")
+@click.option("--end-date", "end_date", help="Filter records against given ending date matching '%d-%m-%Y'.")
+@click.option(
+    "--regex", "datetime_regex", default="%d-%m-%Y %H:%M:%S", help="Regular expression to use for parsing datetime."
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=os.cpu_count() or 1,
+    help="Number of processes analyzing files in parallel, by default the number of CPUs.",
+)
+@click.option(
+    "--backend",
+    type=click.Choice(["python", "numpy"]),
+    default="python",
+    help="Backend for grouping, numpy one works over arrays and requires numpy to be installed.",
+)
+@click.option(
+    "--split-days",
+    "split_by_day",
+    is_flag=True,
+    default=False,
+    help="Flag for splitting durations crossing midnight between all days they touch.",
+)
+@click.option("--parser", type=click.Choice(list(reader.PARSERS)), default="etree", help="Backend for reading xml.")
+def main(
+    patterns: typing.Tuple[str],
+    output_dir: FilePath,
+    manifest: typing.Optional[typing.TextIO],
+    combined: typing.Optional[typing.TextIO],
+    group: bool,
+    people_to_filter: tuple,
+    datetime_regex: str,
+    workers: int,
+    backend: str = "python",
+    split_by_day: bool = False,
+    parser: str = "etree",
+    start_date: typing.Optional[str] = None,
+    end_date: typing.Optional[str] = None,
+):
+    try:
+        start_dt = parse_datetime(start_date, "%d-%m-%Y") if start_date else None
+    except ValueError:
+        raise click.BadOptionUsage("start_date", "Provided start date does not match '%d-%m-%Y'.")
+    try:
+        end_dt = dt.datetime.combine(parse_datetime(end_date, "%d-%m-%Y"), dt.time.max) if end_date else None
+    except ValueError:
+        raise click.BadOptionUsage("end_date", "Provided end date does not match '%d-%m-%Y'.")
+    if backend == "numpy" and not vectorized.is_available():
+        raise click.BadOptionUsage("backend", "Backend numpy requires numpy to be installed.")
+    if parser == "lxml" and not reader.is_lxml_available():
+        raise click.BadOptionUsage("parser", "Parser lxml requires lxml to be installed.")
+
+    try:
+        jobs = jobs_from_patterns(patterns, output_dir) if patterns else []
+        jobs += jobs_from_manifest(manifest) if manifest else []
+    except ValueError as error:
+        raise click.BadOptionUsage("patterns", str(error))
+    if not jobs:
+        raise click.BadOptionUsage("patterns", "No input files are given by --input or --manifest.")
+    os.makedirs(output_dir, exist_ok=True)
+
+    grouping_service_factory = partial(
+        vectorized.ArrayGroupingService if backend == "numpy" else GroupingService, split_by_day=split_by_day
+    )
+    started = time.perf_counter()
+    results = []
+    for result in run_batch(
+        jobs,
+        datetime_regex,
+        min(workers, len(jobs)),
+        group,
+        people_to_filter,
+        start_dt,
+        end_dt,
+        grouping_service_factory=grouping_service_factory,
+        reader_class=reader.PARSERS[parser],
+        keep_groupings=combined is not None,
+    ):
+        click.echo(_format_result(result), err=True)
+        results.append(result)
+    seconds = time.perf_counter() - started
+
+    records, size = sum(result.records for result in results), sum(result.size for result in results)
+    click.echo(_format_result(BatchResult(BatchJob("total", ""), records, size, seconds, None, None)), err=True)
+
+    failed = [result for result in results if result.error]
+    if combined is not None and not failed:
+        grouping = merge_groupings(result.grouping for result in results)
+        if group:
+            FastCSVWriter(combined).write_out_person_and_date_to_duration_in_seconds_mapping(grouping)
+        else:
+            FastCSVWriter(combined).write_out_date_to_duration_in_seconds_mapping(grouping)
+    if failed:
+        raise click.ClickException(f"{len(failed)} of {len(results)} files failed.")
+
+
+if __name__ == "__main__":
+    sys.exit(main(prog_name="attendance_analyzer.batch"))
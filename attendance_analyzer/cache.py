@@ -0,0 +1,151 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import typing
+from array import array
+
+from .helpers import PersonWithTime, from_epoch_seconds, to_epoch_seconds
+
+__all__ = ("CACHE_SUFFIX", "CachedPeople", "AttendanceCache")
+
+CACHE_SUFFIX = ".attendance-cache"
+MAGIC = b"ATTCACHE"
+VERSION = 1
+HEADER_SIZE = struct.Struct("<Q")  # length of json header following the magic
+ALIGNMENT = 8
+SECONDS_TYPECODE, NAME_ID_TYPECODE = "q", "i"
+
+FilePath = str
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class CachedPeople:
+    """
+    Records of the cache file: names interned into ids, start and end as seconds since epoch.
+    Columns are memoryviews over the mapped file, so nothing is copied until records are iterated.
+    """
+
+    def __init__(
+        self,
+        names: typing.Sequence[str],
+        name_ids: typing.Sequence[int],
+        starts: typing.Sequence[int],
+        ends: typing.Sequence[int],
+    ):
+        self.names = names
+        self.name_ids = name_ids
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self) -> int:
+        return len(self.name_ids)
+
+    def __iter__(self) -> typing.Iterator[PersonWithTime]:
+        names = self.names
+        for name_id, start, end in zip(self.name_ids, self.starts, self.ends):
+            yield PersonWithTime(names[name_id], from_epoch_seconds(start), from_epoch_seconds(end))
+
+
+class AttendanceCache:
+    """
+    Sidecar file with records parsed from the source file (by default it's placed next to the source).
+    Cache is keyed by absolute path, size and mtime of the source and datetime_regex used for parsing,
+    so it's stale as soon as any of them changes.
+    """
+
+    def __init__(self, source: FilePath, datetime_regex: str, path: typing.Optional[FilePath] = None):
+        self._source = source
+        self._datetime_regex = datetime_regex
+        self._path = path if path is not None else source + CACHE_SUFFIX
+
+    def _key(self) -> dict:
+        stat = os.stat(self._source)
+        return {
+            "version": VERSION,
+            "byteorder": sys.byteorder,
+            "source": os.path.abspath(self._source),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "datetime_regex": self._datetime_regex,
+        }
+
+    def load(self) -> typing.Optional[CachedPeople]:
+        """:returns None when there is no cache for the current state of the source"""
+        try:
+            with open(self._path, "rb") as file:
+                mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # no file or empty one
+            return None
+        try:
+            if mapping[: len(MAGIC)] != MAGIC:
+                raise ValueError("Not a cache file.")
+            (header_size,) = HEADER_SIZE.unpack_from(mapping, len(MAGIC))
+            offset = len(MAGIC) + HEADER_SIZE.size
+            header = json.loads(mapping[offset : offset + header_size])  # noqa: E203
+            if header["key"] != self._key():
+                raise ValueError("Cache is stale.")
+        except (struct.error, ValueError, KeyError, OSError):
+            mapping.close()
+            return None
+
+        count = header["count"]
+        view = memoryview(mapping)
+        columns = []
+        offset = _aligned(offset + header_size)
+        for typecode in (NAME_ID_TYPECODE, SECONDS_TYPECODE, SECONDS_TYPECODE):
+            size = count * array(typecode).itemsize
+            if offset + size > len(mapping):
+                return None
+            columns.append(view[offset : offset + size].cast(typecode))  # noqa: E203
+            offset = _aligned(offset + size)
+        return CachedPeople(header["names"], *columns)
+
+    def write_through(self, people: typing.Iterable[PersonWithTime]) -> typing.Iterator[PersonWithTime]:
+        """
+        Yields the given people and writes them to the cache once they're exhausted.
+        Nothing is written if reading fails or people have datetimes which can't be kept as seconds since epoch.
+        """
+        key = self._key()
+        name_to_id: typing.Dict[str, int] = {}
+        name_ids, starts, ends = array(NAME_ID_TYPECODE), array(SECONDS_TYPECODE), array(SECONDS_TYPECODE)
+        cacheable = True
+        for person in people:
+            yield person
+            if not cacheable:
+                continue
+            if person.start.tzinfo or person.end.tzinfo or person.start.microsecond or person.end.microsecond:
+                cacheable = False
+                name_ids, starts, ends = array(NAME_ID_TYPECODE), array(SECONDS_TYPECODE), array(SECONDS_TYPECODE)
+                continue
+            name_id = name_to_id.get(person.full_name)
+            if name_id is None:
+                name_id = name_to_id[person.full_name] = len(name_to_id)
+            name_ids.append(name_id)
+            starts.append(to_epoch_seconds(person.start))
+            ends.append(to_epoch_seconds(person.end))
+
+        if cacheable:
+            self._write(key, list(name_to_id), name_ids, starts, ends)
+
+    def _write(self, key: dict, names: typing.List[str], *columns: array):
+        header = json.dumps({"key": key, "count": len(columns[0]), "names": names}).encode()
+        temporary_path = f"{self._path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary_path, "wb") as file:
+                file.write(MAGIC)
+                file.write(HEADER_SIZE.pack(len(header)))
+                file.write(header)
+                for column in columns:
+                    file.write(b"\0" * (_aligned(file.tell()) - file.tell()))
+                    column.tofile(file)
+            os.replace(temporary_path, self._path)
+        except OSError:  # cache is optional, e.g. the directory may be read-only
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
@@ -0,0 +1,220 @@
+import datetime as dt
+import math
+import typing
+from collections import defaultdict
+
+from .helpers import PersonWithTime
+from .logic import GroupingService
+from .writer import format_duration, quote
+
+__all__ = (
+    "PERCENTILES",
+    "DistributionGroupingService",
+    "Histogram",
+    "LogHistogram",
+    "SessionDistribution",
+    "write_out_distributions",
+)
+
+PERCENTILES = (50, 90, 99)
+ARRIVAL_BUCKET_WIDTH = 60  # seconds, so times of day are kept in at most 1440 buckets
+DURATION_RELATIVE_ACCURACY = 0.01
+SECONDS_IN_DAY = 24 * 60 * 60
+
+Key = typing.Hashable
+
+
+class Histogram:
+    """
+    Mergeable sketch of non-negative values in fixed-width buckets, exact count, min, max and mean are kept aside.
+    Quantiles are estimated by middles of buckets, so they're off by at most half of the width.
+    """
+
+    def __init__(self, width: int = ARRIVAL_BUCKET_WIDTH):
+        self.width = width
+        self.buckets: typing.DefaultDict[int, int] = defaultdict(int)
+        self.count = 0
+        self.total = 0
+        self.minimum: typing.Optional[int] = None
+        self.maximum: typing.Optional[int] = None
+
+    def _parameters(self) -> tuple:
+        return (type(self), self.width)
+
+    def _bucket(self, value: int) -> int:
+        return value // self.width
+
+    def _value(self, bucket: int) -> float:
+        return bucket * self.width + self.width / 2
+
+    def add(self, value: int):
+        self.buckets[self._bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    def merge(self, other: "Histogram"):
+        if self._parameters() != other._parameters():
+            raise ValueError("Only histograms with the same buckets may be merged.")
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] += count
+        self.count += other.count
+        self.total += other.total
+        if other.minimum is not None and (self.minimum is None or other.minimum < self.minimum):
+            self.minimum = other.minimum
+        if other.maximum is not None and (self.maximum is None or other.maximum > self.maximum):
+            self.maximum = other.maximum
+
+    @property
+    def mean(self) -> typing.Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q: float) -> typing.Optional[float]:
+        """Estimate of the nearest-rank quantile for q in [0, 1]: the least value not less than q of values"""
+        if not self.count:
+            return None
+        if q <= 0:
+            return self.minimum
+        if q >= 1:
+            return self.maximum
+        rank, seen = q * self.count, 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(max(self._value(bucket), self.minimum), self.maximum)
+        return self.maximum
+
+
+class LogHistogram(Histogram):
+    """
+    Histogram with buckets growing geometrically like in DDSketch: estimates are within relative_accuracy
+    of real values, and the number of buckets grows with the logarithm of the range of values only.
+    """
+
+    def __init__(self, relative_accuracy: float = DURATION_RELATIVE_ACCURACY):
+        super().__init__(width=0)
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+
+    def _parameters(self) -> tuple:
+        return (type(self), self.relative_accuracy)
+
+    def _bucket(self, value: int) -> int:
+        return math.ceil(math.log(value) / self._log_gamma) if value > 0 else -1
+
+    def _value(self, bucket: int) -> float:
+        return 2 * self._gamma**bucket / (self._gamma + 1) if bucket >= 0 else 0.0
+
+
+class SessionDistribution:
+    """
+    Distributions of durations of sessions in seconds and of their starts as seconds since midnight.
+    Distributions are merged with + like durations are summed, so partial groupings are merged by merge_groupings.
+    """
+
+    def __init__(self):
+        self.durations = LogHistogram()
+        self.arrivals = Histogram()
+
+    def add(self, person_with_time: PersonWithTime):
+        start = person_with_time.start
+        self.durations.add(int((person_with_time.end - start).total_seconds()))
+        self.arrivals.add(start.hour * 3600 + start.minute * 60 + start.second)
+
+    def __iadd__(self, other: "SessionDistribution") -> "SessionDistribution":
+        self.durations.merge(other.durations)
+        self.arrivals.merge(other.arrivals)
+        return self
+
+    def __add__(self, other: "SessionDistribution") -> "SessionDistribution":
+        result = SessionDistribution()
+        result += self
+        result += other
+        return result
+
+    def __radd__(self, other: int) -> "SessionDistribution":
+        if other == 0:  # the start of sum() and of defaultdict(int)
+            return self
+        return NotImplemented
+
+
+class DistributionGroupingService(GroupingService):
+    """
+    Groups distributions of sessions instead of summed durations, every session is credited to the day of start
+    as a whole, since it's a single session even when split_by_day splits summed durations.
+    """
+
+    def _group(self, by_person: bool) -> typing.Dict[Key, SessionDistribution]:
+        result: typing.Dict[Key, SessionDistribution] = {}
+        for person_with_time in self._people:
+            key = (
+                (person_with_time.start.date(), person_with_time.full_name)
+                if by_person
+                else person_with_time.start.date()
+            )
+            distribution = result.get(key)
+            if distribution is None:
+                distribution = result[key] = SessionDistribution()
+            distribution.add(person_with_time)
+        return result
+
+    def group_people_with_time_by_day(self) -> typing.Dict[dt.date, SessionDistribution]:
+        """Sessions are grouped by day"""
+        return self._group(by_person=False)
+
+    def group_people_with_time_by_person_and_day(
+        self,
+    ) -> typing.Dict[typing.Tuple[dt.date, str], SessionDistribution]:
+        """Sessions are grouped by full_name from tag and day"""
+        return self._group(by_person=True)
+
+
+def _format_duration(seconds: typing.Optional[float]) -> str:
+    return format_duration(round(seconds)) if seconds is not None else ""
+
+
+def _format_time_of_day(seconds: typing.Optional[float]) -> str:
+    if seconds is None:
+        return ""
+    return (dt.datetime.min + dt.timedelta(seconds=min(round(seconds), SECONDS_IN_DAY - 1))).strftime("%H:%M:%S")
+
+
+def write_out_distributions(
+    output: typing.TextIO, distributions: typing.Mapping[Key, SessionDistribution], by_person: bool
+):
+    """
+    Distributions are written as csv sorted by keys: number of sessions, min, max, mean and PERCENTILES
+    of their durations, and min, PERCENTILES and max of their starts as times of day.
+    """
+    header = ["date", "name"] if by_person else ["date"]
+    header += ["sessions", "min", "max", "mean", *(f"p{percentile}" for percentile in PERCENTILES)]
+    header += ["arrival_min", *(f"arrival_p{percentile}" for percentile in PERCENTILES), "arrival_max"]
+    lines = [",".join(header) + "\r\n"]
+    for key in sorted(distributions):
+        date, name = key if by_person else (key, None)
+        durations, arrivals = distributions[key].durations, distributions[key].arrivals
+        row = [date.strftime("%d-%m-%Y"), quote(name)] if by_person else [date.strftime("%d-%m-%Y")]
+        row.append(str(durations.count))
+        row.extend(
+            quote(_format_duration(value))
+            for value in (
+                durations.minimum,
+                durations.maximum,
+                durations.mean,
+                *(durations.quantile(percentile / 100) for percentile in PERCENTILES),
+            )
+        )
+        row.extend(
+            _format_time_of_day(value)
+            for value in (
+                arrivals.minimum,
+                *(arrivals.quantile(percentile / 100) for percentile in PERCENTILES),
+                arrivals.maximum,
+            )
+        )
+        lines.append(",".join(row) + "\r\n")
+    output.write("".join(lines))
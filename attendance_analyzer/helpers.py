@@ -1,12 +1,164 @@
 import datetime as dt
+import re
 import typing
 
+DATE_PREFIX_CACHE_SIZE = 1024
+EPOCH = dt.datetime(1970, 1, 1)
+SECOND = dt.timedelta(seconds=1)
+
+# widths of numeric directives which can be sliced directly out of the text
+FIXED_WIDTH_DIRECTIVES = {"Y": 4, "y": 2, "m": 2, "d": 2, "H": 2, "M": 2, "S": 2}
+DATE_DIRECTIVES = frozenset("Yymd")
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+DURATION_PATTERN = re.compile(
+    r"(?P<amount>\d+(?:\.\d+)?)(?P<unit>[smhd])?|(?P<hours>\d+):(?P<minutes>[0-5]\d)(?::(?P<seconds>[0-5]\d))?"
+)
+
 
 def parse_datetime(text: str, datetime_regex: str) -> dt.datetime:
     """:raises ValueError"""
     return dt.datetime.strptime(text, datetime_regex)
 
 
+def parse_duration(text: str) -> int:
+    """
+    Seconds of duration written as H:MM:SS, H:MM or with a unit: 40h, 90m, 3600s, plain numbers are seconds.
+    :raises ValueError
+    """
+    match = DURATION_PATTERN.fullmatch(text.strip())
+    if match is None:
+        raise ValueError(f"'{text}' is not a duration like 40h, 90m, 3600s or 40:00:00.")
+    if match["amount"] is not None:
+        return round(float(match["amount"]) * DURATION_UNITS[match["unit"] or "s"])
+    return int(match["hours"]) * 3600 + int(match["minutes"]) * 60 + int(match["seconds"] or 0)
+
+
+def to_epoch_seconds(datetime: dt.datetime) -> int:
+    """Whole seconds since 1970-01-01 of naive datetime, microseconds are dropped"""
+    return (datetime - EPOCH) // SECOND
+
+
+def from_epoch_seconds(seconds: int) -> dt.datetime:
+    return EPOCH + dt.timedelta(seconds=seconds)
+
+
+class DateTimeParser:
+    """
+    Compiled version of parse_datetime for a single datetime_regex.
+    Patterns made only of fixed-width numeric directives (%Y, %y, %m, %d, %H, %M, %S) and literals
+    are parsed by slicing the fields out of the text, dates are cached by their text.
+    Anything else (other directives, texts of other width, out of range values) goes to strptime.
+    """
+
+    def __init__(self, datetime_regex: str, cache_size: int = DATE_PREFIX_CACHE_SIZE):
+        self._datetime_regex = datetime_regex
+        self._cache_size = cache_size
+        self._dates: typing.Dict[str, typing.Tuple[int, int, int]] = {}
+        self._pattern: typing.Optional[typing.Pattern] = None
+        self._slices: typing.Dict[str, slice] = {}
+        self._date_key: typing.Optional[slice] = None
+        self._compile()
+
+    def _compile(self):
+        pattern_parts = []
+        offset = 0
+        position = 0
+        while position < len(self._datetime_regex):
+            char = self._datetime_regex[position]
+            if char == "%":
+                directive = self._datetime_regex[position + 1 : position + 2]  # noqa: E203
+                position += 2
+                if directive == "%":
+                    pattern_parts.append("%")
+                    offset += 1
+                elif directive in FIXED_WIDTH_DIRECTIVES and directive not in self._slices:
+                    width = FIXED_WIDTH_DIRECTIVES[directive]
+                    pattern_parts.append(r"\d" * width)
+                    self._slices[directive] = slice(offset, offset + width)
+                    offset += width
+                else:
+                    return  # not supported, every text goes to strptime
+            else:
+                pattern_parts.append(re.escape(char))
+                offset += 1
+                position += 1
+        if "Y" in self._slices and "y" in self._slices:
+            return
+        self._pattern = re.compile("".join(pattern_parts), re.ASCII)
+
+        date_slices = [s for directive, s in self._slices.items() if directive in DATE_DIRECTIVES]
+        time_slices = [s for directive, s in self._slices.items() if directive not in DATE_DIRECTIVES]
+        if date_slices:
+            date_key = slice(min(s.start for s in date_slices), max(s.stop for s in date_slices))
+            # cache is keyed by the text between date fields, so it must not contain time fields
+            if not any(date_key.start < s.stop and s.start < date_key.stop for s in time_slices):
+                self._date_key = date_key
+
+    def _parse_date(self, text: str) -> typing.Tuple[int, int, int]:
+        """:raises ValueError"""
+        if "Y" in self._slices:
+            year = int(text[self._slices["Y"]])
+        elif "y" in self._slices:
+            year = int(text[self._slices["y"]])
+            year += 1900 if year >= 69 else 2000  # the same pivot as strptime uses
+        else:
+            year = 1900
+        month = int(text[self._slices["m"]]) if "m" in self._slices else 1
+        day = int(text[self._slices["d"]]) if "d" in self._slices else 1
+        dt.date(year, month, day)  # validate
+        return year, month, day
+
+    def _parse_fixed_width(self, text: str) -> dt.datetime:
+        """:raises ValueError"""
+        if self._date_key is None:
+            year, month, day = self._parse_date(text)
+        else:
+            key = text[self._date_key]
+            date = self._dates.get(key)
+            if date is None:
+                date = self._parse_date(text)
+                if len(self._dates) >= self._cache_size:
+                    del self._dates[next(iter(self._dates))]  # drop the oldest one
+                self._dates[key] = date
+            year, month, day = date
+        slices = self._slices
+        return dt.datetime(
+            year,
+            month,
+            day,
+            int(text[slices["H"]]) if "H" in slices else 0,
+            int(text[slices["M"]]) if "M" in slices else 0,
+            int(text[slices["S"]]) if "S" in slices else 0,
+        )
+
+    def fields(self, text: str) -> typing.Optional[typing.Tuple[int, int, int, int, int, int]]:
+        """
+        Year, month, day, hour, minute and second sliced out of the text without validation, so they're ordered
+        like parsed datetimes are. None when the pattern has no %Y or the text doesn't match it
+        """
+        if self._pattern is None or "Y" not in self._slices or self._pattern.fullmatch(text) is None:
+            return None
+        slices = self._slices
+        return (
+            int(text[slices["Y"]]),
+            int(text[slices["m"]]) if "m" in slices else 1,
+            int(text[slices["d"]]) if "d" in slices else 1,
+            int(text[slices["H"]]) if "H" in slices else 0,
+            int(text[slices["M"]]) if "M" in slices else 0,
+            int(text[slices["S"]]) if "S" in slices else 0,
+        )
+
+    def __call__(self, text: str) -> dt.datetime:
+        """:raises ValueError"""
+        if self._pattern is not None and self._pattern.fullmatch(text) is not None:
+            try:
+                return self._parse_fixed_width(text)
+            except ValueError:
+                pass  # let strptime decide on out of range values
+        return parse_datetime(text, self._datetime_regex)
+
+
 class PersonWithTime(typing.NamedTuple):
     full_name: str
     start: dt.datetime
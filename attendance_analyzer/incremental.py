@@ -0,0 +1,174 @@
+import datetime as dt
+import hashlib
+import json
+import mmap
+import os
+import typing
+
+from .logic import GroupingService, GroupingServiceFactory, PeopleRepository, merge_groupings
+from .parallel import PEOPLE_TAG_CLOSING, Shard, ShardSource, _find_person_tag
+from .reader import PeopleReader, XMLPeopleReader
+
+__all__ = ("CHECKPOINT_SUFFIX", "Checkpoint", "IncrementalGrouping")
+
+CHECKPOINT_SUFFIX = ".attendance-checkpoint"
+VERSION = 1
+PERSON_TAG_CLOSING = b"</person>"
+FINGERPRINT_SIZE = 4096  # bytes right before the checkpoint offset which have to stay unchanged
+
+FilePath = str
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class Checkpoint(typing.NamedTuple):
+    offset: int  # position right after the last </person> already grouped
+    prefix: bytes  # bytes before the first <person>
+    fingerprint: str  # digest of up to FINGERPRINT_SIZE bytes before offset
+    grouping: dict
+
+
+class IncrementalGrouping:
+    """
+    Groups people of a file which only grows by appending records, like GroupingService does.
+    Groupings and the offset right after the last complete </person> are kept in a sidecar checkpoint
+    (by default it's placed next to the source), so the next run parses only records appended after it.
+    The checkpoint is dropped and the whole file is parsed again when the bytes before the offset are changed,
+    the file is truncated or options affecting groupings differ.
+    Records are looked up as plain bytes like split_into_shards does, so <person inside comments or CDATA
+    is not expected.
+    """
+
+    def __init__(
+        self,
+        filename: FilePath,
+        datetime_regex: str,
+        group: bool,
+        people_to_filter: typing.Optional[typing.Tuple[str]] = None,
+        start_dt: typing.Optional[dt.datetime] = None,
+        end_dt: typing.Optional[dt.datetime] = None,
+        split_by_day: bool = False,
+        grouping_service_factory: GroupingServiceFactory = GroupingService,
+        reader_class: typing.Type[PeopleReader] = XMLPeopleReader,
+        path: typing.Optional[FilePath] = None,
+    ):
+        self._filename = filename
+        self._datetime_regex = datetime_regex
+        self._group = group
+        self._people_to_filter = people_to_filter
+        self._start_dt = start_dt
+        self._end_dt = end_dt
+        self._split_by_day = split_by_day
+        self._grouping_service_factory = grouping_service_factory
+        self._reader_class = reader_class
+        self._path = path if path is not None else filename + CHECKPOINT_SUFFIX
+
+    def _key(self) -> dict:
+        return {
+            "version": VERSION,
+            "source": os.path.abspath(self._filename),
+            "datetime_regex": self._datetime_regex,
+            "group": self._group,
+            "people_to_filter": sorted(self._people_to_filter or ()),
+            "start_dt": self._start_dt.isoformat() if self._start_dt else None,
+            "end_dt": self._end_dt.isoformat() if self._end_dt else None,
+            "split_by_day": self._split_by_day,
+        }
+
+    def _dump_grouping(self, grouping: typing.Mapping) -> list:
+        if self._group:
+            return [[day.toordinal(), full_name, duration] for (day, full_name), duration in grouping.items()]
+        return [[day.toordinal(), duration] for day, duration in grouping.items()]
+
+    def _load_grouping(self, rows: list) -> dict:
+        if self._group:
+            return {(dt.date.fromordinal(day), full_name): duration for day, full_name, duration in rows}
+        return {dt.date.fromordinal(day): duration for day, duration in rows}
+
+    def load(self) -> typing.Optional[Checkpoint]:
+        """:returns None when there is no checkpoint made with the same options"""
+        try:
+            with open(self._path, encoding="utf-8") as file:
+                data = json.load(file)
+            if data["key"] != self._key():
+                return None
+            return Checkpoint(
+                data["offset"],
+                bytes.fromhex(data["prefix"]),
+                data["fingerprint"],
+                self._load_grouping(data["grouping"]),
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, checkpoint: Checkpoint):
+        data = {
+            "key": self._key(),
+            "offset": checkpoint.offset,
+            "prefix": checkpoint.prefix.hex(),
+            "fingerprint": checkpoint.fingerprint,
+            "grouping": self._dump_grouping(checkpoint.grouping),
+        }
+        temporary_path = f"{self._path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary_path, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+            os.replace(temporary_path, self._path)
+        except OSError:  # checkpoint is optional, e.g. the directory may be read-only
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+
+    def _is_valid(self, checkpoint: Checkpoint, mapping: mmap.mmap) -> bool:
+        offset = checkpoint.offset
+        return (
+            len(mapping) >= offset
+            and mapping[: len(checkpoint.prefix)] == checkpoint.prefix
+            and _digest(mapping[max(0, offset - FINGERPRINT_SIZE) : offset]) == checkpoint.fingerprint  # noqa: E203
+        )
+
+    def _group_range(self, file: typing.BinaryIO, shard: Shard) -> dict:
+        repository = PeopleRepository(reader_obj=self._reader_class(ShardSource(file, shard), self._datetime_regex))
+        grouping_service = self._grouping_service_factory(
+            repository.get_filtered_people(self._people_to_filter, self._start_dt, self._end_dt)
+        )
+        if self._group:
+            return dict(grouping_service.group_people_with_time_by_person_and_day())
+        return dict(grouping_service.group_people_with_time_by_day())
+
+    def group(self) -> dict:
+        """
+        Groupings of the checkpoint merged with groupings of records appended after it, the checkpoint is updated.
+        Records after the last complete </person> are left for the next run, as they may still be being written.
+        """
+        checkpoint = self.load()
+        with open(self._filename, "rb") as file:
+            if not os.path.getsize(self._filename):
+                return dict(self._group_range(file, Shard(0, 0, b"", b"")))
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+                first_person = _find_person_tag(mapping, 0)
+                end = mapping.rfind(PERSON_TAG_CLOSING)
+                if first_person < 0 or end < first_person:  # no records yet, nothing to resume from
+                    return dict(self._group_range(file, Shard(0, len(mapping), b"", b"")))
+                end += len(PERSON_TAG_CLOSING)
+                prefix = mapping[:first_person]
+                if checkpoint is None or not self._is_valid(checkpoint, mapping):
+                    checkpoint = Checkpoint(0, b"", "", {})
+                fingerprint = _digest(mapping[max(0, end - FINGERPRINT_SIZE) : end])  # noqa: E203
+
+            if checkpoint.offset == end:
+                return checkpoint.grouping
+            start = checkpoint.offset
+            grouping = dict(
+                merge_groupings(
+                    (
+                        checkpoint.grouping,
+                        self._group_range(file, Shard(start, end, prefix if start else b"", PEOPLE_TAG_CLOSING)),
+                    )
+                )
+            )
+        self.save(Checkpoint(end, prefix, fingerprint, grouping))
+        return grouping
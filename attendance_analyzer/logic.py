@@ -1,15 +1,152 @@
 from __future__ import annotations
 
 import datetime as dt
+import heapq
 import typing
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
 from functools import partial
+from operator import attrgetter
 
-from .helpers import PersonWithTime
-from .reader import PeopleReader, XMLPeopleReader
+from .cache import AttendanceCache
+from .helpers import EPOCH, PersonWithTime
+from .reader import PeopleFilter, PeopleReader, XMLPeopleReader
+from .store import PeopleStore
 
 FilePath = str
 
+MICROSECONDS_IN_SECOND = 10**6
+MICROSECONDS_IN_DAY = 24 * 60 * 60 * MICROSECONDS_IN_SECOND
+ONE_DAY = dt.timedelta(days=1)
+ONE_SECOND = dt.timedelta(seconds=1)
+
+
+def split_duration_by_day(start: dt.datetime, end: dt.datetime) -> typing.Iterator[typing.Tuple[dt.date, int]]:
+    """
+    Seconds between start and end credited to every day they touch, O(days spanned).
+    Seconds since start are floored at every midnight, so they sum up to int((end - start).total_seconds()).
+    End at midnight doesn't touch its day.
+    """
+    day, last_day = start.date(), end.date()
+    if day == last_day:
+        yield day, int((end - start).total_seconds())
+        return
+    midnight = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    credited = 0
+    while True:
+        midnight += ONE_DAY
+        if midnight >= end:
+            break
+        elapsed = (midnight - start) // ONE_SECOND
+        yield day, elapsed - credited
+        credited = elapsed
+        day += ONE_DAY
+    yield day, int((end - start).total_seconds()) - credited
+
+
+def split_microseconds_by_day(start: int, end: int) -> typing.Iterator[typing.Tuple[int, int]]:
+    """The same as split_duration_by_day for microseconds since epoch, days are numbers of days since epoch"""
+    first_day = start // MICROSECONDS_IN_DAY
+    last_day = (end - 1) // MICROSECONDS_IN_DAY if end > start else first_day
+    credited = 0
+    for day in range(first_day, last_day):
+        elapsed = ((day + 1) * MICROSECONDS_IN_DAY - start) // MICROSECONDS_IN_SECOND
+        yield day, elapsed - credited
+        credited = elapsed
+    yield last_day, (end - start) // MICROSECONDS_IN_SECOND - credited
+
+
+class UnsortedPeopleException(Exception):
+    pass
+
+
+def merge_overlapping_people(
+    people: typing.Iterable[PersonWithTime], presorted: bool = False
+) -> typing.Iterator[PersonWithTime]:
+    """
+    Union of times of every full_name: people overlapping (or touching) each other are merged into one by time alone,
+    even across midnight, so duplicated records are counted once, and split_by_day splits the unions afterwards.
+    People are sorted by full_name and start and swept, that takes O(n log n) time and O(n) memory.
+    Presorted people must already come grouped by full_name and sorted by start, then they're swept as they come
+    keeping only the current union of one full_name. Only the order of starts of every full_name is checked,
+    a full_name coming again after the others isn't detected, as that would take memory for every full_name.
+    :raises UnsortedPeopleException when starts of presorted people of a full_name decrease
+    """
+    if not presorted:
+        people = sorted(people, key=attrgetter("full_name", "start"))
+    current: typing.Optional[PersonWithTime] = None
+    for person in people:
+        if current is not None and person.full_name == current.full_name:
+            if person.start < current.start:
+                raise UnsortedPeopleException
+            if person.start <= current.end:
+                if person.end > current.end:
+                    current = current._replace(end=person.end)
+                continue
+        if current is not None:
+            yield current
+        current = person
+    if current is not None:
+        yield current
+
+
+class PeopleIndex:
+    """
+    People sorted by start with posting lists of positions per full_name.
+    Filters by full_name become lookups and filters by datetime become bisect range scans:
+    start_dt <= start <= end <= end_dt means that start lies in [start_dt, end_dt].
+    """
+
+    def __init__(self, people: typing.Iterable[PersonWithTime]):
+        self._people: typing.List[PersonWithTime] = sorted(people, key=attrgetter("start"))
+        self._starts: typing.List[dt.datetime] = [person.start for person in self._people]
+        self._postings: typing.Dict[str, typing.List[int]] = defaultdict(list)
+        for position, person in enumerate(self._people):
+            self._postings[person.full_name].append(position)
+        self._posting_starts: typing.Dict[str, typing.List[dt.datetime]] = {
+            full_name: [self._starts[position] for position in positions]
+            for full_name, positions in self._postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._people)
+
+    @staticmethod
+    def _bounds(
+        starts: typing.List[dt.datetime], start_dt: typing.Optional[dt.datetime], end_dt: typing.Optional[dt.datetime]
+    ) -> typing.Tuple[int, int]:
+        return (
+            bisect_left(starts, start_dt) if start_dt else 0,
+            bisect_right(starts, end_dt) if end_dt else len(starts),
+        )
+
+    def _positions(
+        self,
+        people_full_names: typing.Optional[typing.Iterable[str]],
+        start_dt: typing.Optional[dt.datetime],
+        end_dt: typing.Optional[dt.datetime],
+    ) -> typing.Iterator[int]:
+        if not people_full_names:
+            return iter(range(*self._bounds(self._starts, start_dt, end_dt)))
+        ranges = []
+        for full_name in set(people_full_names):
+            if full_name in self._postings:
+                first, last = self._bounds(self._posting_starts[full_name], start_dt, end_dt)
+                ranges.append(self._postings[full_name][first:last])
+        return heapq.merge(*ranges)
+
+    def query(
+        self,
+        people_full_names: typing.Optional[typing.Iterable[str]] = None,
+        start_dt: typing.Optional[dt.datetime] = None,
+        end_dt: typing.Optional[dt.datetime] = None,
+    ) -> typing.Iterator[PersonWithTime]:
+        """The same people as PeopleRepository.get_filtered_people returns, but sorted by start"""
+        for position in self._positions(people_full_names, start_dt, end_dt):
+            person = self._people[position]
+            if end_dt is None or person.end <= end_dt:
+                yield person
+
 
 class PeopleRepository:
     def __init__(
@@ -17,12 +154,17 @@ class PeopleRepository:
         filename: typing.Optional[typing.Union[FilePath, typing.IO]] = None,
         datetime_regex: typing.Optional[str] = None,
         reader_obj: typing.Optional[PeopleReader] = None,
+        cache: typing.Optional[AttendanceCache] = None,
+        compact: bool = False,
     ):
         assert (filename is not None and datetime_regex is not None) or reader_obj
         self._filename = filename
         self._datetime_regex = datetime_regex
         self._reader = reader_obj if reader_obj else XMLPeopleReader(filename, datetime_regex)
+        self._cache = cache
+        self._compact = compact
         self._people: typing.Optional[typing.Iterable[PersonWithTime]] = None
+        self._index: typing.Optional[PeopleIndex] = None
 
     @staticmethod
     def _filter_person_against_full_names_and_datetime(
@@ -39,17 +181,68 @@ class PeopleRepository:
             return False
         return True
 
+    def _read_people(self) -> typing.Iterable[PersonWithTime]:
+        """People are read from the cache if it's given and fresh, otherwise they're read and written to it"""
+        if self._cache is not None:
+            people = self._cache.load()
+            if people is not None:
+                return people
+            return self._cache.write_through(self._reader.read_attendance())
+        return self._reader.read_attendance()
+
     def get_all_people(self) -> typing.Iterable[PersonWithTime]:
+        """
+        People are read once by _read_people, usually as an iterator which may be iterated only once.
+        Compact repository keeps all of them in PeopleStore, so they may be iterated more than once.
+        """
         if self._people is None:
-            self._people = self._reader.read_attendance()
+            self._people = self._read_people()
+        if self._compact and not isinstance(self._people, PeopleStore):
+            self._people = PeopleStore(self._people)
         return self._people
 
+    def get_index(self) -> PeopleIndex:
+        """
+        Index is built once from all people and is reused by the following queries.
+        People already handed out as an iterator may be consumed by the caller, so they're read again then.
+        """
+        if self._index is None:
+            if self._people is not None and iter(self._people) is self._people:
+                self._index = PeopleIndex(self._read_people())
+            else:
+                self._index = PeopleIndex(self.get_all_people())
+        return self._index
+
+    def query(
+        self,
+        people_full_names: typing.Optional[typing.Tuple[str]] = None,
+        start_dt: typing.Optional[dt.datetime] = None,
+        end_dt: typing.Optional[dt.datetime] = None,
+    ) -> typing.Iterable[PersonWithTime]:
+        """Filters people like get_filtered_people does, but through the index"""
+        return self.get_index().query(people_full_names, start_dt, end_dt)
+
     def get_filtered_people(
         self,
         people_full_names: typing.Optional[typing.Tuple[str]] = None,
         start_dt: typing.Optional[dt.datetime] = None,
         end_dt: typing.Optional[dt.datetime] = None,
     ) -> typing.Iterable[PersonWithTime]:
+        if self._index is not None:
+            return self._index.query(people_full_names, start_dt, end_dt)
+        people_filter = PeopleFilter(people_full_names, start_dt, end_dt)
+        if (
+            self._people is None
+            and self._cache is None
+            and not self._compact
+            and not people_filter.is_empty()
+            and isinstance(self._reader, PeopleReader)
+        ):
+            # people are read only for this query, so the reader skips the rest without parsing them
+            return self._reader.read_attendance(people_filter)
+        people = self.get_all_people()
+        if isinstance(people, PeopleStore):
+            return people.select(people_full_names, start_dt, end_dt)
         return filter(
             partial(
                 self._filter_person_against_full_names_and_datetime,
@@ -57,17 +250,77 @@ class PeopleRepository:
                 start_dt=start_dt,
                 end_dt=end_dt,
             ),
-            self.get_all_people(),
+            people,
         )
 
 
 class GroupingService:
-    def __init__(self, people: typing.Iterable[PersonWithTime]):
+    """
+    By default the whole duration of a person is credited to the day of start.
+    With split_by_day it's split between all days it touches (see split_duration_by_day).
+    """
+
+    def __init__(self, people: typing.Iterable[PersonWithTime], split_by_day: bool = False):
         self._people = people
+        self._split_by_day = split_by_day
+
+    def _group_store(self, store: PeopleStore, by_person: bool) -> typing.DefaultDict[typing.Hashable, int]:
+        """
+        Groups packed people of the store without making datetimes:
+        day is the floor of start divided by a day and duration is the floor of end - start divided by a second.
+        """
+        durations: typing.DefaultDict[typing.Tuple[int, int], int] = defaultdict(int)
+        for name_id, start, end in zip(store.name_ids, store.starts, store.ends):
+            if not by_person:
+                name_id = -1
+            day = start // MICROSECONDS_IN_DAY
+            if not self._split_by_day or day == (end - 1) // MICROSECONDS_IN_DAY or end == start:
+                durations[(day, name_id)] += (end - start) // MICROSECONDS_IN_SECOND
+            else:
+                for day, duration in split_microseconds_by_day(start, end):
+                    durations[(day, name_id)] += duration
+        result: typing.DefaultDict[typing.Hashable, int] = defaultdict(int)
+        epoch_date = EPOCH.date()
+        for (day, name_id), duration in durations.items():
+            date = epoch_date + dt.timedelta(days=day)
+            result[(date, store.names[name_id]) if by_person else date] = duration
+        return result
+
+    def iter_durations_by_day(self) -> typing.Iterator[typing.Tuple[dt.date, int]]:
+        """Durations of people keyed by day, not summed"""
+        for person_with_time in self._people:
+            day = person_with_time.start.date()
+            if not self._split_by_day or day == person_with_time.end.date():
+                yield day, int((person_with_time.end - person_with_time.start).total_seconds())
+            else:
+                yield from split_duration_by_day(person_with_time.start, person_with_time.end)
+
+    def iter_durations_by_person_and_day(self) -> typing.Iterator[typing.Tuple[typing.Tuple[dt.date, str], int]]:
+        """Durations of people keyed by full_name from tag and day, not summed"""
+        for person_with_time in self._people:
+            day = person_with_time.start.date()
+            if not self._split_by_day or day == person_with_time.end.date():
+                yield (day, person_with_time.full_name), int(
+                    (person_with_time.end - person_with_time.start).total_seconds()
+                )
+            else:
+                for day, duration in split_duration_by_day(person_with_time.start, person_with_time.end):
+                    yield (day, person_with_time.full_name), duration
 
     def group_people_with_time_by_day(self) -> typing.DefaultDict[dt.date, int]:
         """People are grouped by day"""
+        if isinstance(self._people, PeopleStore):
+            return self._group_store(self._people, by_person=False)
         result: typing.DefaultDict[dt.date, int] = defaultdict(int)
+        if self._split_by_day:
+            for person_with_time in self._people:
+                day = person_with_time.start.date()
+                if day == person_with_time.end.date():  # the most of people don't cross midnight
+                    result[day] += int((person_with_time.end - person_with_time.start).total_seconds())
+                    continue
+                for day, duration in split_duration_by_day(person_with_time.start, person_with_time.end):
+                    result[day] += duration
+            return result
         for person_with_time in self._people:
             result[person_with_time.start.date()] += int(
                 (person_with_time.end - person_with_time.start).total_seconds()
@@ -76,9 +329,62 @@ class GroupingService:
 
     def group_people_with_time_by_person_and_day(self) -> dict[typing.Tuple[dt.date, str], int]:
         """People are grouped by full_name from tag and day"""
+        if isinstance(self._people, PeopleStore):
+            return self._group_store(self._people, by_person=True)
         result: dict[typing.Tuple[dt.date, str], int] = defaultdict(int)
+        if self._split_by_day:
+            for person_with_time in self._people:
+                day = person_with_time.start.date()
+                if day == person_with_time.end.date():  # the most of people don't cross midnight
+                    result[(day, person_with_time.full_name)] += int(
+                        (person_with_time.end - person_with_time.start).total_seconds()
+                    )
+                    continue
+                for day, duration in split_duration_by_day(person_with_time.start, person_with_time.end):
+                    result[(day, person_with_time.full_name)] += duration
+            return result
         for person_with_time in self._people:
             result[(person_with_time.start.date(), person_with_time.full_name)] += int(
                 (person_with_time.end - person_with_time.start).total_seconds()
             )
         return result
+
+
+GroupingServiceFactory = typing.Callable[[typing.Iterable[PersonWithTime]], GroupingService]
+
+
+def merge_groupings(groupings: typing.Iterable[typing.Mapping[typing.Hashable, int]]) -> typing.DefaultDict:
+    """Sums durations of partial groupings made by GroupingService for parts of the same input"""
+    result: typing.DefaultDict[typing.Hashable, int] = defaultdict(int)
+    for grouping in groupings:
+        for key, duration in grouping.items():
+            result[key] += duration
+    return result
+
+
+def select_durations(
+    durations: typing.Iterable[typing.Tuple[typing.Any, int]],
+    top: typing.Optional[int] = None,
+    bottom: typing.Optional[int] = None,
+    min_duration: typing.Optional[int] = None,
+    max_duration: typing.Optional[int] = None,
+    presorted: bool = False,
+) -> typing.Iterable[typing.Tuple[typing.Any, int]]:
+    """
+    Keys with durations within [min_duration, max_duration], of them only the top longest or the bottom shortest
+    ones ordered by duration are selected with a heap of that size, the rest are sorted by keys like writers do.
+    Ties are broken by keys, so the same grouping gives the same rows.
+    Presorted durations must already come sorted by keys, then without top and bottom they're filtered lazily
+    as they come, so streams of spilled groupings aren't loaded into memory.
+    """
+    if top is not None and bottom is not None:
+        raise ValueError("Only one of top and bottom may be selected.")
+    if min_duration is not None or max_duration is not None:
+        low = min_duration if min_duration is not None else -float("inf")
+        high = max_duration if max_duration is not None else float("inf")
+        durations = (item for item in durations if low <= item[1] <= high)
+    if top is not None:
+        return heapq.nsmallest(top, durations, key=lambda item: (-item[1], item[0]))
+    if bottom is not None:
+        return heapq.nsmallest(bottom, durations, key=lambda item: (item[1], item[0]))
+    return durations if presorted else sorted(durations)
@@ -0,0 +1,190 @@
+import datetime as dt
+import mmap
+import os
+import re
+import typing
+from concurrent.futures import ProcessPoolExecutor
+
+from .logic import GroupingService, GroupingServiceFactory, PeopleRepository, merge_groupings
+from .reader import PeopleReader, XMLPeopleReader
+
+__all__ = (
+    "DEFAULT_SHARD_SIZE",
+    "Shard",
+    "ShardSource",
+    "split_into_shards",
+    "iter_groupings_of_shards",
+    "group_people_in_parallel",
+)
+
+DEFAULT_SHARD_SIZE = 64 * 1024 * 1024
+PERSON_TAG_OPENING = re.compile(rb"<person[\s/>]")
+PEOPLE_TAG_CLOSING = b"</people>"
+
+FilePath = str
+
+
+class Shard(typing.NamedTuple):
+    start: int
+    end: int
+    prefix: bytes  # bytes before the first <person>, the same for every shard except the first one
+    suffix: bytes  # closes <people> for every shard except the last one
+
+
+class ShardSource:
+    """File-like object reading shard.prefix, bytes of the file in [shard.start, shard.end) and shard.suffix"""
+
+    def __init__(self, file: typing.BinaryIO, shard: Shard):
+        self._file = file
+        self._parts: typing.List[typing.Union[bytes, int]] = [shard.prefix, shard.end - shard.start, shard.suffix]
+        self._file.seek(shard.start)
+
+    def read(self, n_bytes: int = -1) -> bytes:
+        chunks = []
+        while self._parts and n_bytes != 0:
+            part = self._parts[0]
+            if isinstance(part, int):  # amount of bytes left in the file range
+                chunk = self._file.read(part if n_bytes < 0 else min(part, n_bytes))
+                left = part - len(chunk) if chunk else 0
+                if left:
+                    self._parts[0] = left
+                else:
+                    self._parts.pop(0)
+            else:
+                chunk = part if n_bytes < 0 else part[:n_bytes]
+                if len(chunk) < len(part):
+                    self._parts[0] = part[len(chunk) :]  # noqa: E203
+                else:
+                    self._parts.pop(0)
+            chunks.append(chunk)
+            if n_bytes > 0:
+                n_bytes -= len(chunk)
+        return b"".join(chunks)
+
+
+def _find_person_tag(mapping: mmap.mmap, position: int) -> int:
+    match = PERSON_TAG_OPENING.search(mapping, position)
+    return match.start() if match else -1
+
+
+def split_into_shards(filename: FilePath, shards: int) -> typing.List[Shard]:
+    """
+    Splits the file into byte ranges starting at <person> tags so that every range may be parsed on its own.
+    Tags are looked up as plain bytes, so <person inside comments or CDATA is not expected.
+    """
+    size = os.path.getsize(filename)
+    if not size:
+        return [Shard(0, 0, b"", b"")]
+    with open(filename, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+        first_person = _find_person_tag(mapping, 0)
+        if first_person < 0:
+            return [Shard(0, size, b"", b"")]
+
+        boundaries = [0]
+        for i in range(1, shards):
+            boundary = _find_person_tag(mapping, max(first_person, size * i // shards))
+            if boundary < 0:
+                break
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+        boundaries.append(size)
+        prefix = mapping[:first_person]
+
+    return [
+        Shard(
+            start,
+            end,
+            prefix if start else b"",
+            PEOPLE_TAG_CLOSING if end != size else b"",
+        )
+        for start, end in zip(boundaries, boundaries[1:])
+    ]
+
+
+def _group_shard(
+    filename: FilePath,
+    datetime_regex: str,
+    shard: Shard,
+    group: bool,
+    people_to_filter: typing.Optional[typing.Tuple[str]],
+    start_dt: typing.Optional[dt.datetime],
+    end_dt: typing.Optional[dt.datetime],
+    grouping_service_factory: GroupingServiceFactory,
+    reader_class: typing.Type[PeopleReader],
+) -> dict:
+    with open(filename, "rb") as file:
+        repository = PeopleRepository(reader_obj=reader_class(ShardSource(file, shard), datetime_regex))
+        grouping_service = grouping_service_factory(repository.get_filtered_people(people_to_filter, start_dt, end_dt))
+        if group:
+            return dict(grouping_service.group_people_with_time_by_person_and_day())
+        return dict(grouping_service.group_people_with_time_by_day())
+
+
+def iter_groupings_of_shards(
+    filename: FilePath,
+    datetime_regex: str,
+    workers: int,
+    group: bool,
+    people_to_filter: typing.Optional[typing.Tuple[str]] = None,
+    start_dt: typing.Optional[dt.datetime] = None,
+    end_dt: typing.Optional[dt.datetime] = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    grouping_service_factory: GroupingServiceFactory = GroupingService,
+    reader_class: typing.Type[PeopleReader] = XMLPeopleReader,
+) -> typing.Iterator[dict]:
+    """
+    Groups people of every shard of the file like GroupingService does in a pool of processes.
+    Groupings are yielded in the order of the file, so the first broken record raises the same exception
+    as it would do while reading the whole file with reader_class.
+    """
+    shards = split_into_shards(filename, max(workers, -(-os.path.getsize(filename) // shard_size)))
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [
+            executor.submit(
+                _group_shard,
+                filename,
+                datetime_regex,
+                shard,
+                group,
+                people_to_filter,
+                start_dt,
+                end_dt,
+                grouping_service_factory,
+                reader_class,
+            )
+            for shard in shards
+        ]
+        for future in futures:
+            yield future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def group_people_in_parallel(
+    filename: FilePath,
+    datetime_regex: str,
+    workers: int,
+    group: bool,
+    people_to_filter: typing.Optional[typing.Tuple[str]] = None,
+    start_dt: typing.Optional[dt.datetime] = None,
+    end_dt: typing.Optional[dt.datetime] = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    grouping_service_factory: GroupingServiceFactory = GroupingService,
+    reader_class: typing.Type[PeopleReader] = XMLPeopleReader,
+) -> dict:
+    """Groups people like GroupingService does, but parses shards of the file in a pool of processes"""
+    return merge_groupings(
+        iter_groupings_of_shards(
+            filename,
+            datetime_regex,
+            workers,
+            group,
+            people_to_filter,
+            start_dt,
+            end_dt,
+            shard_size,
+            grouping_service_factory,
+            reader_class,
+        )
+    )
@@ -0,0 +1,168 @@
+import queue
+import threading
+import typing
+
+from .source import Source, open_input
+
+__all__ = ("BATCH_SIZE", "QUEUE_SIZE", "PrefetchedSource", "ThreadedOutput", "iter_in_thread")
+
+BATCH_SIZE = 1024  # records passed between stages at once
+QUEUE_SIZE = 8  # batches waiting between stages, producers block once it's full
+CHUNKS_IN_QUEUE = 16  # chunks of the input read ahead of the parser
+WRITE_BUFFER = 256 * 1024  # characters or bytes handed to the writing thread at once
+POLL_INTERVAL = 0.1  # seconds between checks whether the other side of a queue is gone
+
+T = typing.TypeVar("T")
+_END = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _put(batches: queue.Queue, item: typing.Any, stopped: threading.Event) -> bool:
+    """Blocks while the queue is full, :returns False once the consumer is gone"""
+    while not stopped.is_set():
+        try:
+            batches.put(item, timeout=POLL_INTERVAL)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def iter_in_thread(
+    iterable: typing.Iterable[T], batch_size: int = BATCH_SIZE, queue_size: int = QUEUE_SIZE
+) -> typing.Iterator[T]:
+    """
+    Items of the iterable pulled by a thread and passed in batches through a bounded queue, so the thread works
+    ahead of the consumer by at most queue_size batches. Exception of the thread is raised by the consumer
+    after the items produced before it, the thread stops once the consumer is closed.
+    """
+    batches: queue.Queue = queue.Queue(maxsize=queue_size)
+    stopped = threading.Event()
+
+    def produce():
+        batch: typing.List[T] = []
+        try:
+            for item in iterable:
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    if not _put(batches, batch, stopped):
+                        return
+                    batch = []
+        except BaseException as error:
+            if not batch or _put(batches, batch, stopped):
+                _put(batches, _Failure(error), stopped)
+            return
+        if not batch or _put(batches, batch, stopped):
+            _put(batches, _END, stopped)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            batch = batches.get()
+            if batch is _END:
+                return
+            if isinstance(batch, _Failure):
+                raise batch.error
+            yield from batch
+    finally:
+        stopped.set()  # the thread stops by itself at the next batch
+
+
+def _read_chunks(source: Source) -> typing.Iterator[typing.Union[bytes, memoryview]]:
+    with open_input(source) as chunks:
+        yield from chunks
+
+
+class PrefetchedSource:
+    """
+    File-like object for readers with chunks of the source read and decompressed by a thread ahead of parsing,
+    chunks may be longer than the requested size like the ones of open_input.
+    """
+
+    def __init__(self, source: Source, queue_size: int = CHUNKS_IN_QUEUE):
+        self._source = source
+        self._queue_size = queue_size
+        self._chunks: typing.Optional[typing.Iterator[typing.Union[bytes, memoryview]]] = None
+
+    def read(self, n_bytes: int = -1) -> typing.Union[bytes, memoryview]:
+        if self._chunks is None:  # the thread is started by the first read, so an unread source costs nothing
+            self._chunks = iter_in_thread(_read_chunks(self._source), batch_size=1, queue_size=self._queue_size)
+        return next(self._chunks, b"")
+
+    def close(self):
+        if self._chunks is not None:
+            self._chunks.close()
+
+
+class ThreadedOutput:
+    """
+    File-like object passing what's written in blocks of WRITE_BUFFER through a bounded queue to a thread writing
+    them into the output, so formatting isn't blocked by writes. Errors of writes are raised by write and close.
+    """
+
+    def __init__(self, output: typing.IO, buffer_size: int = WRITE_BUFFER, queue_size: int = QUEUE_SIZE):
+        self._output = output
+        self._buffer_size = buffer_size
+        self._parts: typing.List[typing.AnyStr] = []
+        self._size = 0
+        self._blocks: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stopped = threading.Event()
+        self._error: typing.Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._write_blocks, daemon=True)
+        self._thread.start()
+
+    def _write_blocks(self):
+        while True:
+            try:
+                block = self._blocks.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if self._stopped.is_set():
+                    return
+                continue
+            if block is _END or self._stopped.is_set():
+                return
+            try:
+                self._output.write(block)
+            except BaseException as error:
+                self._error = error
+                self._stopped.set()
+                return
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _flush_parts(self):
+        if self._parts:
+            block = self._parts[0][:0].join(self._parts)
+            self._parts, self._size = [], 0
+            _put(self._blocks, block, self._stopped)
+        self._raise_error()
+
+    def write(self, data: typing.AnyStr) -> int:
+        self._parts.append(data)
+        self._size += len(data)
+        if self._size >= self._buffer_size:
+            self._flush_parts()
+        return len(data)
+
+    def close(self):
+        """Writes the rest and waits for the thread, the output itself is left open"""
+        if not self._thread.is_alive():
+            self._raise_error()
+            return
+        self._flush_parts()
+        _put(self._blocks, _END, self._stopped)
+        self._thread.join()
+        self._raise_error()
+
+    def cancel(self):
+        """Stops the thread dropping what's not written yet"""
+        self._stopped.set()
+        self._thread.join()
@@ -1,22 +1,42 @@
 import datetime as dt
+import itertools
+import re
 import typing
+from collections import Counter
 from xml.etree import ElementTree as ETree
+from xml.parsers import expat
 
-from .helpers import PersonWithTime, parse_datetime
+from .helpers import DateTimeParser, PersonWithTime
+from .source import DEFAULT_READ_BUFFER, InputFile, open_input
+
+# lxml is an optional dependency, it's imported by _import_lxml only when it's read with, as it's slow to load
+lxml_etree = None
 
 __all__ = (
     "UnknownPersonFullNameException",
     "UnrecognizableDateTimeException",
     "WrongStructureOfFileException",
     "WrongTimeException",
+    "RECORD_EXCEPTIONS",
+    "PeopleFilter",
+    "RecordError",
+    "RecordErrors",
     "PeopleReader",
     "XMLPeopleReader",
+    "ExpatPeopleReader",
+    "LxmlPeopleReader",
+    "ScannerPeopleReader",
+    "PARSERS",
+    "describe_error",
+    "is_lxml_available",
 )
 
 EVENT_START, EVENT_END = "start", "end"
 TAG_START, TAG_END, TAG_PERSON, TAG_PEOPLE = "start", "end", "person", "people"
 
 FilePath = str
+Source = typing.Union[FilePath, InputFile, typing.IO]
+DateTimeParserFactory = typing.Callable[[str], typing.Callable[[str], dt.datetime]]
 
 
 class UnknownPersonFullNameException(Exception):
@@ -25,7 +45,7 @@ class UnknownPersonFullNameException(Exception):
 
 class UnrecognizableDateTimeException(Exception):
     def __init__(self, pattern: str, text: str):
-        super().__init__()
+        super().__init__(pattern, text)  # keeps exception picklable
         self.pattern = pattern
         self.text = text
 
@@ -36,23 +56,218 @@ class WrongStructureOfFileException(Exception):
 
 class WrongTimeException(Exception):
     def __init__(self, text: str):
-        super().__init__()
+        super().__init__(text)
         self.text = text
 
 
+RECORD_EXCEPTIONS = (
+    UnknownPersonFullNameException,
+    UnrecognizableDateTimeException,
+    WrongStructureOfFileException,
+    WrongTimeException,
+)
+
+
+def describe_error(error: Exception) -> str:
+    """Message of an exception from RECORD_EXCEPTIONS the command reports"""
+    if isinstance(error, UnknownPersonFullNameException):
+        return "Attribute full_name is not found in tag person."
+    if isinstance(error, UnrecognizableDateTimeException):
+        return f"'{error.text}' does not match datetime pattern '{error.pattern}'."
+    if isinstance(error, WrongTimeException):
+        return error.text
+    return "Wrong structure of the given file."
+
+
+def check_time(start_time: dt.datetime, end_time: dt.datetime):
+    """:raises WrongTimeException when time in <start> comes after time in <end>"""
+    if start_time > end_time:
+        raise WrongTimeException(
+            f"Time in start tag ({start_time.strftime('%d-%m-%Y %H:%M:%S')}) "
+            f"cannot come after time in end tag({end_time.strftime('%d-%m-%Y %H:%M:%S')})."
+        )
+
+
+def is_lxml_available() -> bool:
+    """Imports lxml on the first call, so it's called only once lxml is going to be used"""
+    try:
+        _import_lxml()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _import_lxml():
+    """:raises RuntimeError when lxml is not installed"""
+    global lxml_etree
+    if lxml_etree is not None:
+        return
+    try:
+        from lxml import etree
+    except ImportError:
+        raise RuntimeError("lxml is required for LxmlPeopleReader.")
+    lxml_etree = etree
+
+
+class PeopleFilter:
+    """
+    Filters of PeopleRepository.get_filtered_people pushed down into readers: records of other people are skipped
+    before their datetimes are parsed, and date bounds are checked on the raw text when datetime_regex is made
+    of fixed-width fields with %Y. Datetimes of skipped records are neither parsed nor validated, the structure
+    of the file is validated as usual. Readers count skipped records in skipped.
+    """
+
+    def __init__(
+        self,
+        full_names: typing.Optional[typing.Iterable[str]] = None,
+        start_dt: typing.Optional[dt.datetime] = None,
+        end_dt: typing.Optional[dt.datetime] = None,
+    ):
+        self.full_names = frozenset(full_names) if full_names else frozenset()
+        self.start_dt = start_dt
+        self.end_dt = end_dt
+        self.skipped = 0
+
+    def is_empty(self) -> bool:
+        return not self.full_names and self.start_dt is None and self.end_dt is None
+
+
+def _datetime_fields(datetime: dt.datetime) -> typing.Tuple[int, ...]:
+    return (
+        datetime.year,
+        datetime.month,
+        datetime.day,
+        datetime.hour,
+        datetime.minute,
+        datetime.second,
+        datetime.microsecond,
+    )
+
+
+class _RecordMatcher:
+    """PeopleFilter compiled for datetime_regex of the reader"""
+
+    def __init__(self, people_filter: PeopleFilter, datetime_regex: str):
+        self._filter = people_filter
+        self._full_names = people_filter.full_names
+        self._fields = DateTimeParser(datetime_regex).fields
+        # texts have no microseconds, so 0 is appended to their fields
+        self._start_fields = _datetime_fields(people_filter.start_dt) if people_filter.start_dt else None
+        self._end_fields = _datetime_fields(people_filter.end_dt) if people_filter.end_dt else None
+
+    def accepts_name(self, full_name: str) -> bool:
+        return not self._full_names or full_name in self._full_names
+
+    def accepts_start_text(self, text: str) -> bool:
+        """False only when the text surely comes before start_dt"""
+        if self._start_fields is None:
+            return True
+        fields = self._fields(text)
+        return fields is None or (*fields, 0) >= self._start_fields
+
+    def accepts_end_text(self, text: str) -> bool:
+        """False only when the text surely comes after end_dt"""
+        if self._end_fields is None:
+            return True
+        fields = self._fields(text)
+        return fields is None or (*fields, 0) <= self._end_fields
+
+    def accepts(self, start_time: dt.datetime, end_time: dt.datetime) -> bool:
+        people_filter = self._filter
+        return (people_filter.start_dt is None or people_filter.start_dt <= start_time) and (
+            people_filter.end_dt is None or end_time <= people_filter.end_dt
+        )
+
+    def skip(self):
+        self._filter.skipped += 1
+
+
+def _matcher(people_filter: typing.Optional[PeopleFilter], datetime_regex: str) -> typing.Optional[_RecordMatcher]:
+    return _RecordMatcher(people_filter, datetime_regex) if people_filter and not people_filter.is_empty() else None
+
+
+SKIPPED_TIME = dt.datetime.min  # time of <start> or <end> which isn't parsed, since the record is skipped
+
+
+class RecordError(typing.NamedTuple):
+    offset: int  # of <person> in bytes of the input, decompressed ones for compressed files
+    full_name: typing.Optional[str]
+    error: Exception
+
+
+class RecordErrors:
+    """
+    Errors of records tolerated by lenient readers: records with an exception of RECORD_EXCEPTIONS are skipped
+    instead of raising it, the errors are counted by their types and passed to quarantine.
+    Broken xml is still raised as ParseError, as the rest of the file can't be read after it.
+    """
+
+    def __init__(self, quarantine: typing.Optional[typing.Callable[[RecordError], None]] = None):
+        self._quarantine = quarantine
+        self.counts: typing.Counter[str] = Counter()
+
+    def __len__(self) -> int:
+        return sum(self.counts.values())
+
+    def add(self, record_error: RecordError):
+        self.counts[type(record_error.error).__name__] += 1
+        if self._quarantine is not None:
+            self._quarantine(record_error)
+
+    def shifted(self, offset: int) -> "RecordErrors":
+        """The same errors for a reader of the input starting at the given offset"""
+        return _ShiftedRecordErrors(self, offset)
+
+
+class _ShiftedRecordErrors(RecordErrors):
+    def __init__(self, record_errors: RecordErrors, offset: int):
+        super().__init__()
+        self._record_errors = record_errors
+        self._offset = offset
+        self.counts = record_errors.counts
+
+    def add(self, record_error: RecordError):
+        self._record_errors.add(record_error._replace(offset=record_error.offset + self._offset))
+
+
 class PeopleReader:
-    def __init__(self, filename: typing.Union[FilePath, typing.IO], datetime_regex: str):
+    tolerates_record_errors = False  # whether record_errors may be given
+
+    def __init__(
+        self,
+        filename: Source,
+        datetime_regex: str,
+        datetime_parser_factory: DateTimeParserFactory = DateTimeParser,
+        record_errors: typing.Optional[RecordErrors] = None,
+    ):
+        """With record_errors broken records are skipped and added to them instead of being raised"""
+        if record_errors is not None and not self.tolerates_record_errors:
+            raise ValueError(f"{type(self).__name__} doesn't tolerate errors of records.")
         self._filename = filename
         self._datetime_regex = datetime_regex
+        self._datetime_parser_factory = datetime_parser_factory
+        self._record_errors = record_errors
 
-    def read_attendance(self) -> typing.Iterable[PersonWithTime]:
+    def read_attendance(self, people_filter: typing.Optional[PeopleFilter] = None) -> typing.Iterable[PersonWithTime]:
+        """Only people matching people_filter are read when it's given"""
         raise NotImplementedError
 
 
 class XMLPeopleReader(PeopleReader):
-    def read_attendance(self) -> typing.Iterable[PersonWithTime]:
+    def _iterparse(self) -> typing.Iterator[typing.Tuple[str, ETree.Element]]:
+        # use pull parser not to load the whole ElementTree and to read tags as they're parsed
+        parser = ETree.XMLPullParser(events=(EVENT_START, EVENT_END))
+        with open_input(self._filename) as chunks:
+            for chunk in chunks:
+                parser.feed(chunk)
+                yield from parser.read_events()
+        parser.close()
+        yield from parser.read_events()
+
+    def read_attendance(self, people_filter: typing.Optional[PeopleFilter] = None) -> typing.Iterable[PersonWithTime]:
         """
         Used to read and convert given source(path or file) with xml to collection of PersonWithTime
+        matching people_filter if it's given
         :raises xml.etree.ElementTree.ParseError when parsing has gone wrong
         :raises UnrecognizableDateTime when datetime_regex couldn't be used to match datetime in start or end tag
         :raises UnknownPersonFullNameException when person tag has no full_name attribute
@@ -60,14 +275,19 @@ class XMLPeopleReader(PeopleReader):
         :raises WrongFormatOfFileException when format of given xml file is wrong
         :raises WrongTimeException when time in <start> comes after time in <end>
         """
-        # use iterparse not to load the whole ElementTree and to read tags as they're parsed
-        xml = ETree.iterparse(self._filename, events=(EVENT_START, EVENT_END))
+        xml = self._iterparse()
+        parse_datetime = self._datetime_parser_factory(self._datetime_regex)
+        matcher = _matcher(people_filter, self._datetime_regex)
         element: ETree.Element
+        root: typing.Optional[ETree.Element] = None
         person_full_name: typing.Optional[str] = None
         start_time: typing.Optional[dt.datetime] = None
         end_time: typing.Optional[dt.datetime] = None
+        skipped = False  # record doesn't match the filter, its datetimes aren't parsed
         while True:
             event, element = next(xml)
+            if root is None:
+                root = element
             if element.tag == TAG_PERSON:
                 if event == EVENT_START:
                     start_time: typing.Optional[dt.datetime] = None
@@ -76,34 +296,336 @@ class XMLPeopleReader(PeopleReader):
 
                     if person_full_name is None:
                         raise UnknownPersonFullNameException
+                    skipped = matcher is not None and not matcher.accepts_name(person_full_name)
 
                 elif event == EVENT_END:  # <person> closed
                     if any(attr is None for attr in (person_full_name, start_time, end_time)):
                         raise WrongStructureOfFileException
 
-                    if start_time > end_time:
-                        raise WrongTimeException(
-                            f"Time in start tag ({start_time.strftime('%d-%m-%Y %H:%M:%S')}) "
-                            f"cannot come after time in end tag({end_time.strftime('%d-%m-%Y %H:%M:%S')})."
-                        )
-
-                    yield PersonWithTime(person_full_name, start_time, end_time)
-                    # clear <person> and its children
+                    if not skipped:
+                        check_time(start_time, end_time)
+                        skipped = matcher is not None and not matcher.accepts(start_time, end_time)
+                    if skipped:
+                        matcher.skip()
+                    else:
+                        yield PersonWithTime(person_full_name, start_time, end_time)
+                    # clear <person> and its children, drop cleared ones from the root not to keep them all
                     element.clear()
+                    root.clear()
 
-            elif element.tag == TAG_START:
+            elif element.tag == TAG_START and event == EVENT_END:  # text may be incomplete on EVENT_START
                 text = element.text if element.text else ""
+                skipped = skipped or (matcher is not None and not matcher.accepts_start_text(text))
+                if skipped:
+                    start_time = SKIPPED_TIME
+                    continue
                 try:
-                    start_time = parse_datetime(text, self._datetime_regex)
+                    start_time = parse_datetime(text)
                 except ValueError:
                     raise UnrecognizableDateTimeException(self._datetime_regex, text)
 
             elif element.tag == TAG_END and event == EVENT_END:
                 text = element.text if element.text else ""
+                skipped = skipped or (matcher is not None and not matcher.accepts_end_text(text))
+                if skipped:
+                    end_time = SKIPPED_TIME
+                    continue
                 try:
-                    end_time = parse_datetime(text, self._datetime_regex)
+                    end_time = parse_datetime(text)
                 except ValueError:
                     raise UnrecognizableDateTimeException(self._datetime_regex, text)
 
             elif element.tag == TAG_PEOPLE and event == EVENT_END:
                 break
+
+
+class LxmlPeopleReader(XMLPeopleReader):
+    """XMLPeopleReader over lxml.etree.iterparse, lxml errors are raised as xml.etree.ElementTree.ParseError"""
+
+    def _iterparse(self) -> typing.Iterator[typing.Tuple[str, ETree.Element]]:
+        _import_lxml()
+        parser = lxml_etree.XMLPullParser(events=(EVENT_START, EVENT_END))
+        try:
+            with open_input(self._filename) as chunks:
+                for chunk in chunks:
+                    parser.feed(chunk)
+                    yield from parser.read_events()
+            parser.close()
+            yield from parser.read_events()
+        except lxml_etree.XMLSyntaxError as error:
+            raise ETree.ParseError(str(error)) from None
+
+
+def _to_parse_error(error: expat.ExpatError) -> ETree.ParseError:
+    parse_error = ETree.ParseError(f"{expat.ErrorString(error.code)}: line {error.lineno}, column {error.offset}")
+    parse_error.code = error.code
+    parse_error.position = (error.lineno, error.offset)
+    return parse_error
+
+
+class ExpatPeopleReader(PeopleReader):
+    """
+    Reader over callbacks of xml.parsers.expat: no elements are built, only full_name and times of the current
+    person are kept. People are read like XMLPeopleReader does and the same exceptions are raised,
+    errors of expat are raised as xml.etree.ElementTree.ParseError.
+    """
+
+    tolerates_record_errors = True
+
+    def read_attendance(self, people_filter: typing.Optional[PeopleFilter] = None) -> typing.Iterable[PersonWithTime]:
+        """
+        People matching people_filter if it's given
+        :raises xml.etree.ElementTree.ParseError when parsing has gone wrong
+        :raises UnrecognizableDateTime when datetime_regex couldn't be used to match datetime in start or end tag
+        :raises UnknownPersonFullNameException when person tag has no full_name attribute
+        :raises WrongFormatOfFileException when format of given xml file is wrong or people tag is not closed
+        :raises WrongTimeException when time in <start> comes after time in <end>
+        """
+        parse_datetime = self._datetime_parser_factory(self._datetime_regex)
+        matcher = _matcher(people_filter, self._datetime_regex)
+        record_errors = self._record_errors
+        people: typing.List[PersonWithTime] = []  # people of the chunk being parsed
+        person_full_name: typing.Optional[str] = None
+        start_time: typing.Optional[dt.datetime] = None
+        end_time: typing.Optional[dt.datetime] = None
+        skipped = False  # record doesn't match the filter, its datetimes aren't parsed
+        broken: typing.Optional[Exception] = None  # error of the record tolerated with record_errors
+        record_offset = 0
+        text_parts: typing.List[str] = []  # text of <start> or <end> before their first child, like element.text
+        collecting_text = False
+        closed = False  # </people> is met, the rest of the file is ignored
+
+        def fail(error: Exception):
+            """Raises the error, with record_errors the record is marked as broken and the rest of it is skipped"""
+            nonlocal broken, skipped
+            if record_errors is None:
+                raise error
+            broken = broken or error
+            skipped = True
+
+        def start_element(tag: str, attributes: typing.Dict[str, str]):
+            nonlocal person_full_name, start_time, end_time, skipped, text_parts, collecting_text, broken, record_offset
+            if closed:
+                return
+            if tag == TAG_PERSON:
+                start_time, end_time = None, None
+                person_full_name = attributes.get("full_name", None)
+                if record_errors is not None:
+                    broken, record_offset = None, parser.CurrentByteIndex
+                skipped = (
+                    person_full_name is not None and matcher is not None and not matcher.accepts_name(person_full_name)
+                )
+                if person_full_name is None:
+                    fail(UnknownPersonFullNameException())
+            collecting_text = tag in (TAG_START, TAG_END)
+            if collecting_text:
+                text_parts = []
+
+        def character_data(data: str):
+            if collecting_text:
+                text_parts.append(data)
+
+        def end_element(tag: str):
+            nonlocal start_time, end_time, skipped, collecting_text, closed
+            collecting_text = False
+            if closed:
+                return
+            if tag == TAG_PERSON:
+                if broken is None:
+                    if any(attr is None for attr in (person_full_name, start_time, end_time)):
+                        fail(WrongStructureOfFileException())
+                    elif not skipped:
+                        try:
+                            check_time(start_time, end_time)
+                        except WrongTimeException as error:
+                            fail(error)
+                if broken is not None:
+                    record_errors.add(RecordError(record_offset, person_full_name, broken))
+                    return
+                if not skipped:
+                    skipped = matcher is not None and not matcher.accepts(start_time, end_time)
+                if skipped:
+                    matcher.skip()
+                else:
+                    people.append(PersonWithTime(person_full_name, start_time, end_time))
+            elif tag in (TAG_START, TAG_END):
+                text = "".join(text_parts)
+                if matcher is not None and not skipped:
+                    skipped = not (matcher.accepts_start_text if tag == TAG_START else matcher.accepts_end_text)(text)
+                if skipped:
+                    time = SKIPPED_TIME
+                else:
+                    try:
+                        time = parse_datetime(text)
+                    except ValueError:
+                        fail(UnrecognizableDateTimeException(self._datetime_regex, text))
+                        time = SKIPPED_TIME
+                if tag == TAG_START:
+                    start_time = time
+                else:
+                    end_time = time
+            elif tag == TAG_PEOPLE:
+                closed = True
+
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.StartElementHandler = start_element
+        parser.EndElementHandler = end_element
+        parser.CharacterDataHandler = character_data
+        with open_input(self._filename) as chunks:
+            for chunk in itertools.chain(chunks, (b"",)):  # the empty chunk finishes parsing
+                try:
+                    parser.Parse(chunk, not chunk)
+                except expat.ExpatError as error:
+                    yield from people
+                    if closed:  # e.g. junk after </people>
+                        return
+                    raise _to_parse_error(error) from None
+                except Exception:  # exceptions of callbacks come after people parsed before them
+                    yield from people
+                    raise
+                yield from people
+                people.clear()
+                if closed:
+                    return
+        if not closed:
+            raise WrongStructureOfFileException
+
+
+class _ChainedSource:
+    """File-like object reading head and then chunks, which may be longer than the requested size"""
+
+    def __init__(self, head: bytes, chunks: typing.Iterator[typing.Union[bytes, memoryview]]):
+        self._head = head
+        self._chunks = chunks
+
+    def read(self, n_bytes: int = -1) -> typing.Union[bytes, memoryview]:
+        if not self._head:
+            return next(self._chunks, b"")
+        chunk = self._head if n_bytes < 0 else self._head[:n_bytes]
+        self._head = self._head[len(chunk) :]  # noqa: E203
+        return chunk
+
+
+XML_WHITESPACE = rb"[ \t\r\n]*"
+SCANNER_HEADER = re.compile(
+    rb"(?:\xef\xbb\xbf)?" + XML_WHITESPACE + rb"(?P<declaration><\?xml[^?>]*\?>)?" + XML_WHITESPACE + rb"<people>"
+)
+SCANNER_ENCODING = re.compile(rb"""encoding=["']([^"']*)["']""")
+SCANNER_PERSON = re.compile(
+    XML_WHITESPACE
+    + rb'<person[ \t\r\n]+full_name="([^"&<\t\r\n]*)"'
+    + XML_WHITESPACE
+    + rb">"
+    + XML_WHITESPACE
+    + rb"<start>([^<&\r]*)</start>"
+    + XML_WHITESPACE
+    + rb"<end>([^<&\r]*)</end>"
+    + XML_WHITESPACE
+    + rb"</person>"
+)
+SCANNER_PEOPLE_CLOSING = re.compile(XML_WHITESPACE + rb"</people>")
+UTF8_ENCODINGS = {b"utf-8", b"utf8", b"us-ascii", b"ascii"}
+SCANNER_LOOKAHEAD = DEFAULT_READ_BUFFER  # records and the header longer than that are left for the parser
+
+
+class ScannerPeopleReader(PeopleReader):
+    """
+    Byte-level scanner for the flat layout of exports: <people> with <person full_name="..."> tags having only
+    <start> and <end> inside, in UTF-8, without entities, comments or other attributes.
+    Records are matched by a regular expression without any parser. The rest of the file starting from
+    the first record in another layout is read by ExpatPeopleReader, so any well-formed file is read
+    like XMLPeopleReader does and broken ones raise the same exceptions.
+    """
+
+    tolerates_record_errors = True
+
+    def read_attendance(self, people_filter: typing.Optional[PeopleFilter] = None) -> typing.Iterable[PersonWithTime]:
+        """Raises the same exceptions as ExpatPeopleReader.read_attendance"""
+        parse_datetime = self._datetime_parser_factory(self._datetime_regex)
+        matcher = _matcher(people_filter, self._datetime_regex)
+        record_errors = self._record_errors
+        with open_input(self._filename) as chunks:
+            buffer, eof = b"", False
+            consumed = 0  # bytes of the input dropped from the buffer
+            header = None
+            while header is None and not eof and len(buffer) <= SCANNER_LOOKAHEAD:
+                chunk = next(chunks, b"")
+                eof = not chunk
+                buffer += chunk
+                header = SCANNER_HEADER.match(buffer)
+            declaration = header.group("declaration") if header else None
+            encoding = SCANNER_ENCODING.search(declaration) if declaration else None
+            if header is None or (encoding and encoding.group(1).lower() not in UTF8_ENCODINGS):
+                yield from ExpatPeopleReader(
+                    _ChainedSource(buffer, chunks), self._datetime_regex, self._datetime_parser_factory, record_errors
+                ).read_attendance(people_filter)
+                return
+
+            position = header.end()
+            prefix = buffer[:position]
+            while True:
+                match = SCANNER_PERSON.match(buffer, position)
+                if match is not None:
+                    try:
+                        full_name, start_text, end_text = (group.decode() for group in match.groups())
+                    except UnicodeDecodeError:  # left for the parser to raise
+                        match = None
+                if (
+                    match is not None
+                    and matcher is not None
+                    and not (
+                        matcher.accepts_name(full_name)
+                        and matcher.accepts_start_text(start_text)
+                        and matcher.accepts_end_text(end_text)
+                    )
+                ):
+                    matcher.skip()
+                    position = match.end()
+                elif match is not None:
+                    try:
+                        try:
+                            start_time = parse_datetime(start_text)
+                        except ValueError:
+                            raise UnrecognizableDateTimeException(self._datetime_regex, start_text)
+                        try:
+                            end_time = parse_datetime(end_text)
+                        except ValueError:
+                            raise UnrecognizableDateTimeException(self._datetime_regex, end_text)
+                        check_time(start_time, end_time)
+                    except RECORD_EXCEPTIONS as error:
+                        if record_errors is None:
+                            raise
+                        offset = consumed + buffer.index(b"<person", match.start())
+                        record_errors.add(RecordError(offset, full_name, error))
+                        position = match.end()
+                        continue
+                    if matcher is None or matcher.accepts(start_time, end_time):
+                        yield PersonWithTime(full_name, start_time, end_time)
+                    else:
+                        matcher.skip()
+                    position = match.end()
+                elif SCANNER_PEOPLE_CLOSING.match(buffer, position):
+                    return
+                elif not eof and len(buffer) - position <= SCANNER_LOOKAHEAD:  # the record may be cut by the chunk
+                    chunk = next(chunks, b"")
+                    eof = not chunk
+                    buffer = buffer[position:] + chunk
+                    consumed += position
+                    position = 0
+                else:
+                    rest = _ChainedSource(prefix + buffer[position:], chunks)
+                    if record_errors is not None:  # offsets of the rest are shifted by the prefix put before it
+                        record_errors = record_errors.shifted(consumed + position - len(prefix))
+                    yield from ExpatPeopleReader(
+                        rest, self._datetime_regex, self._datetime_parser_factory, record_errors
+                    ).read_attendance(people_filter)
+                    return
+
+
+PARSERS: typing.Dict[str, typing.Type[PeopleReader]] = {
+    "etree": XMLPeopleReader,
+    "expat": ExpatPeopleReader,
+    "lxml": LxmlPeopleReader,
+    "scanner": ScannerPeopleReader,
+}
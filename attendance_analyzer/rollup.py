@@ -0,0 +1,103 @@
+import csv
+import datetime as dt
+import typing
+from collections import defaultdict
+
+from .writer import format_duration, quote
+
+__all__ = ("DEPARTMENT", "ROLLUPS", "UNASSIGNED", "Rollups", "read_departments")
+
+DAY, WEEK, MONTH, EMPLOYEE, DEPARTMENT = "day", "week", "month", "employee", "department"
+ROLLUPS = (DAY, WEEK, MONTH, EMPLOYEE, DEPARTMENT)
+HEADERS = {DAY: "date", WEEK: "week", MONTH: "month", EMPLOYEE: "name", DEPARTMENT: "department"}
+UNASSIGNED = ""  # department of employees missing from the mapping
+
+Key = typing.Hashable
+FORMATTERS: typing.Dict[str, typing.Callable[[Key], str]] = {
+    DAY: lambda date: date.strftime("%d-%m-%Y"),
+    WEEK: lambda week: f"{week[0]}-W{week[1]:02d}",
+    MONTH: lambda month: f"{month[1]:02d}-{month[0]}",
+    EMPLOYEE: str,
+    DEPARTMENT: str,
+}
+
+
+def read_departments(file: typing.TextIO) -> typing.Dict[str, str]:
+    """Full names mapped to departments by csv rows 'full_name,department', header 'name,department' is skipped"""
+    departments = {}
+    for line, row in enumerate(csv.reader(file), start=1):
+        if not row:
+            continue
+        if len(row) != 2:
+            raise ValueError(f"Line {line} of departments is not 'full_name,department'.")
+        if line == 1 and tuple(row) == ("name", "department"):
+            continue
+        departments[row[0]] = row[1]
+    return departments
+
+
+class Rollups:
+    """
+    Sums durations of the finest grouping by employee and day into the coarser ones in a single pass over it:
+    by day, ISO week, month, employee and department, so records are read and grouped only once.
+    """
+
+    def __init__(self, rollups: typing.Iterable[str], departments: typing.Optional[typing.Dict[str, str]] = None):
+        rollups = set(rollups)
+        if DEPARTMENT in rollups and departments is None:
+            raise ValueError("Rollup by department requires the mapping of employees to departments.")
+        self._departments = departments or {}
+        self._sums: typing.Dict[str, typing.DefaultDict[Key, int]] = {
+            rollup: defaultdict(int) for rollup in ROLLUPS if rollup in rollups
+        }
+        self._periods: typing.Dict[dt.date, typing.Tuple[typing.Tuple[int, int], typing.Tuple[int, int]]] = {}
+
+    def _period(self, date: dt.date) -> typing.Tuple[typing.Tuple[int, int], typing.Tuple[int, int]]:
+        """ISO week and month of the date, they're memoized as the finest grouping repeats days for every employee"""
+        period = self._periods.get(date)
+        if period is None:
+            year, week, _ = date.isocalendar()
+            period = self._periods[date] = ((year, week), (date.year, date.month))
+        return period
+
+    def update(self, person_date_durations_in_sec: typing.Iterable[typing.Tuple[typing.Tuple[dt.date, str], int]]):
+        by_day, by_week = self._sums.get(DAY), self._sums.get(WEEK)
+        by_month, by_employee = self._sums.get(MONTH), self._sums.get(EMPLOYEE)
+        by_department, departments = self._sums.get(DEPARTMENT), self._departments
+        for (date, name), duration in person_date_durations_in_sec:
+            if by_day is not None:
+                by_day[date] += duration
+            if by_week is not None or by_month is not None:
+                week, month = self._period(date)
+                if by_week is not None:
+                    by_week[week] += duration
+                if by_month is not None:
+                    by_month[month] += duration
+            if by_employee is not None:
+                by_employee[name] += duration
+            if by_department is not None:
+                by_department[departments.get(name, UNASSIGNED)] += duration
+
+    def items(self, rollup: str) -> typing.List[typing.Tuple[Key, int]]:
+        """Sums of the rollup sorted by keys: dates, (ISO year, week), (year, month), names or departments"""
+        return sorted(self._sums[rollup].items())
+
+    def write_out(
+        self,
+        output: typing.TextIO,
+        select: typing.Optional[
+            typing.Callable[[typing.Iterable[typing.Tuple[Key, int]]], typing.Iterable[typing.Tuple[Key, int]]]
+        ] = None,
+    ):
+        """
+        Rollups are written as csv sections in the order of ROLLUPS, sections are separated by an empty line.
+        Rows of every section may be selected by select like logic.select_durations instead of being sorted by keys.
+        """
+        for index, rollup in enumerate(self._sums):
+            format_key = FORMATTERS[rollup]
+            lines = [f"{HEADERS[rollup]},duration\r\n"]
+            lines.extend(
+                f"{quote(format_key(key))},{quote(format_duration(duration))}\r\n"
+                for key, duration in (select(self._sums[rollup].items()) if select else self.items(rollup))
+            )
+            output.write(("\r\n" if index else "") + "".join(lines))
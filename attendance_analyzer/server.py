@@ -0,0 +1,241 @@
+import asyncio
+import datetime as dt
+import io
+import itertools
+import os
+import sys
+import typing
+from functools import lru_cache, partial
+from urllib.parse import parse_qs, urlsplit
+
+import click
+
+from . import reader, vectorized
+from .helpers import PersonWithTime, parse_datetime
+from .logic import GroupingService, GroupingServiceFactory, PeopleIndex, PeopleRepository
+from .writer import FastCSVWriter
+
+__all__ = ("DEFAULT_CACHE_SIZE", "QUERY_PATH", "AttendanceQueryService", "AttendanceServer", "main")
+
+DEFAULT_CACHE_SIZE = 256
+QUERY_PATH = "/attendance"
+TRUE_VALUES = ("1", "true", "yes")
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+Response = typing.Tuple[int, str, bytes]  # status, content type and body
+
+
+class AttendanceQueryService:
+    """
+    Answers queries of the command over people loaded once and kept in PeopleIndex.
+    Answers are csv texts the command would write, the most recent ones are kept in an LRU cache.
+    """
+
+    def __init__(
+        self,
+        people: typing.Iterable[PersonWithTime],
+        grouping_service_factory: GroupingServiceFactory = GroupingService,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ):
+        self._index = PeopleIndex(people)
+        self._grouping_service_factory = grouping_service_factory
+        self._answer_cached = lru_cache(maxsize=cache_size)(self._answer)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _answer(
+        self,
+        group: bool,
+        people_to_filter: typing.Tuple[str, ...],
+        start_dt: typing.Optional[dt.datetime],
+        end_dt: typing.Optional[dt.datetime],
+    ) -> str:
+        grouping_service = self._grouping_service_factory(self._index.query(people_to_filter, start_dt, end_dt))
+        output = io.StringIO()
+        if group:
+            grouping = grouping_service.group_people_with_time_by_person_and_day()
+            FastCSVWriter(output).write_out_person_and_date_to_duration_in_seconds_mapping(grouping)
+        else:
+            grouping = grouping_service.group_people_with_time_by_day()
+            FastCSVWriter(output).write_out_date_to_duration_in_seconds_mapping(grouping)
+        return output.getvalue()
+
+    def answer(
+        self,
+        group: bool,
+        people_to_filter: typing.Iterable[str] = (),
+        start_dt: typing.Optional[dt.datetime] = None,
+        end_dt: typing.Optional[dt.datetime] = None,
+    ) -> str:
+        # filters are normalized, so the same query written differently hits the cache
+        return self._answer_cached(group, tuple(sorted(set(people_to_filter))), start_dt, end_dt)
+
+    def cache_info(self) -> typing.Tuple[int, int, typing.Optional[int], int]:
+        """Hits, misses, maximal and current size of the cache of answers"""
+        return self._answer_cached.cache_info()
+
+
+class AttendanceServer:
+    """
+    HTTP/1.1 server over asyncio answering GET /attendance?group=1&person=ivan&start=01-12-2011&end=31-12-2011,
+    parameters match options of the command. Connections are kept alive unless the client closes them.
+    """
+
+    def __init__(self, service: AttendanceQueryService):
+        self._service = service
+
+    def respond(self, method: str, target: str) -> Response:
+        url = urlsplit(target)
+        if url.path != QUERY_PATH:
+            return 404, "text/plain", f"Only {QUERY_PATH} is served.".encode()
+        if method != "GET":
+            return 405, "text/plain", b"Only GET is allowed."
+        query = parse_qs(url.query)
+        try:
+            start = query.get("start", [None])[-1]
+            start_dt = parse_datetime(start, "%d-%m-%Y") if start else None
+        except ValueError:
+            return 400, "text/plain", b"Provided start date does not match '%d-%m-%Y'."
+        try:
+            end = query.get("end", [None])[-1]
+            end_dt = dt.datetime.combine(parse_datetime(end, "%d-%m-%Y"), dt.time.max) if end else None
+        except ValueError:
+            return 400, "text/plain", b"Provided end date does not match '%d-%m-%Y'."
+        group = query.get("group", ["0"])[-1].lower() in TRUE_VALUES
+        body = self._service.answer(group, query.get("person", ()), start_dt, end_dt)
+        return 200, "text/csv; charset=utf-8", body.encode()
+
+    async def handle_connection(self, stream_reader: asyncio.StreamReader, stream_writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await stream_reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await stream_reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if int(headers.get("content-length", 0)):  # bodies of requests are not used
+                    await stream_reader.readexactly(int(headers["content-length"]))
+
+                parts = request_line.decode("latin-1").split()
+                if len(parts) != 3:
+                    status, content_type, body = 400, "text/plain", b"Malformed request line."
+                else:
+                    # queries and groupings run in a thread, so the loop keeps serving other connections meanwhile
+                    loop = asyncio.get_running_loop()
+                    status, content_type, body = await loop.run_in_executor(None, self.respond, parts[0], parts[1])
+                keep_alive = len(parts) == 3 and parts[2] == "HTTP/1.1" and headers.get("connection") != "close"
+                stream_writer.write(
+                    (
+                        f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                        f"Content-Type: {content_type}\r\n"
+                        f"Content-Length: {len(body)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    ).encode("latin-1")
+                    + body
+                )
+                await stream_writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            stream_writer.close()
+
+    async def start(
+        self, host: str = "127.0.0.1", port: int = 8080, socket_path: typing.Optional[str] = None
+    ) -> asyncio.AbstractServer:
+        """Listens on the unix socket if socket_path is given, otherwise on host and port"""
+        if socket_path is not None:
+            return await asyncio.start_unix_server(self.handle_connection, socket_path)
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def _serve(server: AttendanceServer, host: str, port: int, socket_path: typing.Optional[str]):
+    listening = await server.start(host, port, socket_path)
+    addresses = ", ".join(str(sock.getsockname()) for sock in listening.sockets)
+    click.echo(f"Serving on {addresses}", err=True)
+    async with listening:
+        await listening.serve_forever()
+
+
+@click.command(help="Server answering queries of the command over xml-files loaded once.")
+@click.option(
+    "--input",
+    "-in",
+    "filenames",
+    type=click.Path(exists=True, dir_okay=False),
+    multiple=True,
+    required=True,
+    help="Input file, option may be used multiple times to serve records of all of them.",
+)
+@click.option(
+    "--regex", "datetime_regex", default="%d-%m-%Y %H:%M:%S", help="Regular expression to use for parsing datetime."
+)
+@click.option("--host", default="127.0.0.1", help="Host to listen on.")
+@click.option("--port", type=click.IntRange(min=0, max=65535), default=8080, help="Port to listen on.")
+@click.option("--socket", "socket_path", type=click.Path(dir_okay=False), help="Unix socket to listen on instead.")
+@click.option(
+    "--cache-size",
+    type=click.IntRange(min=0),
+    default=DEFAULT_CACHE_SIZE,
+    help="Number of recent answers kept in memory.",
+)
+@click.option(
+    "--backend",
+    type=click.Choice(["python", "numpy"]),
+    default="python",
+    help="Backend for grouping, numpy one works over arrays and requires numpy to be installed.",
+)
+@click.option(
+    "--split-days",
+    "split_by_day",
+    is_flag=True,
+    default=False,
+    help="Flag for splitting durations crossing midnight between all days they touch.",
+)
+@click.option("--parser", type=click.Choice(list(reader.PARSERS)), default="etree", help="Backend for reading xml.")
+def main(
+    filenames: typing.Tuple[str],
+    datetime_regex: str,
+    host: str,
+    port: int,
+    socket_path: typing.Optional[str],
+    cache_size: int,
+    backend: str = "python",
+    split_by_day: bool = False,
+    parser: str = "etree",
+):
+    if backend == "numpy" and not vectorized.is_available():
+        raise click.BadOptionUsage("backend", "Backend numpy requires numpy to be installed.")
+    if parser == "lxml" and not reader.is_lxml_available():
+        raise click.BadOptionUsage("parser", "Parser lxml requires lxml to be installed.")
+    repositories = [
+        PeopleRepository(reader_obj=reader.PARSERS[parser](filename, datetime_regex)) for filename in filenames
+    ]
+    try:
+        service = AttendanceQueryService(
+            itertools.chain.from_iterable(repository.get_all_people() for repository in repositories),
+            partial(
+                vectorized.ArrayGroupingService if backend == "numpy" else GroupingService, split_by_day=split_by_day
+            ),
+            cache_size,
+        )
+    except reader.RECORD_EXCEPTIONS as e:
+        raise click.ClickException(reader.describe_error(e))
+    except Exception:
+        raise click.BadArgumentUsage(f"Impossible to parse {', '.join(filenames)}.")
+    click.echo(f"Loaded {len(service)} records from {len(filenames)} files (pid {os.getpid()})", err=True)
+    try:
+        asyncio.run(_serve(AttendanceServer(service), host, port, socket_path))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main(prog_name="attendance_analyzer.server"))
@@ -0,0 +1,109 @@
+import contextlib
+import gzip
+import mmap
+import typing
+from functools import partial
+
+# zstandard is an optional dependency, it's imported by _import_zstandard only for zstd files, as it's slow to load
+zstandard = None
+
+__all__ = (
+    "DEFAULT_READ_BUFFER",
+    "GZIP",
+    "ZSTD",
+    "InputFile",
+    "detect_compression",
+    "is_zstd_available",
+    "open_input",
+)
+
+DEFAULT_READ_BUFFER = 64 * 1024
+GZIP, ZSTD = "gzip", "zstd"
+MAGIC_NUMBERS = {b"\x1f\x8b": GZIP, b"\x28\xb5\x2f\xfd": ZSTD}
+
+FilePath = str
+
+
+class InputFile(typing.NamedTuple):
+    """Path of the input with the way it's read: chunks of read_buffer bytes or views of the mapped file"""
+
+    path: FilePath
+    read_buffer: int = DEFAULT_READ_BUFFER
+    use_mmap: bool = False
+
+
+Source = typing.Union[FilePath, InputFile, typing.IO]
+
+
+def is_zstd_available() -> bool:
+    """Imports zstandard on the first call, so it's called only once zstandard is going to be used"""
+    try:
+        _import_zstandard()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _import_zstandard():
+    """:raises RuntimeError when zstandard is not installed"""
+    global zstandard
+    if zstandard is not None:
+        return
+    try:
+        import zstandard as module
+    except ImportError:
+        raise RuntimeError("zstandard is required for reading zstd files.")
+    zstandard = module
+
+
+def detect_compression(filename: FilePath) -> typing.Optional[str]:
+    """:returns GZIP or ZSTD by magic number of the file, None for uncompressed files"""
+    with open(filename, "rb") as file:
+        head = file.read(max(map(len, MAGIC_NUMBERS)))
+    return next((compression for magic, compression in MAGIC_NUMBERS.items() if head.startswith(magic)), None)
+
+
+def _iter_mapped(file: typing.BinaryIO, read_buffer: int) -> typing.Iterator[memoryview]:
+    try:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:  # empty file can't be mapped
+        return
+    view = memoryview(mapping)
+    try:
+        for position in range(0, len(view), read_buffer):
+            yield view[position : position + read_buffer]  # noqa: E203
+    finally:
+        view.release()
+        try:
+            mapping.close()
+        except BufferError:  # a chunk is still referenced, the mapping is closed once it's collected
+            pass
+
+
+@contextlib.contextmanager
+def open_input(source: Source) -> typing.Iterator[typing.Iterator[typing.Union[bytes, memoryview]]]:
+    """
+    Chunks of the source for feeding parsers: paths are read in large chunks with unbuffered reads,
+    or as views of the mapped file with use_mmap, gzip and zstd files are decompressed as they're read
+    (use_mmap is ignored for them). File-like objects are read in DEFAULT_READ_BUFFER chunks and left open.
+    :raises RuntimeError for zstd files when zstandard is not installed
+    """
+    if not isinstance(source, (str, InputFile)):
+        yield iter(partial(source.read, DEFAULT_READ_BUFFER), b"")
+        return
+    if isinstance(source, str):
+        source = InputFile(source)
+
+    compression = detect_compression(source.path)
+    with open(source.path, "rb", buffering=0) as file:
+        if compression == GZIP:
+            with gzip.GzipFile(fileobj=file) as decompressed:
+                yield iter(partial(decompressed.read, source.read_buffer), b"")
+        elif compression == ZSTD:
+            _import_zstandard()
+            with zstandard.ZstdDecompressor().stream_reader(file, read_size=source.read_buffer) as decompressed:
+                yield iter(partial(decompressed.read, source.read_buffer), b"")
+        elif source.use_mmap:
+            yield _iter_mapped(file, source.read_buffer)
+        else:
+            yield iter(partial(file.read, source.read_buffer), b"")
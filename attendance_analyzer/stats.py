@@ -0,0 +1,172 @@
+import contextlib
+import datetime as dt
+import sys
+import time
+import typing
+
+from .helpers import DateTimeParser, PersonWithTime
+from .reader import PeopleFilter, PeopleReader
+
+try:
+    import resource
+except ImportError:  # resource is available only on unix
+    resource = None
+
+__all__ = ("STAGES", "PipelineStats", "peak_memory", "timed")
+
+READ, DATETIME, FILTER, MERGE, GROUP, WRITE = "read", "datetime", "filter", "merge", "group", "write"
+STAGES = (READ, DATETIME, FILTER, MERGE, GROUP, WRITE)
+
+T = typing.TypeVar("T")
+
+
+def peak_memory() -> typing.Optional[int]:
+    """Peak resident set size of the process in bytes, None where it's unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _Stage:
+    def __init__(self, upstream: typing.Optional[str]):
+        self.upstream = upstream
+        self.records = 0
+        self.seconds = 0.0  # including time of the upstream stage, which is pulled by this one
+
+
+class _CountingReader(PeopleReader):
+    def __init__(self, reader_obj: PeopleReader, stats: "PipelineStats"):
+        super().__init__(reader_obj._filename, reader_obj._datetime_regex)
+        self._reader = reader_obj
+        self._stats = stats
+
+    def read_attendance(self, people_filter: typing.Optional[PeopleFilter] = None) -> typing.Iterable[PersonWithTime]:
+        self._stats.people_filter = people_filter
+        return self._stats.count(READ, self._reader.read_attendance(people_filter))
+
+
+class PipelineStats:
+    """
+    Times and counts stages of the lazy pipeline: iterators of a stage are wrapped with count, which measures
+    time spent in every next (including the upstream stage it pulls records from), other stages are
+    wrapped with timed. Own time of a stage is its time without the time of its upstream stage.
+    """
+
+    def __init__(self, input_size: typing.Optional[int] = None):
+        self._input_size = input_size
+        self._started = time.perf_counter()
+        self._stages: typing.Dict[str, _Stage] = {}
+        self.people_filter: typing.Optional[PeopleFilter] = None  # filter pushed down into the reader
+
+    def _stage(self, name: str, upstream: typing.Optional[str]) -> _Stage:
+        if name not in self._stages:
+            self._stages[name] = _Stage(upstream)
+        return self._stages[name]
+
+    def count(
+        self, name: str, iterable: typing.Iterable[T], upstream: typing.Optional[str] = None
+    ) -> typing.Iterator[T]:
+        """Stage is registered once the first record is pulled, so stages never run aren't reported"""
+        stage = self._stage(name, upstream)
+        iterator = iter(iterable)
+        perf_counter = time.perf_counter
+        while True:
+            started = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                stage.seconds += perf_counter() - started
+                return
+            stage.seconds += perf_counter() - started
+            stage.records += 1
+            yield item
+
+    @contextlib.contextmanager
+    def timed(
+        self, name: str, upstream: typing.Optional[str] = None, records: typing.Optional[int] = None
+    ) -> typing.Iterator[None]:
+        """Records of the stage are the given ones, otherwise the ones pulled from the upstream stage"""
+        stage = self._stage(name, upstream)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage.seconds += time.perf_counter() - started
+            stage.records = records if records is not None else getattr(self._stages.get(upstream), "records", 0)
+
+    def counting_reader(self, reader_obj: PeopleReader) -> PeopleReader:
+        """Reader counting and timing records of the given one as the read stage"""
+        return _CountingReader(reader_obj, self)
+
+    def datetime_parser_factory(self, datetime_regex: str) -> typing.Callable[[str], dt.datetime]:
+        """DateTimeParser timing every parsed text as the datetime stage, it's given to readers"""
+        stage = self._stage(DATETIME, None)
+        parse = DateTimeParser(datetime_regex)
+        perf_counter = time.perf_counter
+
+        def parse_datetime(text: str) -> dt.datetime:
+            started = perf_counter()
+            try:
+                return parse(text)
+            finally:
+                stage.seconds += perf_counter() - started
+                stage.records += 1
+
+        return parse_datetime
+
+    def report(self) -> dict:
+        """Machine-readable stats: seconds, records and records per second of stages, input throughput and memory"""
+        seconds = time.perf_counter() - self._started
+        stages = {}
+        # stages are registered as they're started, the downstream ones first, so they're ordered like the pipeline
+        for name, stage in sorted(self._stages.items(), key=lambda item: STAGES.index(item[0])):
+            upstream = self._stages.get(stage.upstream)
+            own_seconds = max(stage.seconds - (upstream.seconds if upstream else 0.0), 0.0)
+            if name == READ and DATETIME in self._stages:  # datetimes are parsed inside of reading
+                own_seconds = max(own_seconds - self._stages[DATETIME].seconds, 0.0)
+            stages[name] = {
+                "records": stage.records,
+                "seconds": own_seconds,
+                "records_per_second": stage.records / own_seconds if stage.records and own_seconds else None,
+            }
+        read, filtered = self._stages.get(READ), self._stages.get(FILTER)
+        # records skipped by the reader aren't read, they're filtered out as well
+        skipped = self.people_filter.skipped if self.people_filter is not None else 0
+        return {
+            "seconds": seconds,
+            "input_size": self._input_size,
+            "bytes_per_second": self._input_size / seconds if self._input_size is not None and seconds else None,
+            "peak_memory": peak_memory(),
+            "records": read.records + skipped if read else None,
+            "filtered_out": read.records + skipped - filtered.records if read and filtered else None,
+            "stages": stages,
+        }
+
+    @staticmethod
+    def format(report: dict) -> str:
+        lines = [f"{'stage':<10}{'records':>14}{'seconds':>12}{'records/sec':>16}"]
+        for name, stage in report["stages"].items():
+            speed = f"{stage['records_per_second']:,.0f}" if stage["records_per_second"] else "-"
+            lines.append(f"{name:<10}{stage['records']:>14,}{stage['seconds']:>12.3f}{speed:>16}")
+        if report["filtered_out"] is not None:
+            lines.append(f"filtered out {report['filtered_out']:,} of {report['records']:,} records")
+        total = f"total {report['seconds']:.3f} s"
+        if report["bytes_per_second"] is not None:
+            total += f", {report['bytes_per_second'] / 1024 / 1024:.1f} MB/s of input"
+        if report["peak_memory"] is not None:
+            total += f", peak memory {report['peak_memory'] / 1024 / 1024:.1f} MB"
+        lines.append(total)
+        return "\n".join(lines)
+
+
+def timed(
+    pipeline_stats: typing.Optional[PipelineStats],
+    name: str,
+    upstream: typing.Optional[str] = None,
+    records: typing.Optional[int] = None,
+) -> typing.ContextManager:
+    """PipelineStats.timed, which does nothing without stats"""
+    if pipeline_stats is None:
+        return contextlib.nullcontext()
+    return pipeline_stats.timed(name, upstream, records)
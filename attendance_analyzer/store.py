@@ -0,0 +1,91 @@
+import datetime as dt
+import typing
+from array import array
+
+from .helpers import EPOCH, PersonWithTime
+
+__all__ = ("PeopleStore",)
+
+MICROSECOND = dt.timedelta(microseconds=1)
+NAME_ID_TYPECODE, MICROSECONDS_TYPECODE = "i", "q"
+
+
+def to_epoch_microseconds(datetime: dt.datetime) -> int:
+    """:raises ValueError for datetimes with tzinfo, they can't be packed"""
+    if datetime.tzinfo is not None:
+        raise ValueError("Only naive datetimes may be kept in PeopleStore.")
+    return (datetime - EPOCH) // MICROSECOND
+
+
+class PeopleStore:
+    """
+    Compact collection of people: full_name is interned into an int32 id, start and end are kept as int64
+    microseconds since epoch in arrays, so a record takes 20 bytes instead of a tuple with a str and two datetimes.
+    Iteration yields PersonWithTime made on the fly.
+    """
+
+    def __init__(self, people: typing.Iterable[PersonWithTime] = (), names: typing.Optional[typing.List[str]] = None):
+        self.names: typing.List[str] = names if names is not None else []
+        self._name_to_id: typing.Dict[str, int] = {name: name_id for name_id, name in enumerate(self.names)}
+        self.name_ids = array(NAME_ID_TYPECODE)
+        self.starts = array(MICROSECONDS_TYPECODE)
+        self.ends = array(MICROSECONDS_TYPECODE)
+        self.extend(people)
+
+    def _get_name_id(self, full_name: str) -> int:
+        name_id = self._name_to_id.get(full_name)
+        if name_id is None:
+            name_id = self._name_to_id[full_name] = len(self.names)
+            self.names.append(full_name)
+        return name_id
+
+    def append(self, person: PersonWithTime):
+        """:raises ValueError for datetimes with tzinfo"""
+        start, end = to_epoch_microseconds(person.start), to_epoch_microseconds(person.end)
+        self.name_ids.append(self._get_name_id(person.full_name))
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def extend(self, people: typing.Iterable[PersonWithTime]):
+        for person in people:
+            self.append(person)
+
+    def __len__(self) -> int:
+        return len(self.name_ids)
+
+    def __getitem__(self, position: int) -> PersonWithTime:
+        return PersonWithTime(
+            self.names[self.name_ids[position]],
+            EPOCH + dt.timedelta(microseconds=self.starts[position]),
+            EPOCH + dt.timedelta(microseconds=self.ends[position]),
+        )
+
+    def __iter__(self) -> typing.Iterator[PersonWithTime]:
+        names = self.names
+        for name_id, start, end in zip(self.name_ids, self.starts, self.ends):
+            yield PersonWithTime(
+                names[name_id], EPOCH + dt.timedelta(microseconds=start), EPOCH + dt.timedelta(microseconds=end)
+            )
+
+    def select(
+        self,
+        full_names: typing.Optional[typing.Iterable[str]] = None,
+        start_dt: typing.Optional[dt.datetime] = None,
+        end_dt: typing.Optional[dt.datetime] = None,
+    ) -> "PeopleStore":
+        """New store sharing names with this one, only with people matching filters of PeopleRepository"""
+        name_ids = {self._name_to_id[name] for name in full_names if name in self._name_to_id} if full_names else None
+        first = to_epoch_microseconds(start_dt) if start_dt else None
+        last = to_epoch_microseconds(end_dt) if end_dt else None
+        selected = PeopleStore(names=self.names)
+        for name_id, start, end in zip(self.name_ids, self.starts, self.ends):
+            if name_ids is not None and name_id not in name_ids:
+                continue
+            elif first is not None and start < first:
+                continue
+            elif last is not None and end > last:
+                continue
+            selected.name_ids.append(name_id)
+            selected.starts.append(start)
+            selected.ends.append(end)
+        return selected
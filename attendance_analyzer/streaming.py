@@ -0,0 +1,134 @@
+import heapq
+import pickle
+import sys
+import tempfile
+import typing
+from collections import defaultdict
+from operator import itemgetter
+
+__all__ = ("SpillingAggregator",)
+
+RUN_BATCH_SIZE = 1024  # amount of pairs pickled at once into a run file
+MERGE_FAN_IN = 64  # maximal amount of run files opened while merging
+DICT_ENTRY_SIZE = 104  # hash table slot and int value of an entry in a dict
+
+Key = typing.Hashable
+Pair = typing.Tuple[Key, int]
+
+
+def estimate_entry_size(key: Key) -> int:
+    size = DICT_ENTRY_SIZE + sys.getsizeof(key)
+    if isinstance(key, tuple):
+        size += sum(sys.getsizeof(part) for part in key)
+    return size
+
+
+class SpillingAggregator:
+    """
+    Sums durations by key like GroupingService does, but keeps at most memory_limit bytes of sums in memory.
+    When the limit is exceeded, sums are sorted and spilled into a temporary run file, so that items()
+    may merge runs back into the sorted sequence of sums. Runs are kept in generations like in an LSM tree:
+    MERGE_FAN_IN runs of a generation are merged into one run of the next one, so every pair is rewritten
+    O(log n) times instead of every merge rewriting all the pairs spilled so far.
+    """
+
+    def __init__(self, memory_limit: int, directory: typing.Optional[str] = None):
+        self._memory_limit = memory_limit
+        self._directory = directory
+        self._durations: typing.DefaultDict[Key, int] = defaultdict(int)
+        self._memory = 0
+        self._runs: typing.List[typing.List[typing.IO]] = []  # runs of every generation
+
+    def __enter__(self) -> "SpillingAggregator":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        for run in self._all_runs():
+            run.close()
+        self._runs = []
+        self._durations = defaultdict(int)
+        self._memory = 0
+
+    def add(self, key: Key, duration: int):
+        if key not in self._durations:
+            self._memory += estimate_entry_size(key)
+        self._durations[key] += duration
+        if self._memory > self._memory_limit:
+            self._spill()
+
+    def update(self, pairs: typing.Iterable[Pair]):
+        for key, duration in pairs:
+            self.add(key, duration)
+
+    def _all_runs(self) -> typing.List[typing.IO]:
+        return [run for runs in self._runs for run in runs]
+
+    def _write_run(self, pairs: typing.Iterable[Pair]) -> typing.IO:
+        run = tempfile.TemporaryFile(dir=self._directory)
+        batch = []
+        for pair in pairs:
+            batch.append(pair)
+            if len(batch) == RUN_BATCH_SIZE:
+                pickle.dump(batch, run, pickle.HIGHEST_PROTOCOL)
+                batch = []
+        if batch:
+            pickle.dump(batch, run, pickle.HIGHEST_PROTOCOL)
+        run.seek(0)
+        return run
+
+    def _merge_runs(self, runs: typing.List[typing.IO]) -> typing.IO:
+        merged = self._write_run(self._merge(self._read_run(run) for run in runs))
+        for run in runs:
+            run.close()
+        return merged
+
+    @staticmethod
+    def _read_run(run: typing.IO) -> typing.Iterator[Pair]:
+        while True:
+            try:
+                yield from pickle.load(run)
+            except EOFError:
+                return
+
+    @staticmethod
+    def _merge(sources: typing.Iterable[typing.Iterable[Pair]]) -> typing.Iterator[Pair]:
+        """Merges sorted sequences of pairs summing durations of equal keys"""
+        current_key, current_duration = None, None
+        for key, duration in heapq.merge(*sources, key=itemgetter(0)):
+            if current_duration is not None and key == current_key:
+                current_duration += duration
+                continue
+            if current_duration is not None:
+                yield current_key, current_duration
+            current_key, current_duration = key, duration
+        if current_duration is not None:
+            yield current_key, current_duration
+
+    def _spill(self):
+        run = self._write_run(sorted(self._durations.items(), key=itemgetter(0)))
+        self._durations = defaultdict(int)
+        self._memory = 0
+        generation = 0
+        while True:
+            if generation == len(self._runs):
+                self._runs.append([])
+            self._runs[generation].append(run)
+            if len(self._runs[generation]) < MERGE_FAN_IN:
+                break
+            run = self._merge_runs(self._runs[generation])
+            self._runs[generation] = []
+            generation += 1
+
+    def items(self) -> typing.Iterator[Pair]:
+        """Yields sums sorted by key, consumes the aggregator"""
+        in_memory = sorted(self._durations.items(), key=itemgetter(0))
+        self._durations = defaultdict(int)
+        self._memory = 0
+        runs = self._all_runs()  # from the youngest generations, so the smallest runs are merged first
+        self._runs = [runs]
+        while len(runs) >= MERGE_FAN_IN:  # keep amount of files opened at once bounded
+            runs[:MERGE_FAN_IN] = [self._merge_runs(runs[:MERGE_FAN_IN])]
+        yield from self._merge([*(self._read_run(run) for run in runs), in_memory])
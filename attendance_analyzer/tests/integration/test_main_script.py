@@ -1,6 +1,14 @@
+import csv
+import datetime as dt
+import gzip
+import json
+import os
+import pstats
+
 from click.testing import CliRunner
 
 from attendance_analyzer.__main__ import main
+from attendance_analyzer.writer import iter_packed_rows
 
 
 def test_output_without_grouping():
@@ -46,3 +54,402 @@ def test_output_with_grouping():
         runner.invoke(main, ["-in", "custom.xml", "-out", "one_more.csv", "--group-employees"])
         with open("one_more.csv") as f:
             assert desirable_output == f.read().split()
+
+
+def test_output_with_memory_limit():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open("custom.xml", "w") as f:
+            f.write(
+                """<people>
+                <person full_name="ivan"><start>23-12-2011 10:00:00</start><end>23-12-2011 12:00:00</end></person>
+                <person full_name="anna"><start>22-12-2011 0:0:00</start><end>22-12-2011 15:00:00</end></person>
+                <person full_name="ivan"><start>22-12-2011 10:00:00</start><end>22-12-2011 12:00:00</end></person>
+                <person full_name="anna"><start>24-12-2011 0:0:00</start><end>24-12-2011 15:00:00</end></person>
+            </people>"""
+            )
+        for options in ([], ["--group-employees"], ["--workers", "2"]):
+            in_memory = runner.invoke(main, ["-in", "custom.xml", "-out", "-", *options])
+            spilled = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--memory-limit", "1", *options])
+            assert in_memory.stdout == spilled.stdout
+
+
+def test_output_with_workers():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open("custom.xml", "w") as f:
+            f.write(
+                """<people>
+                <person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>
+                <person full_name="anna"><start>22-12-2011 0:0:00</start><end>22-12-2011 15:00:00</end></person>
+                <person full_name="ivan"><start>22-12-2011 10:00:00</start><end>22-12-2011 12:00:00</end></person>
+                <person full_name="anna"><start>24-12-2011 0:0:00</start><end>24-12-2011 15:00:00</end></person>
+            </people>"""
+            )
+        for options in ([], ["--group-employees"]):
+            sequential = runner.invoke(main, ["-in", "custom.xml", "-out", "-", *options])
+            parallel = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--workers", "2", *options])
+            assert sequential.stdout == parallel.stdout
+
+
+def test_output_with_cache():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open("custom.xml", "w") as f:
+            f.write(
+                """<people>
+                <person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>
+                <person full_name="anna"><start>22-12-2011 0:0:00</start><end>22-12-2011 15:00:00</end></person>
+            </people>"""
+            )
+        for _ in range(2):
+            result = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--cache", "--filter-person", "anna"])
+            assert ["date,duration", "22-12-2011,15:00:00"] == result.stdout.split()
+            assert os.path.exists("custom.xml.attendance-cache")
+
+
+def test_output_with_split_days():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open("custom.xml", "w") as f:
+            f.write(
+                """<people>
+                <person full_name="ivan"><start>21-12-2011 22:00:00</start><end>22-12-2011 06:00:00</end></person>
+                <person full_name="anna"><start>22-12-2011 10:0:00</start><end>22-12-2011 15:00:00</end></person>
+            </people>"""
+            )
+        result = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--split-days"])
+        assert ["date,duration", "21-12-2011,2:00:00", "22-12-2011,11:00:00"] == result.stdout.split()
+
+        result = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--split-days", "--group-employees"])
+        desirable_output = [
+            "date,name,duration",
+            "21-12-2011,ivan,2:00:00",
+            "22-12-2011,anna,5:00:00",
+            "22-12-2011,ivan,6:00:00",
+        ]
+        assert desirable_output == result.stdout.split()
+
+
+def test_output_with_merge_overlaps():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open("custom.xml", "w") as f:
+            f.write(
+                """<people>
+                <person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>
+                <person full_name="ivan"><start>21-12-2011 11:00:00</start><end>21-12-2011 13:00:00</end></person>
+                <person full_name="ivan"><start>21-12-2011 9:00:00</start><end>21-12-2011 10:00:00</end></person>
+                <person full_name="anna"><start>21-12-2011 11:00:00</start><end>21-12-2011 12:00:00</end></person>
+            </people>"""
+            )
+        result = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--merge-overlaps"])
+        assert ["date,duration", "21-12-2011,5:00:00"] == result.stdout.split()
+
+        result = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--merge-overlaps", "--presorted"])
+        assert result.exit_code != 0
+        assert "Records are not grouped by employees and sorted by start." in result.stdout
+
+
+def test_output_with_merge_overlaps_across_midnight():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open("custom.xml", "w") as f:
+            f.write(
+                """<people>
+                <person full_name="anna"><start>21-12-2011 23:00:00</start><end>22-12-2011 01:00:00</end></person>
+                <person full_name="anna"><start>22-12-2011 00:30:00</start><end>22-12-2011 02:00:00</end></person>
+            </people>"""
+            )
+        for presorted in ([], ["--presorted"]):
+            arguments = ["-in", "custom.xml", "-out", "-", "--merge-overlaps", "--split-days"] + presorted
+            result = runner.invoke(main, arguments)
+            assert result.exit_code == 0
+            assert ["date,duration", "21-12-2011,1:00:00", "22-12-2011,2:00:00"] == result.stdout.split()
+
+
+def test_output_with_incremental():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        record = '<person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>'
+        with open("custom.xml", "w") as f:
+            f.write(f"<people>{record}</people>")
+        result = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--incremental"])
+        assert ["date,duration", "21-12-2011,2:00:00"] == result.stdout.split()
+        assert os.path.exists("custom.xml.attendance-checkpoint")
+
+        with open("custom.xml", "w") as f:
+            f.write(f"<people>{record}{record}</people>")
+        result = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--incremental"])
+        assert ["date,duration", "21-12-2011,4:00:00"] == result.stdout.split()
+
+        result = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--incremental", "--workers", "2"])
+        assert result.exit_code != 0
+
+
+def test_output_with_parsers():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open("custom.xml", "w") as f:
+            f.write(
+                """<people>
+                <person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>
+                <person full_name="anna"><start>22-12-2011 0:0:00</start><end>22-12-2011 15:00:00</end></person>
+                <!-- records after a comment are read by expat -->
+                <person full_name="ivan"><start>22-12-2011 10:00:00</start><end>22-12-2011 12:00:00</end></person>
+            </people>"""
+            )
+        expected = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--group-employees"]).stdout
+        for parser in ("expat", "scanner"):
+            result = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--group-employees", "--parser", parser])
+            assert expected == result.stdout
+
+
+def test_output_with_compressed_input_and_read_options():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with gzip.open("custom.xml.gz", "wt") as f:
+            f.write(
+                """<people>
+                <person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>
+                <person full_name="anna"><start>22-12-2011 0:0:00</start><end>22-12-2011 15:00:00</end></person>
+            </people>"""
+            )
+        result = runner.invoke(main, ["-in", "custom.xml.gz", "-out", "-", "--read-buffer", "1"])
+        assert ["date,duration", "21-12-2011,2:00:00", "22-12-2011,15:00:00"] == result.stdout.split()
+
+        result = runner.invoke(main, ["-in", "custom.xml.gz", "-out", "-", "--workers", "2"])
+        assert result.exit_code != 0
+
+        with open("custom.xml", "wb") as f, gzip.open("custom.xml.gz") as compressed:
+            f.write(compressed.read())
+        result = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--mmap", "--parser", "scanner"])
+        assert ["date,duration", "21-12-2011,2:00:00", "22-12-2011,15:00:00"] == result.stdout.split()
+
+
+def test_output_formats():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open("custom.xml", "w") as f:
+            f.write(
+                """<people>
+                <person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>
+                <person full_name="anna"><start>22-12-2011 0:0:00</start><end>22-12-2011 15:00:00</end></person>
+            </people>"""
+            )
+        result = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--group-employees", "--format", "ndjson"])
+        assert result.exit_code == 0
+        assert result.stdout.splitlines() == [
+            '{"date": "2011-12-21", "name": "ivan", "duration": 7200}',
+            '{"date": "2011-12-22", "name": "anna", "duration": 54000}',
+        ]
+
+        result = runner.invoke(main, ["-in", "custom.xml", "-out", "out.bin", "--format", "packed"])
+        assert result.exit_code == 0
+        with open("out.bin", "rb") as f:
+            assert list(iter_packed_rows(f)) == [(dt.date(2011, 12, 21), 7200), (dt.date(2011, 12, 22), 54000)]
+
+
+def test_stats_and_profile():
+    runner = CliRunner(mix_stderr=False)
+    with runner.isolated_filesystem():
+        with open("custom.xml", "w") as f:
+            f.write(
+                """<people>
+                <person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>
+                <person full_name="anna"><start>22-12-2011 0:0:00</start><end>22-12-2011 15:00:00</end></person>
+            </people>"""
+            )
+        expected = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--filter-person", "anna"]).stdout
+        result = runner.invoke(
+            main,
+            [
+                "-in",
+                "custom.xml",
+                "-out",
+                "-",
+                "--filter-person",
+                "anna",
+                "--stats",
+                "--stats-file",
+                "stats.json",
+                "--profile",
+                "run.prof",
+            ],
+        )
+        assert result.exit_code == 0
+        assert result.stdout == expected
+        assert "filtered out 1 of 2 records" in result.stderr
+        with open("stats.json") as f:
+            report = json.load(f)
+        assert report["records"] == 2 and report["filtered_out"] == 1
+        assert set(report["stages"]) == {"read", "datetime", "filter", "group", "write"}
+        assert pstats.Stats("run.prof").total_calls > 0
+
+
+def test_rollups():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open("custom.xml", "w") as f:
+            f.write(
+                """<people>
+                <person full_name="ivan"><start>31-12-2011 10:00:00</start><end>31-12-2011 12:00:00</end></person>
+                <person full_name="anna"><start>02-01-2012 0:0:00</start><end>02-01-2012 15:00:00</end></person>
+                <person full_name="ivan"><start>02-01-2012 10:00:00</start><end>02-01-2012 11:00:00</end></person>
+            </people>"""
+            )
+        with open("departments.csv", "w") as f:
+            f.write("name,department\nivan,dev\n")
+        expected_by_day = runner.invoke(main, ["-in", "custom.xml", "-out", "-"]).stdout
+        arguments = ["-in", "custom.xml", "-out", "-", "--rollup", "department", "--departments", "departments.csv"]
+        for rollup in ("day", "week", "month", "employee"):
+            arguments += ["--rollup", rollup]
+        for extra in ([], ["--memory-limit", "1"], ["--workers", "2"]):
+            result = runner.invoke(main, arguments + extra)
+            assert result.exit_code == 0
+            sections = result.stdout.split("\n\n")
+            assert sections[0] == expected_by_day.rstrip("\n")
+            assert sections[1].split() == ["week,duration", "2011-W52,2:00:00", "2012-W01,16:00:00"]
+            assert sections[2].split() == ["month,duration", "12-2011,2:00:00", "01-2012,16:00:00"]
+            assert sections[3].split() == ["name,duration", "anna,15:00:00", "ivan,3:00:00"]
+            assert sections[4].split() == ["department,duration", ",15:00:00", "dev,3:00:00"]
+
+        assert runner.invoke(main, ["-in", "custom.xml", "--rollup", "department"]).exit_code != 0
+        assert runner.invoke(main, ["-in", "custom.xml", "--rollup", "day", "--group-employees"]).exit_code != 0
+
+
+def test_distribution():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open("custom.xml", "w") as f:
+            f.write(
+                """<people>
+                <person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>
+                <person full_name="anna"><start>21-12-2011 9:00:00</start><end>21-12-2011 10:00:00</end></person>
+                <person full_name="ivan"><start>21-12-2011 13:00:00</start><end>21-12-2011 16:00:00</end></person>
+            </people>"""
+            )
+        result = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--distribution"])
+        assert result.exit_code == 0
+        header, row = result.stdout.split()
+        assert header.startswith("date,sessions,min,max,mean,p50,p90,p99,arrival_min")
+        assert row.startswith("21-12-2011,3,1:00:00,3:00:00,2:00:00,")
+        assert row.endswith(",09:00:00,10:00:30,13:00:00,13:00:00,13:00:00")
+        assert runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--distribution", "--workers", "2"]).stdout == (
+            result.stdout
+        )
+        assert runner.invoke(main, ["-in", "custom.xml", "--distribution", "--memory-limit", "1"]).exit_code != 0
+
+
+def test_top_bottom_and_thresholds():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open("custom.xml", "w") as f:
+            f.write(
+                """<people>
+                <person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>
+                <person full_name="anna"><start>22-12-2011 0:0:00</start><end>22-12-2011 15:00:00</end></person>
+                <person full_name="petr"><start>22-12-2011 9:00:00</start><end>22-12-2011 9:30:00</end></person>
+                <person full_name="ivan"><start>23-12-2011 10:00:00</start><end>23-12-2011 11:00:00</end></person>
+            </people>"""
+            )
+        for extra in ([], ["--memory-limit", "1"], ["--workers", "2"]):
+            arguments = ["-in", "custom.xml", "-out", "-", "--group-employees"] + extra
+            result = runner.invoke(main, arguments + ["--top", "2"])
+            expected = ["date,name,duration", "22-12-2011,anna,15:00:00", "21-12-2011,ivan,2:00:00"]
+            assert result.stdout.split() == expected
+            result = runner.invoke(main, arguments + ["--bottom", "1"])
+            assert result.stdout.split() == ["date,name,duration", "22-12-2011,petr,0:30:00"]
+            result = runner.invoke(main, arguments + ["--min-duration", "1h", "--max-duration", "2:00:00"])
+            expected = ["date,name,duration", "21-12-2011,ivan,2:00:00", "23-12-2011,ivan,1:00:00"]
+            assert result.stdout.split() == expected
+
+        result = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--rollup", "employee", "--max-duration", "3h"])
+        assert result.stdout.split() == ["name,duration", "ivan,3:00:00", "petr,0:30:00"]
+        result = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--top", "1", "--format", "ndjson"])
+        assert json.loads(result.stdout) == {"date": "2011-12-22", "duration": 55800}
+        assert runner.invoke(main, ["-in", "custom.xml", "--top", "1", "--bottom", "1"]).exit_code != 0
+        assert runner.invoke(main, ["-in", "custom.xml", "--min-duration", "soon"]).exit_code != 0
+
+
+def test_pipeline():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open("custom.xml", "w") as f:
+            f.write(
+                """<people>
+                <person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>
+                <person full_name="anna"><start>22-12-2011 0:0:00</start><end>22-12-2011 15:00:00</end></person>
+                <person full_name="ivan"><start>23-12-2011 10:00:00</start><end>23-12-2011 11:00:00</end></person>
+            </people>"""
+            )
+        with open("broken.xml", "w") as f:
+            f.write(
+                """<people>
+                <person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>
+                <person full_name="anna"><start>22-12-2011 0:0:00</start><end>21-12-2011 15:00:00</end></person>
+            </people>"""
+            )
+        for extra in (["--group-employees"], ["--parser", "scanner", "--memory-limit", "1"], ["--format", "packed"]):
+            arguments = ["-in", "custom.xml", "-out", "out.bin"] + extra
+            runner.invoke(main, arguments)
+            with open("out.bin", "rb") as f:
+                expected = f.read()
+            assert runner.invoke(main, arguments + ["--pipeline"]).exit_code == 0
+            with open("out.bin", "rb") as f:
+                assert f.read() == expected
+
+        for parser in ("etree", "expat", "scanner"):
+            arguments = ["-in", "broken.xml", "-out", "-", "--parser", parser]
+            expected = runner.invoke(main, arguments)
+            result = runner.invoke(main, arguments + ["--pipeline"])
+            assert result.exit_code == expected.exit_code == 1
+            assert result.output == expected.output and "cannot come after" in result.output
+        assert runner.invoke(main, ["-in", "custom.xml", "--pipeline", "--workers", "2"]).exit_code != 0
+
+
+def test_on_error():
+    runner = CliRunner(mix_stderr=False)
+    with runner.isolated_filesystem():
+        with open("custom.xml", "w") as f:
+            f.write(
+                """<people>
+                <person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>
+                <person full_name="anna"><start>22-12-2011 10:00:00</start><end>21-12-2011 15:00:00</end></person>
+                <person full_name="petr"><start>22-12-2011 10:00:00</start><end>soon</end></person>
+                <person full_name="ivan"><start>22-12-2011 10:00:00</start><end>22-12-2011 11:00:00</end></person>
+            </people>"""
+            )
+        strict = runner.invoke(main, ["-in", "custom.xml", "-out", "-"])
+        assert strict.exit_code == 1 and "cannot come after" in strict.stderr
+
+        for parser in ("etree", "expat", "scanner"):
+            arguments = ["-in", "custom.xml", "-out", "-", "--parser", parser]
+            result = runner.invoke(main, arguments + ["--on-error", "skip"])
+            assert result.exit_code == 0
+            assert result.stdout.split() == ["date,duration", "21-12-2011,2:00:00", "22-12-2011,1:00:00"]
+            assert "Skipped 2 broken records" in result.stderr
+
+            result = runner.invoke(main, arguments + ["--on-error", "quarantine", "--pipeline"])
+            assert result.exit_code == 0
+            assert "custom.xml.attendance-quarantine.csv" in result.stderr
+            with open("custom.xml.attendance-quarantine.csv") as f:
+                rows = list(csv.reader(f))
+            assert [row[1] for row in rows] == ["full_name", "anna", "petr"]
+            assert rows[2][2] == "'soon' does not match datetime pattern '%d-%m-%Y %H:%M:%S'."
+            with open("custom.xml", "rb") as f:
+                content = f.read()
+            assert content[int(rows[1][0]) :].startswith(b'<person full_name="anna">')  # noqa: E203
+
+        arguments = ["-in", "custom.xml", "-out", "-", "--on-error", "quarantine", "--quarantine", "bad.csv"]
+        assert runner.invoke(main, arguments).exit_code == 0 and os.path.exists("bad.csv")
+        assert runner.invoke(main, ["-in", "custom.xml", "--quarantine", "bad.csv"]).exit_code != 0
+        result = runner.invoke(main, arguments[:-1] + ["missing/bad.csv"])
+        assert result.exit_code == 2 and "Quarantine can't be written" in result.stderr
+        assert not isinstance(result.exception, OSError)
+        assert runner.invoke(main, ["-in", "custom.xml", "--on-error", "skip", "--workers", "2"]).exit_code != 0
+
+        # a lenient run mustn't leave a cache without the skipped records for the following strict runs
+        assert runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--on-error", "skip", "--cache"]).exit_code != 0
+        cached = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--cache"])
+        assert cached.exit_code == 1 and "cannot come after" in cached.stderr
@@ -0,0 +1,104 @@
+import io
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from attendance_analyzer.batch import BatchJob, jobs_from_manifest, jobs_from_patterns, main, run_batch
+from attendance_analyzer.tests.unit.helpers import DEFAULT_DATETIME_PATTERN
+
+OFFICES = {
+    "moscow.xml": """<people>
+        <person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>
+        <person full_name="anna"><start>22-12-2011 10:00:00</start><end>22-12-2011 15:00:00</end></person>
+    </people>""",
+    "kazan.xml": """<people>
+        <person full_name="petr"><start>21-12-2011 10:00:00</start><end>21-12-2011 11:00:00</end></person>
+    </people>""",
+}
+
+
+@pytest.fixture
+def offices(tmp_path) -> str:
+    for name, text in OFFICES.items():
+        (tmp_path / name).write_text(text)
+    return str(tmp_path)
+
+
+def test_jobs_from_patterns(offices):
+    assert jobs_from_patterns([os.path.join(offices, "*.xml")], "out") == [
+        BatchJob(os.path.join(offices, "kazan.xml"), os.path.join("out", "kazan.csv")),
+        BatchJob(os.path.join(offices, "moscow.xml"), os.path.join("out", "moscow.csv")),
+    ]
+
+
+def test_jobs_from_patterns_with_the_same_outputs(offices):
+    os.mkdir(os.path.join(offices, "old"))
+    with open(os.path.join(offices, "old", "kazan.xml"), "w") as f:
+        f.write(OFFICES["kazan.xml"])
+    with pytest.raises(ValueError):
+        jobs_from_patterns([os.path.join(offices, "**", "*.xml")], "out")
+
+
+def test_jobs_from_manifest():
+    assert jobs_from_manifest(io.StringIO("a.xml,a.csv\n\nb.xml,b.csv\n")) == [
+        BatchJob("a.xml", "a.csv"),
+        BatchJob("b.xml", "b.csv"),
+    ]
+    with pytest.raises(ValueError):
+        jobs_from_manifest(io.StringIO("a.xml\n"))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_batch(offices, workers):
+    jobs = jobs_from_patterns([os.path.join(offices, "*.xml")], offices)
+    results = list(run_batch(jobs, DEFAULT_DATETIME_PATTERN, workers, group=False, keep_groupings=True))
+    assert [result.job for result in results] == jobs
+    assert [result.records for result in results] == [1, 2]
+    assert all(result.error is None for result in results)
+    with open(os.path.join(offices, "moscow.csv")) as f:
+        assert ["date,duration", "21-12-2011,2:00:00", "22-12-2011,5:00:00"] == f.read().split()
+
+
+def test_run_batch_reports_broken_files(offices):
+    with open(os.path.join(offices, "broken.xml"), "w") as f:
+        f.write("<people><person><start>")
+    jobs = jobs_from_patterns([os.path.join(offices, "*.xml")], offices)
+    errors = [result.error for result in run_batch(jobs, DEFAULT_DATETIME_PATTERN, 1, group=False)]
+    assert errors == ["Attribute full_name is not found in tag person.", None, None]
+
+
+def test_batch_command_writes_outputs_and_combined_grouping(offices):
+    runner = CliRunner()
+    result = runner.invoke(
+        main,
+        [
+            "-in",
+            os.path.join(offices, "*.xml"),
+            "--output-dir",
+            os.path.join(offices, "out"),
+            "--combined",
+            os.path.join(offices, "combined.csv"),
+            "--group-employees",
+            "--workers",
+            "2",
+        ],
+    )
+    assert result.exit_code == 0
+    assert "kazan.xml: 1 records" in result.output
+    assert "total: 3 records" in result.output
+    with open(os.path.join(offices, "out", "kazan.csv")) as f:
+        assert ["date,name,duration", "21-12-2011,petr,1:00:00"] == f.read().split()
+    with open(os.path.join(offices, "combined.csv")) as f:
+        assert [
+            "date,name,duration",
+            "21-12-2011,ivan,2:00:00",
+            "21-12-2011,petr,1:00:00",
+            "22-12-2011,anna,5:00:00",
+        ] == f.read().split()
+
+
+def test_batch_command_without_inputs(tmp_path):
+    result = CliRunner().invoke(main, ["-in", str(tmp_path / "*.xml")])
+    assert result.exit_code != 0
+    assert "No input files" in result.output
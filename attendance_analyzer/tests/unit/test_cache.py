@@ -0,0 +1,91 @@
+import os
+from datetime import datetime as dt
+
+import pytest
+
+from attendance_analyzer import logic
+from attendance_analyzer.cache import CACHE_SUFFIX, AttendanceCache
+from attendance_analyzer.helpers import PersonWithTime
+from attendance_analyzer.reader import XMLPeopleReader
+from attendance_analyzer.tests.unit.helpers import DEFAULT_DATETIME_PATTERN
+
+TESTING_XML = """<people>
+    <person full_name="ivan"><start>21-12-2011 10:54:47</start><end>21-12-2011 10:55:47</end></person>
+    <person full_name="anna"><start>21-12-2011 10:54:47</start><end>21-12-2011 10:56:47</end></person>
+    <person full_name="ivan"><start>22-12-1965 10:54:47</start><end>23-12-1965 10:56:47</end></person>
+</people>
+"""
+TESTING_PEOPLE = [
+    PersonWithTime("ivan", dt(2011, 12, 21, 10, 54, 47), dt(2011, 12, 21, 10, 55, 47)),
+    PersonWithTime("anna", dt(2011, 12, 21, 10, 54, 47), dt(2011, 12, 21, 10, 56, 47)),
+    PersonWithTime("ivan", dt(1965, 12, 22, 10, 54, 47), dt(1965, 12, 23, 10, 56, 47)),
+]
+
+
+@pytest.fixture
+def source(tmp_path) -> str:
+    path = tmp_path / "people.xml"
+    path.write_text(TESTING_XML)
+    return str(path)
+
+
+def test_cache_is_written_after_people_are_exhausted(source):
+    cache = AttendanceCache(source, DEFAULT_DATETIME_PATTERN)
+    people = cache.write_through(iter(TESTING_PEOPLE))
+    assert next(people) == TESTING_PEOPLE[0]
+    assert not os.path.exists(source + CACHE_SUFFIX)
+    assert list(people) == TESTING_PEOPLE[1:]
+    assert os.path.exists(source + CACHE_SUFFIX)
+
+    cached_people = cache.load()
+    assert len(cached_people) == 3
+    assert list(cached_people) == TESTING_PEOPLE
+    assert list(cached_people.name_ids) == [0, 1, 0]
+
+
+def test_there_is_no_cache_before_writing(source):
+    assert AttendanceCache(source, DEFAULT_DATETIME_PATTERN).load() is None
+
+
+def test_cache_is_stale_after_changing_source(source):
+    list(AttendanceCache(source, DEFAULT_DATETIME_PATTERN).write_through(TESTING_PEOPLE))
+    with open(source, "a") as file:
+        file.write("\n")
+    assert AttendanceCache(source, DEFAULT_DATETIME_PATTERN).load() is None
+
+
+def test_cache_is_stale_for_other_datetime_regex(source):
+    list(AttendanceCache(source, DEFAULT_DATETIME_PATTERN).write_through(TESTING_PEOPLE))
+    assert AttendanceCache(source, "%Y-%m-%d %H:%M:%S").load() is None
+
+
+def test_broken_cache_is_ignored(source):
+    with open(source + CACHE_SUFFIX, "wb") as file:
+        file.write(b"garbage")
+    assert AttendanceCache(source, DEFAULT_DATETIME_PATTERN).load() is None
+
+
+def test_people_with_microseconds_are_not_cached(source):
+    people = [*TESTING_PEOPLE, PersonWithTime("ivan", dt(2011, 12, 21, 10, 0, 0, 1), dt(2011, 12, 21, 10, 1, 0))]
+    cache = AttendanceCache(source, DEFAULT_DATETIME_PATTERN)
+    assert list(cache.write_through(people)) == people
+    assert cache.load() is None
+
+
+def test_unwritable_cache_is_skipped(source, tmp_path):
+    cache = AttendanceCache(source, DEFAULT_DATETIME_PATTERN, str(tmp_path / "missing" / "people.cache"))
+    assert list(cache.write_through(TESTING_PEOPLE)) == TESTING_PEOPLE
+    assert cache.load() is None
+
+
+def test_repository_reads_cache_instead_of_file(source, mocker):
+    def repository():
+        return logic.PeopleRepository(
+            reader_obj=XMLPeopleReader(source, DEFAULT_DATETIME_PATTERN),
+            cache=AttendanceCache(source, DEFAULT_DATETIME_PATTERN),
+        )
+
+    assert list(repository().get_filtered_people(("ivan",))) == [TESTING_PEOPLE[0], TESTING_PEOPLE[2]]
+    read_attendance = mocker.patch("attendance_analyzer.reader.XMLPeopleReader.read_attendance")
+    assert list(repository().get_filtered_people(("ivan",))) == [TESTING_PEOPLE[0], TESTING_PEOPLE[2]]
+    read_attendance.assert_not_called()
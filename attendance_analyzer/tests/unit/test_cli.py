@@ -1,5 +1,8 @@
+import subprocess
+import sys
 from datetime import datetime
 
+import pytest
 from click.testing import CliRunner
 from pytest_mock import MockerFixture
 
@@ -88,3 +91,41 @@ def test_not_group(mocker: MockerFixture):
     with runner.isolated_filesystem(), open("custom.xml", "w"):
         runner.invoke(main, ["-in", "custom.xml", "-out", "-"])
     method.assert_called_once()
+
+
+def test_numpy_backend_usage(mocker: MockerFixture):
+    pytest.importorskip("numpy")
+    mocker.patch("attendance_analyzer.vectorized.is_available", return_value=True)
+    method = mocker.patch("attendance_analyzer.vectorized.ArrayGroupingService.group_people_with_time_by_day")
+    runner = CliRunner()
+    with runner.isolated_filesystem(), open("custom.xml", "w"):
+        runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--backend", "numpy"])
+    method.assert_called_once()
+
+
+def test_numpy_backend_is_not_available(mocker: MockerFixture):
+    mocker.patch("attendance_analyzer.vectorized.is_available", return_value=False)
+    runner = CliRunner()
+    with runner.isolated_filesystem(), open("custom.xml", "w"):
+        result = runner.invoke(main, ["-in", "custom.xml", "-out", "-", "--backend", "numpy"])
+    assert "Backend numpy requires numpy to be installed." in result.stdout
+
+
+def test_optional_code_paths_are_not_imported_on_startup():
+    heavy_modules = (
+        "numpy",
+        "lxml",
+        "pyarrow",
+        "zstandard",
+        "concurrent.futures",
+        "multiprocessing",
+        "cProfile",
+        "attendance_analyzer.parallel",
+        "attendance_analyzer.incremental",
+        "attendance_analyzer.streaming",
+        "attendance_analyzer.vectorized",
+        "attendance_analyzer.logic",
+    )
+    code = f"import sys, attendance_analyzer.__main__; print([m for m in {heavy_modules!r} if m in sys.modules])"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,116 @@
+import io
+import math
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from attendance_analyzer.distribution import (
+    DistributionGroupingService,
+    Histogram,
+    LogHistogram,
+    SessionDistribution,
+    write_out_distributions,
+)
+from attendance_analyzer.helpers import PersonWithTime
+from attendance_analyzer.logic import merge_groupings
+
+
+def nearest_rank(values, q):
+    values = sorted(values)
+    return values[max(math.ceil(q * len(values)) - 1, 0)]
+
+
+@pytest.fixture
+def values():
+    rng = random.Random(0)
+    return [int(rng.lognormvariate(8, 1.5)) for _ in range(10_000)]
+
+
+@pytest.mark.parametrize("q", [0, 0.01, 0.5, 0.9, 0.99, 1])
+def test_log_histogram_quantiles_are_relatively_accurate(values, q):
+    histogram = LogHistogram(0.01)
+    for value in values:
+        histogram.add(value)
+    assert histogram.quantile(q) == pytest.approx(nearest_rank(values, q), rel=0.01, abs=1)
+    assert (histogram.count, histogram.minimum, histogram.maximum) == (len(values), min(values), max(values))
+    assert histogram.mean == pytest.approx(sum(values) / len(values))
+    assert len(histogram.buckets) <= math.log(max(values)) / math.log(1.01 / 0.99) + 2
+
+
+@pytest.mark.parametrize("q", [0.5, 0.9, 0.99])
+def test_histogram_quantiles_are_within_half_of_bucket(q):
+    rng = random.Random(0)
+    values = [rng.randrange(24 * 60 * 60) for _ in range(10_000)]
+    histogram = Histogram(60)
+    for value in values:
+        histogram.add(value)
+    assert abs(histogram.quantile(q) - nearest_rank(values, q)) <= 30
+    assert len(histogram.buckets) <= 24 * 60
+
+
+def test_histograms_are_merged_like_one(values):
+    whole, first, second = LogHistogram(), LogHistogram(), LogHistogram()
+    for i, value in enumerate(values):
+        whole.add(value)
+        (first if i % 3 else second).add(value)
+    first.merge(second)
+    assert first.buckets == whole.buckets
+    assert (first.count, first.total, first.minimum, first.maximum) == (
+        whole.count,
+        whole.total,
+        whole.minimum,
+        whole.maximum,
+    )
+    with pytest.raises(ValueError):
+        first.merge(Histogram())
+    assert Histogram().quantile(0.5) is None and Histogram().mean is None
+
+
+def people():
+    start = datetime(2011, 12, 21, 9)
+    return [
+        PersonWithTime("ivan", start, start + timedelta(hours=2)),
+        PersonWithTime("ivan", start + timedelta(hours=3), start + timedelta(hours=4)),
+        PersonWithTime("anna", start + timedelta(minutes=30), start + timedelta(hours=20)),
+        PersonWithTime("anna", start + timedelta(days=1), start + timedelta(days=1, hours=8)),
+    ]
+
+
+def test_grouping_distributions_by_day():
+    grouping = DistributionGroupingService(people(), split_by_day=True).group_people_with_time_by_day()
+    assert set(grouping) == {date(2011, 12, 21), date(2011, 12, 22)}
+    first_day = grouping[date(2011, 12, 21)]
+    assert first_day.durations.count == 3
+    assert (first_day.durations.minimum, first_day.durations.maximum) == (3600, 19.5 * 3600)
+    assert (first_day.arrivals.minimum, first_day.arrivals.maximum) == (9 * 3600, 12 * 3600)
+
+
+def test_distributions_are_merged_by_merge_groupings():
+    whole = DistributionGroupingService(people()).group_people_with_time_by_person_and_day()
+    parts = [
+        DistributionGroupingService(people()[:1]).group_people_with_time_by_person_and_day(),
+        DistributionGroupingService(people()[1:]).group_people_with_time_by_person_and_day(),
+    ]
+    merged = merge_groupings(parts)
+    assert set(merged) == set(whole)
+    for key, distribution in whole.items():
+        assert merged[key].durations.buckets == distribution.durations.buckets
+        assert merged[key].arrivals.buckets == distribution.arrivals.buckets
+    total = sum(whole.values())
+    assert isinstance(total, SessionDistribution) and total.durations.count == 4
+
+
+def test_distributions_are_written_as_csv():
+    output = io.StringIO()
+    grouping = DistributionGroupingService(people()).group_people_with_time_by_person_and_day()
+    write_out_distributions(output, grouping, by_person=True)
+    lines = output.getvalue().split("\r\n")
+    assert lines[0] == (
+        "date,name,sessions,min,max,mean,p50,p90,p99," "arrival_min,arrival_p50,arrival_p90,arrival_p99,arrival_max"
+    )
+    assert lines[1].startswith("21-12-2011,anna,1,19:30:00,19:30:00,19:30:00,")
+    assert lines[1].endswith(",09:30:00,09:30:00,09:30:00,09:30:00,09:30:00")
+    assert lines[2].startswith("21-12-2011,ivan,2,1:00:00,2:00:00,1:30:00,")
+    assert lines[2].endswith(",09:00:00,09:00:30,12:00:00,12:00:00,12:00:00")
+    assert len(lines) == 5 and lines[-1] == ""
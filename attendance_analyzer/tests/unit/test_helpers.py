@@ -17,3 +17,69 @@ def test_parse_datetime_raises_value_error_with_wrong_text_for_parsing():
 def test_parse_datetime_raises_value_error_with_not_matching_pattern():
     with pytest.raises(ValueError):
         assert helpers.parse_datetime("02-01-2020 03:04:05", "%d-%m-%Y")
+
+
+@pytest.mark.parametrize(
+    "text,datetime_regex",
+    [
+        ("02-01-2020 03:04:05", "%d-%m-%Y %H:%M:%S"),
+        ("2-1-2020 3:4:05", "%d-%m-%Y %H:%M:%S"),
+        ("2020-01-02T03:04:05", "%Y-%m-%dT%H:%M:%S"),
+        ("2020-21-12 10:54:47", "%Y-%d-%m %H:%M:%S"),
+        ("10:54 21.12.11", "%H:%M %d.%m.%y"),
+        ("10:54 21.12.99", "%H:%M %d.%m.%y"),
+        ("21.12.2011", "%d.%m.%Y"),
+        ("10:54:47", "%H:%M:%S"),
+        ("100% 21-12-2011", "100%% %d-%m-%Y"),
+        ("21-12-2011 10:54:47.123", "%d-%m-%Y %H:%M:%S.%f"),
+        ("Dec 21 2011", "%b %d %Y"),
+    ],
+)
+def test_datetime_parser_matches_parse_datetime(text, datetime_regex):
+    assert helpers.DateTimeParser(datetime_regex)(text) == helpers.parse_datetime(text, datetime_regex)
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["DOES NOT MATCH", "", "31-02-2020 03:04:05", "02-01-2020 24:04:05", "02-01-2020 03:04:60", "02-01-2020 03:04"],
+)
+def test_datetime_parser_raises_value_error_with_wrong_text_for_parsing(text):
+    with pytest.raises(ValueError):
+        helpers.DateTimeParser("%d-%m-%Y %H:%M:%S")(text)
+
+
+def test_datetime_parser_caches_limited_amount_of_dates():
+    parser = helpers.DateTimeParser("%d-%m-%Y %H:%M:%S", cache_size=2)
+    for day in (1, 2, 3, 1):
+        assert parser(f"{day:02}-01-2020 03:04:05") == dt(2020, 1, day, 3, 4, 5)
+    assert parser._dates == {"03-01-2020": (2020, 1, 3), "01-01-2020": (2020, 1, 1)}
+
+
+@pytest.mark.parametrize(
+    "text,datetime_regex,fields",
+    [
+        ("02-01-2020 03:04:05", "%d-%m-%Y %H:%M:%S", (2020, 1, 2, 3, 4, 5)),
+        ("2020-21-12", "%Y-%d-%m", (2020, 12, 21, 0, 0, 0)),
+        ("31-02-2020 03:04:05", "%d-%m-%Y %H:%M:%S", (2020, 2, 31, 3, 4, 5)),  # fields aren't validated
+        ("2-1-2020 3:4:05", "%d-%m-%Y %H:%M:%S", None),
+        ("10:54 21.12.11", "%H:%M %d.%m.%y", None),
+        ("Dec 21 2011", "%b %d %Y", None),
+    ],
+)
+def test_datetime_parser_fields(text, datetime_regex, fields):
+    assert helpers.DateTimeParser(datetime_regex).fields(text) == fields
+
+
+@pytest.mark.parametrize(
+    "text, seconds",
+    [("40h", 144000), ("90m", 5400), ("3600s", 3600), ("3600", 3600), ("1.5h", 5400), ("2d", 172800)]
+    + [("40:00:00", 144000), ("1:30", 5400), ("0:00:07", 7), (" 8h ", 28800)],
+)
+def test_parse_duration(text, seconds):
+    assert helpers.parse_duration(text) == seconds
+
+
+@pytest.mark.parametrize("text", ["", "h", "40x", "-1h", "1:60", "1:00:60", "1h30m"])
+def test_parse_duration_raises_value_error(text):
+    with pytest.raises(ValueError):
+        helpers.parse_duration(text)
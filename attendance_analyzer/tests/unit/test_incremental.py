@@ -0,0 +1,73 @@
+import os
+from datetime import date
+
+from attendance_analyzer.incremental import CHECKPOINT_SUFFIX, IncrementalGrouping
+from attendance_analyzer.tests.unit.helpers import DEFAULT_DATETIME_PATTERN
+
+HEAD = '<?xml version="1.0"?>\n<people>\n'
+IVAN = '<person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 11:00:00</end></person>\n'
+ANNA = '<person full_name="anna"><start>22-12-2011 10:00:00</start><end>22-12-2011 12:00:00</end></person>\n'
+TAIL = "</people>\n"
+
+
+def write(path, text: str):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def test_only_appended_records_are_parsed(tmp_path, mocker):
+    source = str(tmp_path / "people.xml")
+    write(source, HEAD + IVAN + TAIL)
+    assert IncrementalGrouping(source, DEFAULT_DATETIME_PATTERN, group=True).group() == {
+        (date(2011, 12, 21), "ivan"): 3600
+    }
+    assert os.path.exists(source + CHECKPOINT_SUFFIX)
+
+    write(source, HEAD + IVAN + ANNA + IVAN.replace("21-12", "22-12") + TAIL)
+    group_range = mocker.spy(IncrementalGrouping, "_group_range")
+    assert IncrementalGrouping(source, DEFAULT_DATETIME_PATTERN, group=True).group() == {
+        (date(2011, 12, 21), "ivan"): 3600,
+        (date(2011, 12, 22), "anna"): 7200,
+        (date(2011, 12, 22), "ivan"): 3600,
+    }
+    shard = group_range.call_args[0][2]
+    assert shard.start == len(HEAD + IVAN.rstrip())
+
+    group_range.reset_mock()
+    assert (
+        IncrementalGrouping(source, DEFAULT_DATETIME_PATTERN, group=True).group()[(date(2011, 12, 22), "anna")] == 7200
+    )
+    group_range.assert_not_called()
+
+
+def test_incomplete_record_is_left_for_the_next_run(tmp_path):
+    source = str(tmp_path / "people.xml")
+    write(source, HEAD + IVAN + ANNA[:40])
+    assert IncrementalGrouping(source, DEFAULT_DATETIME_PATTERN, group=False).group() == {date(2011, 12, 21): 3600}
+
+    write(source, HEAD + IVAN + ANNA)
+    assert IncrementalGrouping(source, DEFAULT_DATETIME_PATTERN, group=False).group() == {
+        date(2011, 12, 21): 3600,
+        date(2011, 12, 22): 7200,
+    }
+
+
+def test_checkpoint_is_dropped_when_file_is_changed(tmp_path):
+    source = str(tmp_path / "people.xml")
+    write(source, HEAD + IVAN + ANNA + TAIL)
+    IncrementalGrouping(source, DEFAULT_DATETIME_PATTERN, group=False).group()
+
+    write(source, HEAD + ANNA + ANNA + TAIL)
+    assert IncrementalGrouping(source, DEFAULT_DATETIME_PATTERN, group=False).group() == {date(2011, 12, 22): 14400}
+
+    write(source, HEAD + IVAN + TAIL)
+    assert IncrementalGrouping(source, DEFAULT_DATETIME_PATTERN, group=False).group() == {date(2011, 12, 21): 3600}
+
+
+def test_checkpoint_is_kept_per_options(tmp_path):
+    source = str(tmp_path / "people.xml")
+    write(source, HEAD + IVAN + ANNA + TAIL)
+    IncrementalGrouping(source, DEFAULT_DATETIME_PATTERN, group=False).group()
+    assert IncrementalGrouping(source, DEFAULT_DATETIME_PATTERN, group=False, people_to_filter=("anna",)).group() == {
+        date(2011, 12, 22): 7200
+    }
@@ -1,5 +1,8 @@
+import random
 from datetime import date
 from datetime import datetime as dt
+from datetime import timedelta
+from unittest import mock
 
 import pytest
 
@@ -158,3 +161,190 @@ def test_grouping_by_day_and_person():
     assert service.group_people_with_time_by_person_and_day() == {
         (date(2011, 12, day), name): 900 for day in (1, 2, 3) for name in ("ivan", "anna")
     }
+
+
+def random_people(count: int) -> list:
+    rng = random.Random(0)
+    people = []
+    for _ in range(count):
+        start = dt(2011, 12, 1) + timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+        people.append(
+            PersonWithTime(rng.choice(("ivan", "anna", "petr")), start, start + timedelta(hours=rng.random() * 30))
+        )
+    return people
+
+
+@pytest.mark.parametrize(
+    "people_full_names,start_dt,end_dt",
+    [
+        (None, None, None),
+        (("ivan",), None, None),
+        (("ivan", "anna"), None, None),
+        (("nobody",), None, None),
+        (None, dt(2011, 12, 10), None),
+        (None, None, dt(2011, 12, 10, 23, 59, 59, 999999)),
+        (("petr",), dt(2011, 12, 10), dt(2011, 12, 17, 23, 59, 59, 999999)),
+        (("petr", "ivan"), dt(2011, 12, 10, 12), dt(2011, 12, 10, 20)),
+        (None, dt(2011, 12, 17), dt(2011, 12, 10)),
+    ],
+)
+def test_index_query_is_equal_to_filtering(people_full_names, start_dt, end_dt):
+    people = random_people(500)
+    filtered = logic.PeopleRepository(reader_obj=mock.Mock(read_attendance=lambda: people)).get_filtered_people(
+        people_full_names, start_dt, end_dt
+    )
+    queried = list(logic.PeopleIndex(people).query(people_full_names, start_dt, end_dt))
+    assert sorted(queried) == sorted(filtered)
+    assert [person.start for person in queried] == sorted(person.start for person in queried)
+
+
+def test_repository_reuses_index_for_queries():
+    people = random_people(100)
+    reader_obj = mock.Mock(read_attendance=mock.Mock(return_value=iter(people)))
+    repository = logic.PeopleRepository(reader_obj=reader_obj)
+    assert len(list(repository.query(("ivan",)))) == len([person for person in people if person.full_name == "ivan"])
+    assert len(list(repository.query(("anna",)))) == len([person for person in people if person.full_name == "anna"])
+    assert set(repository.get_filtered_people()) == set(people)
+    reader_obj.read_attendance.assert_called_once()
+
+
+def test_repository_query_after_filtering():
+    people = random_people(100)
+    reader_obj = mock.Mock(read_attendance=mock.Mock(side_effect=lambda: iter(people)))
+    repository = logic.PeopleRepository(reader_obj=reader_obj)
+    assert set(repository.get_filtered_people()) == set(people)
+    assert set(repository.query()) == set(people)
+    assert len(list(repository.query(("ivan",)))) == len([person for person in people if person.full_name == "ivan"])
+    assert reader_obj.read_attendance.call_count == 2
+
+
+@pytest.mark.parametrize(
+    "start,end,result",
+    [
+        pytest.param(dt(2011, 12, 1, 10), dt(2011, 12, 1, 12), [(date(2011, 12, 1), 7200)], id="one day"),
+        pytest.param(dt(2011, 12, 1, 10), dt(2011, 12, 1, 10), [(date(2011, 12, 1), 0)], id="empty"),
+        pytest.param(
+            dt(2011, 12, 1, 22), dt(2011, 12, 2, 6), [(date(2011, 12, 1), 7200), (date(2011, 12, 2), 21600)], id="night"
+        ),
+        pytest.param(dt(2011, 12, 1, 22), dt(2011, 12, 2), [(date(2011, 12, 1), 7200)], id="till midnight"),
+        pytest.param(
+            dt(2011, 12, 1, 23, 59, 59, 500000),
+            dt(2011, 12, 3, 0, 0, 0, 700000),
+            [(date(2011, 12, 1), 0), (date(2011, 12, 2), 86400), (date(2011, 12, 3), 1)],
+            id="several days with microseconds",
+        ),
+    ],
+)
+def test_split_duration_by_day(start, end, result):
+    assert list(logic.split_duration_by_day(start, end)) == result
+    epoch = dt(1970, 1, 1)
+    assert [
+        (date(1970, 1, 1) + timedelta(days=day), duration)
+        for day, duration in logic.split_microseconds_by_day(
+            (start - epoch) // timedelta(microseconds=1), (end - epoch) // timedelta(microseconds=1)
+        )
+    ] == result
+
+
+def test_grouping_with_split_by_day():
+    people = [
+        PersonWithTime("ivan", dt(2011, 12, 1, 22, 0, 0), dt(2011, 12, 2, 6, 0, 0)),
+        PersonWithTime("anna", dt(2011, 12, 2, 10, 0, 0), dt(2011, 12, 2, 11, 0, 0)),
+    ]
+    assert GroupingService(people, split_by_day=True).group_people_with_time_by_day() == {
+        date(2011, 12, 1): 7200,
+        date(2011, 12, 2): 21600 + 3600,
+    }
+    assert GroupingService(people, split_by_day=True).group_people_with_time_by_person_and_day() == {
+        (date(2011, 12, 1), "ivan"): 7200,
+        (date(2011, 12, 2), "ivan"): 21600,
+        (date(2011, 12, 2), "anna"): 3600,
+    }
+    assert dict(GroupingService(people, split_by_day=True).iter_durations_by_person_and_day()) == {
+        (date(2011, 12, 1), "ivan"): 7200,
+        (date(2011, 12, 2), "ivan"): 21600,
+        (date(2011, 12, 2), "anna"): 3600,
+    }
+
+
+def test_split_grouping_keeps_total_duration():
+    people = random_people(500)
+    assert sum(GroupingService(people, split_by_day=True).group_people_with_time_by_day().values()) == sum(
+        GroupingService(people).group_people_with_time_by_day().values()
+    )
+
+
+@pytest.mark.parametrize("presorted", [False, True])
+def test_merge_overlapping_people(presorted):
+    people = [
+        PersonWithTime("anna", dt(2011, 12, 1, 10, 0, 0), dt(2011, 12, 1, 12, 0, 0)),
+        PersonWithTime("anna", dt(2011, 12, 1, 10, 0, 0), dt(2011, 12, 1, 12, 0, 0)),
+        PersonWithTime("anna", dt(2011, 12, 1, 11, 0, 0), dt(2011, 12, 1, 13, 0, 0)),
+        PersonWithTime("anna", dt(2011, 12, 1, 13, 0, 0), dt(2011, 12, 1, 14, 0, 0)),
+        PersonWithTime("anna", dt(2011, 12, 1, 15, 0, 0), dt(2011, 12, 1, 16, 0, 0)),
+        PersonWithTime("ivan", dt(2011, 12, 1, 9, 0, 0), dt(2011, 12, 1, 18, 0, 0)),
+        PersonWithTime("ivan", dt(2011, 12, 1, 10, 0, 0), dt(2011, 12, 1, 11, 0, 0)),
+    ]
+    if not presorted:
+        people = people[::-1]
+    assert list(logic.merge_overlapping_people(people, presorted)) == [
+        PersonWithTime("anna", dt(2011, 12, 1, 10, 0, 0), dt(2011, 12, 1, 14, 0, 0)),
+        PersonWithTime("anna", dt(2011, 12, 1, 15, 0, 0), dt(2011, 12, 1, 16, 0, 0)),
+        PersonWithTime("ivan", dt(2011, 12, 1, 9, 0, 0), dt(2011, 12, 1, 18, 0, 0)),
+    ]
+
+
+def test_merge_overlapping_unsorted_people():
+    people = [
+        PersonWithTime("anna", dt(2011, 12, 1, 11, 0, 0), dt(2011, 12, 1, 12, 0, 0)),
+        PersonWithTime("anna", dt(2011, 12, 1, 10, 0, 0), dt(2011, 12, 1, 11, 0, 0)),
+    ]
+    with pytest.raises(logic.UnsortedPeopleException):
+        list(logic.merge_overlapping_people(people, presorted=True))
+
+
+@pytest.mark.parametrize("presorted", [False, True])
+def test_merge_overlapping_people_across_midnight(presorted):
+    people = [
+        PersonWithTime("anna", dt(2011, 12, 21, 23, 0, 0), dt(2011, 12, 22, 1, 0, 0)),
+        PersonWithTime("anna", dt(2011, 12, 22, 0, 30, 0), dt(2011, 12, 22, 2, 0, 0)),
+    ]
+    merged = list(logic.merge_overlapping_people(people, presorted))
+    assert merged == [PersonWithTime("anna", dt(2011, 12, 21, 23, 0, 0), dt(2011, 12, 22, 2, 0, 0))]
+    assert GroupingService(merged, split_by_day=True).group_people_with_time_by_day() == {
+        date(2011, 12, 21): 60 * 60,
+        date(2011, 12, 22): 2 * 60 * 60,
+    }
+
+
+def test_merged_people_are_not_longer_than_the_original():
+    people = random_people(500)
+    merged = list(logic.merge_overlapping_people(people))
+    assert sum(GroupingService(merged).group_people_with_time_by_day().values()) <= sum(
+        GroupingService(people).group_people_with_time_by_day().values()
+    )
+
+
+def test_select_durations():
+    durations = {date(2020, 1, day): duration for day, duration in enumerate([5, 1, 7, 3, 7, 0], start=1)}
+    assert logic.select_durations(durations.items()) == sorted(durations.items())
+    assert logic.select_durations(durations.items(), top=3) == [
+        (date(2020, 1, 3), 7),
+        (date(2020, 1, 5), 7),
+        (date(2020, 1, 1), 5),
+    ]
+    assert logic.select_durations(reversed(durations.items()), bottom=2) == [
+        (date(2020, 1, 6), 0),
+        (date(2020, 1, 2), 1),
+    ]
+    assert logic.select_durations(durations.items(), min_duration=3, max_duration=5) == [
+        (date(2020, 1, 1), 5),
+        (date(2020, 1, 4), 3),
+    ]
+    assert logic.select_durations(durations.items(), top=1, max_duration=6) == [(date(2020, 1, 1), 5)]
+    assert logic.select_durations(iter(durations.items()), bottom=10, min_duration=8) == []
+    selected = logic.select_durations(iter(sorted(durations.items())), min_duration=3, presorted=True)
+    assert not isinstance(selected, list)  # streams of spilled groupings are filtered as they come
+    assert [day for day, _ in selected] == [date(2020, 1, 1), date(2020, 1, 3), date(2020, 1, 4), date(2020, 1, 5)]
+    with pytest.raises(ValueError):
+        logic.select_durations(durations.items(), top=1, bottom=1)
@@ -0,0 +1,97 @@
+from datetime import datetime as dt
+from xml.etree.ElementTree import ParseError
+
+import pytest
+
+from attendance_analyzer import logic, reader
+from attendance_analyzer.parallel import ShardSource, group_people_in_parallel, split_into_shards
+from attendance_analyzer.tests.unit.helpers import DEFAULT_DATETIME_PATTERN
+
+TESTING_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<people>
+    <person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 10:01:00</end></person>
+    <person full_name="anna"><start>21-12-2011 10:01:00</start><end>21-12-2011 10:03:00</end></person>
+    <person full_name="ivan"><start>22-12-2011 10:02:00</start><end>22-12-2011 10:05:00</end></person>
+    <person full_name="anna"><start>22-12-2011 10:03:00</start><end>22-12-2011 10:07:00</end></person>
+    <person full_name="ivan"><start>23-12-2011 10:03:00</start><end>23-12-2011 10:08:00</end></person>
+</people>
+"""
+
+
+@pytest.fixture
+def xml_file(tmp_path):
+    def write(text: str) -> str:
+        path = tmp_path / "people.xml"
+        path.write_text(text)
+        return str(path)
+
+    return write
+
+
+@pytest.mark.parametrize("shards", [1, 2, 3, 5, 10])
+def test_shards_are_readable_on_their_own(xml_file, shards):
+    filename = xml_file(TESTING_XML)
+    people = []
+    with open(filename, "rb") as file:
+        for shard in split_into_shards(filename, shards):
+            people.extend(reader.XMLPeopleReader(ShardSource(file, shard), DEFAULT_DATETIME_PATTERN).read_attendance())
+    assert people == list(reader.XMLPeopleReader(filename, DEFAULT_DATETIME_PATTERN).read_attendance())
+
+
+def test_shards_start_at_person_tags(xml_file):
+    filename = xml_file(TESTING_XML)
+    shards = split_into_shards(filename, 3)
+    assert len(shards) == 3
+    with open(filename, "rb") as file:
+        content = file.read()
+    assert shards[0].start == 0 and shards[-1].end == len(content)
+    for shard in shards[1:]:
+        assert content[shard.start :].startswith(b"<person ")  # noqa: E203
+
+
+@pytest.mark.parametrize("group", [True, False])
+@pytest.mark.parametrize(
+    "people_to_filter,start_dt,end_dt",
+    [
+        (None, None, None),
+        (("anna",), None, None),
+        (None, dt(2011, 12, 22), dt(2011, 12, 22, 23, 59, 59)),
+    ],
+)
+def test_grouping_in_parallel_is_equal_to_sequential_one(xml_file, group, people_to_filter, start_dt, end_dt):
+    filename = xml_file(TESTING_XML)
+    service = logic.GroupingService(
+        logic.PeopleRepository(filename, DEFAULT_DATETIME_PATTERN).get_filtered_people(
+            people_to_filter, start_dt, end_dt
+        )
+    )
+    expected = service.group_people_with_time_by_person_and_day() if group else service.group_people_with_time_by_day()
+    assert (
+        group_people_in_parallel(
+            filename, DEFAULT_DATETIME_PATTERN, 2, group, people_to_filter, start_dt, end_dt, shard_size=100
+        )
+        == expected
+    )
+
+
+@pytest.mark.parametrize(
+    "broken_person,exception_class",
+    [
+        (
+            '<person full_name="ivan"><start>WRONG</start><end>24-12-2011 10:00:00</end></person>',
+            reader.UnrecognizableDateTimeException,
+        ),
+        ('<person full_name="ivan"><end>24-12-2011 10:00:00</end></person>', reader.WrongStructureOfFileException),
+        (
+            "<person><start>24-12-2011 10:00:00</start><end>24-12-2011 10:00:00</end></person>",
+            reader.UnknownPersonFullNameException,
+        ),
+        ('<person full_name="ivan"><start>24-12-2011 10:00:00</start><end>24-12-2011 10:00:00</end>', ParseError),
+    ],
+)
+def test_grouping_in_parallel_raises_like_reader(xml_file, broken_person, exception_class):
+    filename = xml_file(TESTING_XML.replace("</people>", f"    {broken_person}\n</people>"))
+    with pytest.raises(exception_class):
+        list(reader.XMLPeopleReader(filename, DEFAULT_DATETIME_PATTERN).read_attendance())
+    with pytest.raises(exception_class):
+        group_people_in_parallel(filename, DEFAULT_DATETIME_PATTERN, 2, True, shard_size=100)
@@ -0,0 +1,84 @@
+import gzip
+import io
+import threading
+
+import pytest
+
+from attendance_analyzer import pipeline
+from attendance_analyzer.pipeline import PrefetchedSource, ThreadedOutput, iter_in_thread
+from attendance_analyzer.source import InputFile, open_input
+
+
+@pytest.mark.parametrize("batch_size, items", [(1, 0), (1, 10), (3, 10), (1024, 5000)])
+def test_iter_in_thread_keeps_items_and_order(batch_size, items):
+    assert list(iter_in_thread(range(items), batch_size=batch_size, queue_size=2)) == list(range(items))
+
+
+def test_iter_in_thread_raises_error_after_produced_items():
+    def produce():
+        yield from range(5)
+        raise ValueError("broken")
+
+    consumed = []
+    with pytest.raises(ValueError, match="broken"):
+        for item in iter_in_thread(produce(), batch_size=2):
+            consumed.append(item)
+    assert consumed == list(range(5))
+
+
+def test_iter_in_thread_has_backpressure_and_stops_with_consumer():
+    produced = []
+    blocked = threading.Event()
+
+    def produce():
+        for item in range(1000):
+            produced.append(item)
+            yield item
+        blocked.set()
+
+    items = iter_in_thread(produce(), batch_size=10, queue_size=2)
+    assert next(items) == 0
+    assert not blocked.wait(0.3)
+    # batches in the queue, the one taken by the consumer and the one waiting to be put
+    assert len(produced) <= 10 * 4 + 1
+    items.close()
+    assert not blocked.wait(pipeline.POLL_INTERVAL * 3)
+
+
+@pytest.mark.parametrize("compressed", [False, True])
+def test_prefetched_source_reads_the_same_bytes(tmp_path, compressed):
+    path = tmp_path / "people.xml"
+    content = bytes(range(256)) * 1000
+    with (gzip.open if compressed else open)(path, "wb") as file:
+        file.write(content)
+    prefetched = PrefetchedSource(InputFile(str(path), read_buffer=1000))
+    with open_input(prefetched) as chunks:
+        assert b"".join(bytes(chunk) for chunk in chunks) == content
+    prefetched.close()
+
+
+@pytest.mark.parametrize("output, parts", [(io.StringIO(), ["row,1\r\n"] * 100), (io.BytesIO(), [b"\x01\x02"] * 100)])
+def test_threaded_output_writes_everything_in_blocks(output, parts):
+    writes = []
+    write = output.write
+    output.write = lambda block: writes.append(block) or write(block)
+    threaded = ThreadedOutput(output, buffer_size=100, queue_size=1)
+    for part in parts:
+        threaded.write(part)
+    threaded.close()
+    threaded.close()
+    assert output.getvalue() == parts[0][:0].join(parts)
+    assert 1 < len(writes) < len(parts)
+
+
+def test_threaded_output_raises_error_of_writes():
+    class BrokenOutput(io.StringIO):
+        def write(self, block):
+            raise OSError("disk is full")
+
+    threaded = ThreadedOutput(BrokenOutput(), buffer_size=1)
+    with pytest.raises(OSError, match="disk is full"):
+        for _ in range(100):
+            threaded.write("row\n")
+        threaded.close()
+    threaded.cancel()
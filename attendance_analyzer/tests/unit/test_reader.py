@@ -5,11 +5,27 @@ import pytest
 
 from attendance_analyzer import reader
 from attendance_analyzer.helpers import PersonWithTime
-from attendance_analyzer.reader import WrongTimeException, XMLPeopleReader
+from attendance_analyzer.reader import (
+    ExpatPeopleReader,
+    LxmlPeopleReader,
+    ScannerPeopleReader,
+    WrongTimeException,
+    XMLPeopleReader,
+)
 from attendance_analyzer.tests.unit.helpers import DEFAULT_DATETIME_PATTERN, FakeFile
 
+READER_CLASSES = [
+    XMLPeopleReader,
+    ExpatPeopleReader,
+    ScannerPeopleReader,
+    pytest.param(
+        LxmlPeopleReader, marks=pytest.mark.skipif(not reader.is_lxml_available(), reason="lxml is not installed")
+    ),
+]
+
 
-def test_reader_returns_people_with_time():
+@pytest.mark.parametrize("reader_class", READER_CLASSES)
+def test_reader_returns_people_with_time(reader_class):
     fake_file = FakeFile(
         """
     <people>
@@ -18,13 +34,14 @@ def test_reader_returns_people_with_time():
     </people>
     """.encode()
     )
-    assert list(XMLPeopleReader(fake_file, DEFAULT_DATETIME_PATTERN).read_attendance()) == [
+    assert list(reader_class(fake_file, DEFAULT_DATETIME_PATTERN).read_attendance()) == [
         PersonWithTime("ivan", dt(2011, 12, 21, 10, 54, 47), dt(2011, 12, 21, 10, 55, 47)),
         PersonWithTime("anna", dt(2011, 12, 21, 10, 54, 47), dt(2011, 12, 21, 10, 56, 47)),
     ]
 
 
-def test_reader_returns_people_with_time_with_changed_datetime_pattern():
+@pytest.mark.parametrize("reader_class", READER_CLASSES)
+def test_reader_returns_people_with_time_with_changed_datetime_pattern(reader_class):
     fake_file = FakeFile(
         """
     <people>
@@ -33,7 +50,7 @@ def test_reader_returns_people_with_time_with_changed_datetime_pattern():
     </people>
     """.encode()
     )
-    assert list(XMLPeopleReader(fake_file, "%Y-%d-%m %H:%M:%S").read_attendance()) == [
+    assert list(reader_class(fake_file, "%Y-%d-%m %H:%M:%S").read_attendance()) == [
         PersonWithTime("ivan", dt(2011, 12, 21, 10, 54, 47), dt(2011, 12, 21, 10, 55, 47)),
         PersonWithTime("anna", dt(2011, 12, 21, 10, 54, 47), dt(2011, 12, 21, 10, 56, 47)),
     ]
@@ -94,6 +111,180 @@ def test_reader_returns_people_with_time_with_changed_datetime_pattern():
         ),
     ],
 )
-def test_reader_raises_on_wrong_format_of_people(text, exception_class):
+@pytest.mark.parametrize("reader_class", READER_CLASSES)
+def test_reader_raises_on_wrong_format_of_people(text, exception_class, reader_class):
     with pytest.raises(exception_class):
-        list(XMLPeopleReader(FakeFile(text.encode()), DEFAULT_DATETIME_PATTERN).read_attendance())
+        list(reader_class(FakeFile(text.encode()), DEFAULT_DATETIME_PATTERN).read_attendance())
+
+
+@pytest.mark.parametrize("reader_class", READER_CLASSES)
+@pytest.mark.parametrize(
+    "text",
+    [
+        pytest.param(
+            '<?xml version="1.0" encoding="UTF-8"?>\n<people>\n'
+            + '<person full_name="ivan"><start>21-12-2011 10:54:47</start><end>21-12-2011 10:55:47</end></person>\n'
+            * 5000
+            + "</people>\n",
+            id="many chunks",
+        ),
+        pytest.param(
+            """<people>
+            <person full_name="ivan"><start>21-12-2011 10:54:47</start><end>21-12-2011 10:55:47</end></person>
+            <!-- comment -->
+            <person full_name="&#1072;&amp;b" id="1"><start>21-12-2011 10:54:47</start><end>21-12-2011 10:56:47</end>
+            </person>
+            <person full_name="ivan"><start>21-12-2011 10:54:47</start><end>21-12-2011 10:55:47</end></person>
+            </people>""",
+            id="layout of scanner is broken in the middle",
+        ),
+        pytest.param(
+            """<people><person full_name="анна"><start>21-12-2011 10:54:47</start><end>21-12-2011 10:56:47</end>
+            </person></people><junk>""",
+            id="junk after people",
+        ),
+    ],
+)
+def test_readers_read_the_same_people(reader_class, text):
+    people = list(XMLPeopleReader(FakeFile(text.encode()), DEFAULT_DATETIME_PATTERN).read_attendance())
+    assert list(reader_class(FakeFile(text.encode()), DEFAULT_DATETIME_PATTERN).read_attendance()) == people
+
+
+@pytest.mark.parametrize("reader_class", READER_CLASSES)
+def test_readers_read_file_in_other_encoding(reader_class, tmp_path):
+    path = tmp_path / "people.xml"
+    path.write_bytes(
+        """<?xml version="1.0" encoding="windows-1251"?>
+        <people>
+            <person full_name="анна"><start>21-12-2011 10:54:47</start><end>21-12-2011 10:56:47</end></person>
+        </people>""".encode("cp1251")
+    )
+    assert list(reader_class(str(path), DEFAULT_DATETIME_PATTERN).read_attendance()) == [
+        PersonWithTime("анна", dt(2011, 12, 21, 10, 54, 47), dt(2011, 12, 21, 10, 56, 47)),
+    ]
+
+
+FILTERED_XML = """
+<people>
+    <person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>
+    <person full_name="anna"><start>wrong</start><end>21-12-2011 10:56:47</end></person>
+    <person full_name="ivan"><start>22-12-2011 10:00:00</start><end>23-12-2011 01:00:00</end></person>
+    <person full_name="ivan"><start>20-12-2011 23:00:00</start><end>21-12-2011 01:00:00</end></person>
+    <person full_name="anna"><start>22-12-2011 12:00:00</start><end>22-12-2011 10:00:00</end></person>
+</people>
+"""
+
+
+@pytest.mark.parametrize("reader_class", READER_CLASSES)
+def test_reader_skips_people_not_matching_filter(reader_class):
+    parsed = []
+
+    def datetime_parser_factory(regex):
+        parser = reader.DateTimeParser(regex)
+
+        def parse(text):
+            parsed.append(text)
+            return parser(text)
+
+        return parse
+
+    people_filter = reader.PeopleFilter(["ivan"], dt(2011, 12, 21), dt(2011, 12, 22, 23, 59, 59, 999999))
+    people = list(
+        reader_class(
+            FakeFile(FILTERED_XML.encode()), DEFAULT_DATETIME_PATTERN, datetime_parser_factory
+        ).read_attendance(people_filter)
+    )
+    assert people == [PersonWithTime("ivan", dt(2011, 12, 21, 10), dt(2011, 12, 21, 12))]
+    assert people_filter.skipped == 4
+    # datetimes of anna aren't parsed, so her wrong ones aren't noticed, ivan's ones are checked on the raw text
+    assert parsed[:2] == ["21-12-2011 10:00:00", "21-12-2011 12:00:00"]
+    assert not {"wrong", "22-12-2011 12:00:00", "23-12-2011 01:00:00", "20-12-2011 23:00:00"} & set(parsed)
+
+
+@pytest.mark.parametrize("reader_class", READER_CLASSES)
+def test_reader_with_filter_keeps_validating_structure(reader_class):
+    text = """
+    <people>
+        <person full_name="anna"><start>21-12-2011 10:54:47</start></person>
+    </people>
+    """
+    with pytest.raises(reader.WrongStructureOfFileException):
+        list(
+            reader_class(FakeFile(text.encode()), DEFAULT_DATETIME_PATTERN).read_attendance(
+                reader.PeopleFilter(["ivan"])
+            )
+        )
+    text = """
+    <people>
+        <person><start>21-12-2011 10:54:47</start><end>21-12-2011 10:54:47</end></person>
+    </people>
+    """
+    with pytest.raises(reader.UnknownPersonFullNameException):
+        list(
+            reader_class(FakeFile(text.encode()), DEFAULT_DATETIME_PATTERN).read_attendance(
+                reader.PeopleFilter(["ivan"])
+            )
+        )
+
+
+DIRTY_PEOPLE = """<?xml version="1.0" encoding="UTF-8"?>
+<people>
+    <person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>
+    <person full_name="anna"><start>22-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>
+    <person full_name="petr"><start>yesterday</start><end>21-12-2011 12:00:00</end></person>
+    <person><start>21-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>
+    <person full_name="olga"><start>21-12-2011 10:00:00</start></person>
+    <person full_name="ivan"><start>22-12-2011 10:00:00</start><end>22-12-2011 12:00:00</end></person>
+</people>"""
+
+
+@pytest.mark.parametrize("reader_class", [ExpatPeopleReader, ScannerPeopleReader])
+@pytest.mark.parametrize("padding", [0, reader.SCANNER_LOOKAHEAD])
+def test_lenient_reader_skips_broken_records(reader_class, padding, tmp_path):
+    text = DIRTY_PEOPLE.replace("<people>", "<people>" + " " * padding).encode()
+    path = tmp_path / "dirty.xml"
+    path.write_bytes(text)
+    quarantined = []
+    record_errors = reader.RecordErrors(quarantined.append)
+    people = list(reader_class(str(path), DEFAULT_DATETIME_PATTERN, record_errors=record_errors).read_attendance())
+
+    assert [person.full_name for person in people] == ["ivan", "ivan"]
+    assert [(error.full_name, type(error.error)) for error in quarantined] == [
+        ("anna", WrongTimeException),
+        ("petr", reader.UnrecognizableDateTimeException),
+        (None, reader.UnknownPersonFullNameException),
+        ("olga", reader.WrongStructureOfFileException),
+    ]
+    assert all(text[error.offset :].startswith(b"<person") for error in quarantined)  # noqa: E203
+    assert len(record_errors) == 4 and record_errors.counts["WrongTimeException"] == 1
+
+
+def test_lenient_reader_keeps_filter_and_raises_broken_xml():
+    people_filter = reader.PeopleFilter(["ivan"], start_dt=dt(2011, 12, 22))
+    record_errors = reader.RecordErrors()
+    people = list(
+        ExpatPeopleReader(
+            FakeFile(DIRTY_PEOPLE.encode()), DEFAULT_DATETIME_PATTERN, record_errors=record_errors
+        ).read_attendance(people_filter)
+    )
+    assert people == [PersonWithTime("ivan", dt(2011, 12, 22, 10), dt(2011, 12, 22, 12))]
+    assert people_filter.skipped == 3  # the first ivan, anna and petr
+    # records of other people are skipped unparsed, so only missing full_name and structure are errors
+    assert sorted(record_errors.counts) == ["UnknownPersonFullNameException", "WrongStructureOfFileException"]
+
+    broken_xml = FakeFile(DIRTY_PEOPLE.replace("</people>", "</peopl>").encode())
+    lenient_reader = ExpatPeopleReader(broken_xml, DEFAULT_DATETIME_PATTERN, record_errors=reader.RecordErrors())
+    with pytest.raises(ParseError):
+        list(lenient_reader.read_attendance())
+
+
+def test_only_lenient_readers_take_record_errors():
+    with pytest.raises(ValueError):
+        XMLPeopleReader("people.xml", DEFAULT_DATETIME_PATTERN, record_errors=reader.RecordErrors())
+
+
+def test_describe_error():
+    assert reader.describe_error(reader.WrongStructureOfFileException()) == "Wrong structure of the given file."
+    assert reader.describe_error(reader.UnrecognizableDateTimeException("%d", "x")) == (
+        "'x' does not match datetime pattern '%d'."
+    )
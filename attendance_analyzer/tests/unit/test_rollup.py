@@ -0,0 +1,70 @@
+import io
+from datetime import date
+
+import pytest
+
+from attendance_analyzer.rollup import ROLLUPS, Rollups, read_departments
+
+GROUPING = {
+    (date(2011, 12, 31), "ivan"): 7200,
+    (date(2012, 1, 1), "anna"): 60,
+    (date(2012, 1, 2), "anna"): 54000,
+    (date(2012, 1, 2), "ivan"): 3600,
+    (date(2012, 2, 1), "petr"): 1,
+}
+
+
+def test_rollups_are_summed_from_grouping_by_person_and_day():
+    rollups = Rollups(ROLLUPS, {"ivan": "dev", "anna": "dev", "petr": "ops"})
+    rollups.update(GROUPING.items())
+
+    assert rollups.items("day") == [
+        (date(2011, 12, 31), 7200),
+        (date(2012, 1, 1), 60),
+        (date(2012, 1, 2), 57600),
+        (date(2012, 2, 1), 1),
+    ]
+    assert rollups.items("week") == [((2011, 52), 7260), ((2012, 1), 57600), ((2012, 5), 1)]
+    assert rollups.items("month") == [((2011, 12), 7200), ((2012, 1), 57660), ((2012, 2), 1)]
+    assert rollups.items("employee") == [("anna", 54060), ("ivan", 10800), ("petr", 1)]
+    assert rollups.items("department") == [("dev", 64860), ("ops", 1)]
+
+
+def test_rollups_are_updated_by_parts():
+    rollups = Rollups(["month"])
+    items = list(GROUPING.items())
+    rollups.update(items[:2])
+    rollups.update(items[2:])
+    assert rollups.items("month") == [((2011, 12), 7200), ((2012, 1), 57660), ((2012, 2), 1)]
+    with pytest.raises(KeyError):
+        rollups.items("day")
+
+
+def test_rollup_by_department_requires_mapping():
+    with pytest.raises(ValueError):
+        Rollups(["department"])
+
+    rollups = Rollups(["department"], {"ivan": "dev, qa"})
+    rollups.update(GROUPING.items())
+    assert rollups.items("department") == [("", 54061), ("dev, qa", 10800)]
+
+
+def test_rollups_are_written_as_csv_sections():
+    rollups = Rollups(["employee", "week", "department"], {"ivan": "dev, qa"})
+    rollups.update(GROUPING.items())
+    output = io.StringIO()
+    rollups.write_out(output)
+    assert output.getvalue() == (
+        "week,duration\r\n2011-W52,2:01:00\r\n2012-W01,16:00:00\r\n2012-W05,0:00:01\r\n"
+        "\r\n"
+        "name,duration\r\nanna,15:01:00\r\nivan,3:00:00\r\npetr,0:00:01\r\n"
+        "\r\n"
+        'department,duration\r\n,15:01:01\r\n"dev, qa",3:00:00\r\n'
+    )
+
+
+def test_read_departments():
+    assert read_departments(io.StringIO('name,department\nivan,dev\n\n"a, b",ops\n')) == {"ivan": "dev", "a, b": "ops"}
+    assert read_departments(io.StringIO("ivan,dev\n")) == {"ivan": "dev"}
+    with pytest.raises(ValueError):
+        read_departments(io.StringIO("ivan,dev\nanna\n"))
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+from datetime import datetime as dt
+
+from attendance_analyzer.helpers import PersonWithTime
+from attendance_analyzer.server import AttendanceQueryService, AttendanceServer
+
+PEOPLE = [
+    PersonWithTime("ivan", dt(2011, 12, 21, 10, 0, 0), dt(2011, 12, 21, 12, 0, 0)),
+    PersonWithTime("anna", dt(2011, 12, 22, 0, 0, 0), dt(2011, 12, 22, 15, 0, 0)),
+    PersonWithTime("ivan", dt(2011, 12, 22, 10, 0, 0), dt(2011, 12, 22, 12, 0, 0)),
+]
+
+
+def test_service_answers_like_the_command():
+    service = AttendanceQueryService(PEOPLE)
+    assert service.answer(False).split() == ["date,duration", "21-12-2011,2:00:00", "22-12-2011,17:00:00"]
+    assert service.answer(True, ["ivan"], dt(2011, 12, 22)).split() == ["date,name,duration", "22-12-2011,ivan,2:00:00"]
+
+
+def test_service_caches_normalized_queries():
+    service = AttendanceQueryService(PEOPLE, cache_size=1)
+    service.answer(True, ["ivan", "anna"])
+    service.answer(True, ["anna", "ivan", "anna"])
+    assert service.cache_info()[:2] == (1, 1)
+    service.answer(False)
+    service.answer(True, ["ivan", "anna"])
+    assert service.cache_info()[:2] == (1, 3)
+
+
+def test_server_responses():
+    server = AttendanceServer(AttendanceQueryService(PEOPLE))
+    status, content_type, body = server.respond("GET", "/attendance?group=1&person=anna")
+    assert (status, content_type) == (200, "text/csv; charset=utf-8")
+    assert body.split() == [b"date,name,duration", b"22-12-2011,anna,15:00:00"]
+    assert server.respond("GET", "/attendance?start=WRONG")[0] == 400
+    assert server.respond("GET", "/")[0] == 404
+    assert server.respond("POST", "/attendance")[0] == 405
+
+
+async def request_twice(port: int) -> bytes:
+    stream_reader, stream_writer = await asyncio.open_connection("127.0.0.1", port)
+    stream_writer.write(b"GET /attendance?end=21-12-2011 HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    stream_writer.write(b"GET /attendance?group=true HTTP/1.1\r\nConnection: close\r\n\r\n")
+    response = await stream_reader.read()
+    stream_writer.close()
+    return response
+
+
+def test_server_keeps_connections_alive():
+    async def run() -> bytes:
+        listening = await AttendanceServer(AttendanceQueryService(PEOPLE)).start(port=0)
+        async with listening:
+            return await request_twice(listening.sockets[0].getsockname()[1])
+
+    first, second = asyncio.run(run()).split(b"HTTP/1.1 200 OK\r\n")[1:]
+    assert first.endswith(b"\r\n\r\ndate,duration\r\n21-12-2011,2:00:00\r\n")
+    assert b"Connection: keep-alive" in first
+    assert b"Connection: close" in second
+    assert second.endswith(b"22-12-2011,ivan,2:00:00\r\n")
+
+
+def test_server_responds_outside_of_the_loop():
+    server = AttendanceServer(AttendanceQueryService(PEOPLE))
+    respond, threads = server.respond, []
+
+    def record_thread(method: str, target: str):
+        threads.append(threading.current_thread())
+        return respond(method, target)
+
+    server.respond = record_thread
+
+    async def run() -> bytes:
+        listening = await server.start(port=0)
+        async with listening:
+            return await request_twice(listening.sockets[0].getsockname()[1])
+
+    assert asyncio.run(run()).count(b"HTTP/1.1 200 OK\r\n") == 2
+    assert len(threads) == 2 and threading.main_thread() not in threads
@@ -0,0 +1,74 @@
+import gzip
+import io
+
+import pytest
+
+from attendance_analyzer import reader
+from attendance_analyzer.source import GZIP, ZSTD, InputFile, detect_compression, open_input
+from attendance_analyzer.tests.unit.helpers import DEFAULT_DATETIME_PATTERN
+
+DATA = b"<people>" + b"<person/>" * 1000 + b"</people>"
+
+
+@pytest.fixture
+def path(tmp_path) -> str:
+    path = tmp_path / "people.xml"
+    path.write_bytes(DATA)
+    return str(path)
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_file_is_read_in_chunks_of_read_buffer(path, use_mmap):
+    with open_input(InputFile(path, read_buffer=1000, use_mmap=use_mmap)) as chunks:
+        chunks = [bytes(chunk) for chunk in chunks]
+    assert b"".join(chunks) == DATA
+    assert {len(chunk) for chunk in chunks[:-1]} == {1000}
+
+
+def test_empty_file_is_mapped_to_no_chunks(tmp_path):
+    (tmp_path / "empty.xml").write_bytes(b"")
+    with open_input(InputFile(str(tmp_path / "empty.xml"), use_mmap=True)) as chunks:
+        assert list(chunks) == []
+
+
+def test_file_like_object_is_left_open():
+    file = io.BytesIO(DATA)
+    with open_input(file) as chunks:
+        assert b"".join(chunks) == DATA
+    assert not file.closed
+
+
+def test_gzip_file_is_decompressed(tmp_path):
+    path = str(tmp_path / "people.xml.gz")
+    with gzip.open(path, "wb") as file:
+        file.write(DATA)
+    assert detect_compression(path) == GZIP
+    with open_input(InputFile(path, read_buffer=1000, use_mmap=True)) as chunks:
+        assert b"".join(chunks) == DATA
+
+
+def test_zstd_file_is_decompressed(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    path = tmp_path / "people.xml.zst"
+    path.write_bytes(zstandard.ZstdCompressor().compress(DATA))
+    assert detect_compression(str(path)) == ZSTD
+    with open_input(str(path)) as chunks:
+        assert b"".join(chunks) == DATA
+
+
+def test_uncompressed_file_is_detected(path):
+    assert detect_compression(path) is None
+
+
+@pytest.mark.parametrize("reader_class", [reader.XMLPeopleReader, reader.ExpatPeopleReader, reader.ScannerPeopleReader])
+def test_readers_read_the_same_people_from_mapped_file(tmp_path, reader_class):
+    path = tmp_path / "people.xml"
+    path.write_bytes(
+        b"<people>"
+        + b'<person full_name="ivan"><start>21-12-2011 10:54:47</start><end>21-12-2011 10:55:47</end></person>' * 100
+        + b"</people>"
+    )
+    people = list(reader.XMLPeopleReader(str(path), DEFAULT_DATETIME_PATTERN).read_attendance())
+    input_file = InputFile(str(path), read_buffer=100, use_mmap=True)
+    assert list(reader_class(input_file, DEFAULT_DATETIME_PATTERN).read_attendance()) == people
+    assert len(people) == 100
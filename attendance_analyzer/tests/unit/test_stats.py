@@ -0,0 +1,57 @@
+import io
+import json
+
+import pytest
+
+from attendance_analyzer import stats
+from attendance_analyzer.logic import GroupingService, PeopleRepository
+from attendance_analyzer.reader import PARSERS
+from attendance_analyzer.stats import PipelineStats
+
+from .helpers import DEFAULT_DATETIME_PATTERN
+
+XML = b"""<people>
+    <person full_name="ivan"><start>21-12-2011 10:00:00</start><end>21-12-2011 12:00:00</end></person>
+    <person full_name="anna"><start>22-12-2011 00:00:00</start><end>22-12-2011 15:00:00</end></person>
+    <person full_name="ivan"><start>22-12-2011 10:00:00</start><end>22-12-2011 12:00:00</end></person>
+</people>"""
+
+
+@pytest.mark.parametrize("reader_class", [reader_class for name, reader_class in PARSERS.items() if name != "lxml"])
+def test_stats_of_pipeline(reader_class):
+    pipeline_stats = PipelineStats(len(XML))
+    reader_obj = pipeline_stats.counting_reader(
+        reader_class(io.BytesIO(XML), DEFAULT_DATETIME_PATTERN, pipeline_stats.datetime_parser_factory)
+    )
+    people = PeopleRepository(reader_obj=reader_obj).get_filtered_people(("ivan",))
+    people = pipeline_stats.count(stats.FILTER, people, upstream=stats.READ)
+    with stats.timed(pipeline_stats, stats.GROUP, stats.FILTER):
+        grouping = GroupingService(people).group_people_with_time_by_day()
+    with stats.timed(pipeline_stats, stats.WRITE, records=len(grouping)):
+        pass
+
+    report = pipeline_stats.report()
+    assert list(report["stages"]) == [stats.READ, stats.DATETIME, stats.FILTER, stats.GROUP, stats.WRITE]
+    # the filter is pushed down into the reader, so datetimes of anna aren't parsed
+    assert [stage["records"] for stage in report["stages"].values()] == [2, 4, 2, 2, 2]
+    assert report["records"] == 3
+    assert report["filtered_out"] == 1
+    assert report["input_size"] == len(XML)
+    assert all(stage["seconds"] >= 0 for stage in report["stages"].values())
+    assert report["seconds"] >= sum(stage["seconds"] for stage in report["stages"].values())
+    json.dumps(report)  # machine-readable as it is
+    assert "filtered out 1 of 3 records" in PipelineStats.format(report)
+
+
+def test_stages_never_run_are_not_reported():
+    pipeline_stats = PipelineStats()
+    pipeline_stats.count(stats.FILTER, [1, 2], upstream=stats.READ)  # never iterated
+    report = pipeline_stats.report()
+    assert report["stages"] == {}
+    assert report["filtered_out"] is None
+    assert report["bytes_per_second"] is None
+
+
+def test_timed_without_stats():
+    with stats.timed(None, stats.GROUP):
+        pass
@@ -0,0 +1,80 @@
+import random
+from datetime import datetime as dt
+from datetime import timedelta, timezone
+from unittest import mock
+
+import pytest
+
+from attendance_analyzer import logic
+from attendance_analyzer.helpers import PersonWithTime
+from attendance_analyzer.store import PeopleStore
+
+
+@pytest.fixture(scope="module")
+def people():
+    rng = random.Random(0)
+    people = []
+    for _ in range(2000):
+        start = dt(1965, 1, 1) + timedelta(seconds=rng.randint(0, 10 ** 9), microseconds=rng.randint(0, 999999))
+        duration = timedelta(seconds=rng.randint(0, 200000), microseconds=rng.randint(0, 999999))
+        people.append(PersonWithTime(rng.choice(("ivan", "anna", "petr")), start, start + duration))
+    return people
+
+
+def test_store_yields_the_same_people(people):
+    store = PeopleStore(people)
+    assert len(store) == len(people)
+    assert list(store) == people
+    assert store[10] == people[10]
+    assert set(store.names) == {"ivan", "anna", "petr"}
+
+
+def test_store_packs_people(people):
+    store = PeopleStore(people)
+    assert store.name_ids.itemsize + store.starts.itemsize + store.ends.itemsize == 20
+
+
+def test_store_does_not_keep_datetimes_with_tzinfo():
+    with pytest.raises(ValueError):
+        PeopleStore([PersonWithTime("ivan", dt(2011, 1, 1, tzinfo=timezone.utc), dt(2011, 1, 2, tzinfo=timezone.utc))])
+
+
+@pytest.mark.parametrize(
+    "people_full_names,start_dt,end_dt",
+    [
+        (None, None, None),
+        (("ivan",), None, None),
+        (("ivan", "nobody"), dt(1980, 1, 1), None),
+        (None, dt(1980, 1, 1), dt(1990, 1, 1, 23, 59, 59, 999999)),
+    ],
+)
+def test_store_selects_like_repository_filters(people, people_full_names, start_dt, end_dt):
+    filtered = logic.PeopleRepository(reader_obj=mock.Mock(read_attendance=lambda: people)).get_filtered_people(
+        people_full_names, start_dt, end_dt
+    )
+    assert list(PeopleStore(people).select(people_full_names, start_dt, end_dt)) == list(filtered)
+
+
+@pytest.mark.parametrize("method", ["group_people_with_time_by_day", "group_people_with_time_by_person_and_day"])
+def test_grouping_of_store_is_equal_to_grouping_of_people(people, method):
+    assert getattr(logic.GroupingService(PeopleStore(people)), method)() == getattr(
+        logic.GroupingService(people), method
+    )()
+
+
+@pytest.mark.parametrize("method", ["group_people_with_time_by_day", "group_people_with_time_by_person_and_day"])
+def test_grouping_of_store_with_split_by_day(people, method):
+    assert getattr(logic.GroupingService(PeopleStore(people), split_by_day=True), method)() == getattr(
+        logic.GroupingService(people, split_by_day=True), method
+    )()
+
+
+def test_compact_repository_reads_people_once(people):
+    reader_obj = mock.Mock(read_attendance=mock.Mock(return_value=iter(people)))
+    repository = logic.PeopleRepository(reader_obj=reader_obj, compact=True)
+    assert isinstance(repository.get_all_people(), PeopleStore)
+    for full_name in ("ivan", "anna"):
+        assert list(repository.get_filtered_people((full_name,))) == [
+            person for person in people if person.full_name == full_name
+        ]
+    reader_obj.read_attendance.assert_called_once()
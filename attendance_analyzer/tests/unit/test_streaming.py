@@ -0,0 +1,64 @@
+import random
+from collections import defaultdict
+from datetime import date
+
+import pytest
+
+from attendance_analyzer import streaming
+from attendance_analyzer.streaming import SpillingAggregator
+
+
+@pytest.fixture
+def pairs():
+    rng = random.Random(0)
+    return [((date(2020, 1, rng.randint(1, 31)), rng.choice("abcdefgh")), rng.randint(0, 3600)) for _ in range(2000)]
+
+
+def summed(pairs) -> dict:
+    result = defaultdict(int)
+    for key, duration in pairs:
+        result[key] += duration
+    return result
+
+
+@pytest.mark.parametrize("memory_limit", [1, 1000, 10_000, 10**9])
+def test_aggregator_yields_sorted_sums(pairs, memory_limit):
+    with SpillingAggregator(memory_limit) as aggregator:
+        aggregator.update(pairs)
+        assert list(aggregator.items()) == sorted(summed(pairs).items())
+
+
+def test_aggregator_spills_into_runs(pairs):
+    with SpillingAggregator(10_000) as aggregator:
+        aggregator.update(pairs)
+        assert aggregator._runs
+        assert aggregator._memory <= 10_000
+
+
+def test_aggregator_keeps_amount_of_runs_bounded(pairs, monkeypatch):
+    monkeypatch.setattr(streaming, "MERGE_FAN_IN", 3)
+    with SpillingAggregator(1) as aggregator:
+        aggregator.update(pairs)
+        assert len(aggregator._runs) > 1
+        assert all(len(runs) < 3 for runs in aggregator._runs)
+        assert list(aggregator.items()) == sorted(summed(pairs).items())
+
+
+def test_aggregator_rewrites_pairs_logarithmically(pairs, monkeypatch):
+    monkeypatch.setattr(streaming, "MERGE_FAN_IN", 4)
+    merged = []
+    merge_runs = SpillingAggregator._merge_runs
+
+    def count_merged(self, runs):
+        merged.append(len(runs))
+        return merge_runs(self, runs)
+
+    monkeypatch.setattr(SpillingAggregator, "_merge_runs", count_merged)
+    with SpillingAggregator(1) as aggregator:
+        aggregator.update(pairs[:64])
+        assert merged == [4] * 16 + [4] * 4 + [4]  # 64 spills of one pair are rewritten in 3 generations
+
+
+def test_aggregator_without_pairs():
+    with SpillingAggregator(1) as aggregator:
+        assert list(aggregator.items()) == []
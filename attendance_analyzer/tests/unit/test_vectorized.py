@@ -0,0 +1,63 @@
+import random
+from datetime import date
+from datetime import datetime as dt
+from datetime import timedelta
+
+import pytest
+
+from attendance_analyzer.helpers import PersonWithTime
+from attendance_analyzer.logic import GroupingService
+from attendance_analyzer.store import PeopleStore
+
+np = pytest.importorskip("numpy")
+
+from attendance_analyzer.vectorized import ArrayGroupingService  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def people():
+    rng = random.Random(0)
+    people = []
+    for _ in range(5000):
+        start = dt(1965, 1, 1) + timedelta(seconds=rng.randint(0, 10 ** 9), microseconds=rng.randint(0, 999999))
+        duration = timedelta(seconds=rng.randint(0, 200000), microseconds=rng.randint(0, 999999))
+        people.append(PersonWithTime(rng.choice(("ivan", "anna", "petr")), start, start + duration))
+    return people
+
+
+@pytest.mark.parametrize("method", ["group_people_with_time_by_day", "group_people_with_time_by_person_and_day"])
+def test_array_grouping_is_equal_to_python_one(people, method):
+    assert getattr(ArrayGroupingService(people), method)() == getattr(GroupingService(people), method)()
+
+
+@pytest.mark.parametrize("method", ["group_people_with_time_by_day", "group_people_with_time_by_person_and_day"])
+def test_array_grouping_without_people(method):
+    assert getattr(ArrayGroupingService([]), method)() == {}
+
+
+def test_array_grouping_from_arrays():
+    service = ArrayGroupingService.from_arrays(
+        ["ivan", "anna"],
+        np.array([0, 1, 0]),
+        np.array([0, 86400, 86400 * 2 - 60]),
+        np.array([60, 86400 + 3600, 86400 * 2]),
+        microseconds_in_unit=10 ** 6,
+    )
+    assert service.group_people_with_time_by_day() == {date(1970, 1, 1): 60, date(1970, 1, 2): 3660}
+    assert service.group_people_with_time_by_person_and_day() == {
+        (date(1970, 1, 1), "ivan"): 60,
+        (date(1970, 1, 2), "anna"): 3600,
+        (date(1970, 1, 2), "ivan"): 60,
+    }
+
+
+@pytest.mark.parametrize("method", ["group_people_with_time_by_day", "group_people_with_time_by_person_and_day"])
+def test_array_grouping_of_store(people, method):
+    assert getattr(ArrayGroupingService(PeopleStore(people)), method)() == getattr(GroupingService(people), method)()
+
+
+@pytest.mark.parametrize("method", ["group_people_with_time_by_day", "group_people_with_time_by_person_and_day"])
+def test_array_grouping_with_split_by_day_is_equal_to_python_one(people, method):
+    expected = getattr(GroupingService(people, split_by_day=True), method)()
+    assert getattr(ArrayGroupingService(people, split_by_day=True), method)() == expected
+    assert getattr(ArrayGroupingService(PeopleStore(people), split_by_day=True), method)() == expected
@@ -1,9 +1,22 @@
+import io
+import json
+import random
 import sys
-from datetime import date
+from datetime import date, timedelta
 
 import pytest
 
-from attendance_analyzer.writer import CSVWriter
+from attendance_analyzer import writer as writer_module
+from attendance_analyzer.writer import (
+    ArrowWriter,
+    CSVWriter,
+    FastCSVWriter,
+    NDJSONWriter,
+    PackedWriter,
+    ParquetWriter,
+    format_duration,
+    iter_packed_rows,
+)
 
 
 @pytest.fixture(scope="module")
@@ -46,3 +59,110 @@ def test_write_out_person_and_date_to_duration_in_seconds_mapping(capsys, _dict,
     writer.write_out_person_and_date_to_duration_in_seconds_mapping(_dict)
     out = capsys.readouterr().out.split("\r\n")
     assert ["date,name,duration", *output_as_list] == list(filter(str.__len__, out))  # filter out empty strings
+
+
+def test_write_out_sorted_date_durations_in_seconds_keeps_order(capsys):
+    writer = CSVWriter(sys.stdout)
+    writer.write_out_sorted_date_durations_in_seconds(iter([(date(2020, 1, 2), 60), (date(2020, 1, 1), 3600)]))
+    out = capsys.readouterr().out.split("\r\n")
+    assert ["date,duration", "02-01-2020,0:01:00", "01-01-2020,1:00:00"] == list(filter(str.__len__, out))
+
+
+def test_write_out_sorted_person_and_date_durations_in_seconds_keeps_order(capsys):
+    writer = CSVWriter(sys.stdout)
+    writer.write_out_sorted_person_and_date_durations_in_seconds(
+        iter([((date(2020, 1, 2), "ivan"), 60), ((date(2020, 1, 1), "anna"), 3600)])
+    )
+    out = capsys.readouterr().out.split("\r\n")
+    assert ["date,name,duration", "02-01-2020,ivan,0:01:00", "01-01-2020,anna,1:00:00"] == list(
+        filter(str.__len__, out)
+    )
+
+
+@pytest.mark.parametrize("duration", [0, 1, 59, 60, 3599, 3600, 86399, 86400, 86401, 2 * 86400 + 5, 10**9, -1, 1.5])
+def test_format_duration(duration):
+    assert format_duration(duration) == str(timedelta(seconds=duration))
+
+
+def test_fast_writer_writes_the_same_bytes():
+    rng = random.Random(0)
+    names = ["ivan", "anna maria", 'a "quoted", name', "line\nbreak", "carriage\rreturn", " spaces ", ""]
+    person_and_date_durations = {
+        (date(rng.choice([5, 999, 2011, 2020]), rng.randint(1, 12), rng.randint(1, 28)), rng.choice(names)): rng.choice(
+            [0, rng.randint(0, 86399), rng.randint(86400, 10**7)]
+        )
+        for _ in range(20000)
+    }
+    date_durations = {date: duration for (date, _), duration in person_and_date_durations.items()}
+    for method, grouping in (
+        ("write_out_person_and_date_to_duration_in_seconds_mapping", person_and_date_durations),
+        ("write_out_date_to_duration_in_seconds_mapping", date_durations),
+    ):
+        expected, output = io.StringIO(), io.StringIO()
+        getattr(CSVWriter(expected), method)(grouping)
+        getattr(FastCSVWriter(output), method)(grouping)
+        assert output.getvalue() == expected.getvalue()
+
+
+PERSON_AND_DATE_DURATIONS = {
+    (date(2011, 12, 21), "ivan"): 7200,
+    (date(1969, 12, 31), "анна"): 0,
+    (date(2020, 1, 1), 'a "quoted", name'): 10**10,
+}
+
+
+def test_ndjson_writer():
+    output = io.StringIO()
+    NDJSONWriter(output).write_out_person_and_date_to_duration_in_seconds_mapping(PERSON_AND_DATE_DURATIONS)
+    assert [json.loads(line) for line in output.getvalue().splitlines()] == [
+        {"date": "1969-12-31", "name": "анна", "duration": 0},
+        {"date": "2011-12-21", "name": "ivan", "duration": 7200},
+        {"date": "2020-01-01", "name": 'a "quoted", name', "duration": 10**10},
+    ]
+
+
+@pytest.mark.parametrize("rows_in_group", [1, 2, 1024])
+def test_packed_writer_round_trip(monkeypatch, rows_in_group):
+    monkeypatch.setattr(writer_module, "ROWS_IN_GROUP", rows_in_group)
+    output = io.BytesIO()
+    PackedWriter(output).write_out_person_and_date_to_duration_in_seconds_mapping(PERSON_AND_DATE_DURATIONS)
+    output.seek(0)
+    assert list(iter_packed_rows(output)) == [
+        (date, name, duration) for (date, name), duration in sorted(PERSON_AND_DATE_DURATIONS.items())
+    ]
+
+    output = io.BytesIO()
+    PackedWriter(output).write_out_date_to_duration_in_seconds_mapping({date(2020, 1, 2): 60, date(2020, 1, 1): 1})
+    output.seek(0)
+    assert list(iter_packed_rows(output)) == [(date(2020, 1, 1), 1), (date(2020, 1, 2), 60)]
+
+
+def test_packed_writer_of_nothing():
+    output = io.BytesIO()
+    PackedWriter(output).write_out_date_to_duration_in_seconds_mapping({})
+    output.seek(0)
+    assert list(iter_packed_rows(output)) == []
+
+
+def test_iter_packed_rows_of_another_file():
+    with pytest.raises(ValueError):
+        list(iter_packed_rows(io.BytesIO(b"date,duration\r\n")))
+
+
+@pytest.mark.parametrize("writer_class", [ArrowWriter, ParquetWriter])
+def test_pyarrow_writers(writer_class):
+    pa = pytest.importorskip("pyarrow")
+    output = io.BytesIO()
+    writer_class(output).write_out_person_and_date_to_duration_in_seconds_mapping(PERSON_AND_DATE_DURATIONS)
+    output.seek(0)
+    if writer_class is ArrowWriter:
+        table = pa.ipc.open_file(output).read_all()
+    else:
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(output)
+    assert table.schema.types == [pa.date32(), pa.string(), pa.int64()]
+    assert table.to_pylist() == [
+        {"date": date, "name": name, "duration": duration}
+        for (date, name), duration in sorted(PERSON_AND_DATE_DURATIONS.items())
+    ]
@@ -0,0 +1,134 @@
+import datetime as dt
+import typing
+from array import array
+
+from .helpers import EPOCH, PersonWithTime
+from .logic import MICROSECONDS_IN_DAY, MICROSECONDS_IN_SECOND, GroupingService
+from .store import PeopleStore
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency
+    np = None
+
+__all__ = ("ArrayGroupingService", "is_available")
+
+MICROSECOND = dt.timedelta(microseconds=1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+
+
+def is_available() -> bool:
+    return np is not None
+
+
+class ArrayGroupingService(GroupingService):
+    """
+    GroupingService keeping people as int64 arrays of microseconds since epoch and an array of full_name codes.
+    Days are found by floor division and durations are summed by bincount over unique keys, so groupings
+    are the same as GroupingService makes as long as sums of durations fit into float64 mantissa (2 ** 53 seconds).
+    Durations of single people (iter_durations_*) are still computed one by one by GroupingService.
+    With split_by_day every person is repeated for every day it touches and the seconds credited to a day
+    are the difference of floored seconds since start at its bounds, like split_duration_by_day does.
+    """
+
+    def __init__(self, people: typing.Iterable[PersonWithTime], split_by_day: bool = False):
+        if np is None:
+            raise RuntimeError("numpy is required for ArrayGroupingService.")
+        super().__init__(people, split_by_day)
+        self._arrays: typing.Optional[typing.Tuple[typing.List[str], "np.ndarray", "np.ndarray", "np.ndarray"]] = None
+
+    @classmethod
+    def from_arrays(
+        cls,
+        names: typing.Sequence[str],
+        name_codes: typing.Any,
+        starts: typing.Any,
+        ends: typing.Any,
+        microseconds_in_unit: int = 1,
+        split_by_day: bool = False,
+    ) -> "ArrayGroupingService":
+        """Arrays (or buffers) of starts and ends are given in units since epoch, codes are positions in names"""
+        service = cls((), split_by_day)
+        service._arrays = (
+            list(names),
+            np.asarray(name_codes, dtype=np.int64),
+            np.asarray(starts, dtype=np.int64) * microseconds_in_unit,
+            np.asarray(ends, dtype=np.int64) * microseconds_in_unit,
+        )
+        return service
+
+    def _get_arrays(self) -> typing.Tuple[typing.List[str], "np.ndarray", "np.ndarray", "np.ndarray"]:
+        if self._arrays is None and isinstance(self._people, PeopleStore):
+            self._arrays = (
+                self._people.names,
+                np.frombuffer(self._people.name_ids, dtype=np.int32).astype(np.int64),
+                np.frombuffer(self._people.starts, dtype=np.int64),
+                np.frombuffer(self._people.ends, dtype=np.int64),
+            )
+        elif self._arrays is None:
+            name_to_code: typing.Dict[str, int] = {}
+            name_codes, starts, ends = array("q"), array("q"), array("q")
+            for person_with_time in self._people:
+                code = name_to_code.get(person_with_time.full_name)
+                if code is None:
+                    code = name_to_code[person_with_time.full_name] = len(name_to_code)
+                name_codes.append(code)
+                starts.append((person_with_time.start - EPOCH) // MICROSECOND)
+                ends.append((person_with_time.end - EPOCH) // MICROSECOND)
+            self._arrays = (
+                list(name_to_code),
+                np.frombuffer(name_codes, dtype=np.int64),
+                np.frombuffer(starts, dtype=np.int64),
+                np.frombuffer(ends, dtype=np.int64),
+            )
+        return self._arrays
+
+    @staticmethod
+    def _sum_by_key(keys: "np.ndarray", durations: "np.ndarray") -> typing.Tuple["np.ndarray", "np.ndarray"]:
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        sums = np.bincount(inverse.ravel(), weights=durations, minlength=len(unique_keys))
+        return unique_keys, sums.astype(np.int64)
+
+    def _days_durations_and_name_codes(self) -> typing.Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        _, name_codes, starts, ends = self._get_arrays()
+        if not self._split_by_day:
+            return (
+                np.floor_divide(starts, MICROSECONDS_IN_DAY),
+                np.floor_divide(ends - starts, MICROSECONDS_IN_SECOND),
+                name_codes,
+            )
+
+        first_days = np.floor_divide(starts, MICROSECONDS_IN_DAY)
+        last_days = np.where(ends > starts, np.floor_divide(ends - 1, MICROSECONDS_IN_DAY), first_days)
+        counts = last_days - first_days + 1
+        positions = np.repeat(np.arange(len(starts)), counts)
+        days = first_days[positions] + np.arange(len(positions)) - np.repeat(np.cumsum(counts) - counts, counts)
+        starts = starts[positions]
+        since_start_to_day_start = np.maximum(days * MICROSECONDS_IN_DAY, starts) - starts
+        since_start_to_day_end = np.minimum((days + 1) * MICROSECONDS_IN_DAY, ends[positions]) - starts
+        durations = np.floor_divide(since_start_to_day_end, MICROSECONDS_IN_SECOND) - np.floor_divide(
+            since_start_to_day_start, MICROSECONDS_IN_SECOND
+        )
+        return days, durations, name_codes[positions]
+
+    def group_people_with_time_by_day(self) -> typing.Dict[dt.date, int]:
+        """People are grouped by day"""
+        days, durations, _ = self._days_durations_and_name_codes()
+        unique_days, sums = self._sum_by_key(days, durations)
+        return {
+            dt.date.fromordinal(EPOCH_ORDINAL + day): duration
+            for day, duration in zip(unique_days.tolist(), sums.tolist())
+        }
+
+    def group_people_with_time_by_person_and_day(self) -> typing.Dict[typing.Tuple[dt.date, str], int]:
+        """People are grouped by full_name from tag and day"""
+        names = self._get_arrays()[0]
+        days, durations, name_codes = self._days_durations_and_name_codes()
+        if not len(days):
+            return {}
+        first_day = int(days.min())
+        unique_keys, sums = self._sum_by_key((days - first_day) * len(names) + name_codes, durations)
+        return {
+            (dt.date.fromordinal(EPOCH_ORDINAL + first_day + key // len(names)), names[key % len(names)]): duration
+            for key, duration in zip(unique_keys.tolist(), sums.tolist())
+        }
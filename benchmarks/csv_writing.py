@@ -0,0 +1,49 @@
+"""
+Compares CSVWriter and FastCSVWriter writing per-employee groupings.
+Usage: python -m benchmarks.csv_writing --rows 1000000
+"""
+
+import datetime as dt
+import io
+import random
+import time
+import typing
+
+import click
+
+from attendance_analyzer.writer import CSVWriter, FastCSVWriter
+
+NAMES = [f"person{i}" for i in range(1000)]
+
+
+def generate_grouping(rows: int) -> typing.Dict[typing.Tuple[dt.date, str], int]:
+    rng = random.Random(0)
+    first_day = dt.date(2011, 1, 1)
+    days = max(1, rows // len(NAMES))
+    return {
+        (first_day + dt.timedelta(days=position // len(NAMES) % days), NAMES[position % len(NAMES)]): rng.randint(
+            0, 3 * 24 * 60 * 60
+        )
+        for position in range(rows)
+    }
+
+
+@click.command()
+@click.option("--rows", "rows_options", type=int, multiple=True, default=[100_000, 1_000_000])
+def main(rows_options: typing.Tuple[int]):
+    for rows in rows_options:
+        grouping = generate_grouping(rows)
+        click.echo(f"{len(grouping):,} rows")
+        outputs = []
+        for writer_class in (CSVWriter, FastCSVWriter):
+            output = io.StringIO()
+            started = time.perf_counter()
+            writer_class(output).write_out_person_and_date_to_duration_in_seconds_mapping(grouping)
+            seconds = time.perf_counter() - started
+            outputs.append(output.getvalue())
+            click.echo(f"  {writer_class.__name__:<20}{len(grouping) / seconds:>15,.0f} rows/sec")
+        click.echo(f"  outputs are {'identical' if outputs[0] == outputs[1] else 'DIFFERENT'}")
+
+
+if __name__ == "__main__":
+    main()
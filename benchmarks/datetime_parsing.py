@@ -0,0 +1,66 @@
+"""
+Compares datetime parsing throughput of strptime and DateTimeParser.
+Usage: python -m benchmarks.datetime_parsing --records 200000
+"""
+import datetime as dt
+import io
+import time
+import typing
+from unittest import mock
+
+import click
+
+from attendance_analyzer import reader
+from attendance_analyzer.helpers import DateTimeParser, parse_datetime
+
+DATETIME_REGEX = "%d-%m-%Y %H:%M:%S"
+
+
+def generate_texts(records: int) -> typing.List[str]:
+    first = dt.datetime(2011, 1, 1, 8, 0, 0)
+    return [(first + dt.timedelta(minutes=17 * i)).strftime(DATETIME_REGEX) for i in range(records)]
+
+
+def generate_xml(texts: typing.List[str]) -> bytes:
+    people = "".join(
+        f'<person full_name="person{i % 100}"><start>{start}</start><end>{start}</end></person>\n'
+        for i, start in enumerate(texts)
+    )
+    return f"<people>\n{people}</people>".encode()
+
+
+def measure(func: typing.Callable[[], typing.Any], records: int) -> float:
+    started = time.perf_counter()
+    func()
+    return records / (time.perf_counter() - started)
+
+
+def strptime_parser(datetime_regex: str) -> typing.Callable[[str], dt.datetime]:
+    return lambda text: parse_datetime(text, datetime_regex)
+
+
+@click.command()
+@click.option("--records", default=200_000, show_default=True)
+def main(records: int):
+    texts = generate_texts(records)
+    xml = generate_xml(texts)
+    parser = DateTimeParser(DATETIME_REGEX)
+
+    def read_attendance():
+        for _ in reader.XMLPeopleReader(io.BytesIO(xml), DATETIME_REGEX).read_attendance():
+            pass
+
+    results = {
+        "parse (strptime)": measure(lambda: [parse_datetime(text, DATETIME_REGEX) for text in texts], records),
+        "parse (DateTimeParser)": measure(lambda: [parser(text) for text in texts], records),
+    }
+    with mock.patch.object(reader, "DateTimeParser", strptime_parser):
+        results["XMLPeopleReader (strptime)"] = measure(read_attendance, records)
+    results["XMLPeopleReader (DateTimeParser)"] = measure(read_attendance, records)
+
+    for name, records_per_second in results.items():
+        click.echo(f"{name:<35}{records_per_second:>15,.0f} records/sec")
+
+
+if __name__ == "__main__":
+    main()
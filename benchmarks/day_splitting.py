@@ -0,0 +1,75 @@
+"""
+Measures the overhead of splitting durations crossing midnight between days.
+Usage: python -m benchmarks.day_splitting --records 1000000 --night-share 0.2
+"""
+
+import datetime as dt
+import random
+import time
+import typing
+
+import click
+
+from attendance_analyzer.helpers import PersonWithTime
+from attendance_analyzer.logic import GroupingService
+from attendance_analyzer.store import PeopleStore
+
+
+def generate_people(records: int, night_share: float, long_share: float) -> typing.List[PersonWithTime]:
+    """Day sessions, night sessions crossing midnight and long ones spanning up to a week"""
+    rng = random.Random(0)
+    first_day = dt.datetime(2011, 1, 1)
+    people = []
+    for i in range(records):
+        day = first_day + dt.timedelta(days=rng.randrange(365))
+        chance = rng.random()
+        if chance < long_share:
+            start = day + dt.timedelta(hours=rng.randrange(24))
+            end = start + dt.timedelta(days=rng.randint(1, 7), seconds=rng.randrange(86400))
+        elif chance < long_share + night_share:
+            start = day + dt.timedelta(hours=20, seconds=rng.randrange(4 * 3600))
+            end = start + dt.timedelta(hours=8)
+        else:
+            start = day + dt.timedelta(hours=8, seconds=rng.randrange(4 * 3600))
+            end = start + dt.timedelta(hours=8)
+        people.append(PersonWithTime(f"person{i % 1000}", start, end))
+    return people
+
+
+def measure(func: typing.Callable[[], typing.Any], records: int) -> float:
+    started = time.perf_counter()
+    func()
+    return records / (time.perf_counter() - started)
+
+
+@click.command()
+@click.option("--records", default=1_000_000, show_default=True)
+@click.option("--night-share", default=0.2, show_default=True, help="Share of sessions crossing midnight.")
+@click.option("--long-share", default=0.01, show_default=True, help="Share of sessions lasting for days.")
+def main(records: int, night_share: float, long_share: float):
+    people = generate_people(records, night_share, long_share)
+    store = PeopleStore(people)
+    results = {}
+    for name, source in (("PersonWithTime", people), ("PeopleStore", store)):
+        for method in ("group_people_with_time_by_day", "group_people_with_time_by_person_and_day"):
+            for split_by_day in (False, True):
+                results[f"{name} {method} split_by_day={split_by_day}"] = measure(
+                    lambda: getattr(GroupingService(source, split_by_day=split_by_day), method)(), records
+                )
+    try:
+        from attendance_analyzer.vectorized import ArrayGroupingService
+
+        for method in ("group_people_with_time_by_day", "group_people_with_time_by_person_and_day"):
+            for split_by_day in (False, True):
+                results[f"numpy {method} split_by_day={split_by_day}"] = measure(
+                    lambda: getattr(ArrayGroupingService(store, split_by_day=split_by_day), method)(), records
+                )
+    except RuntimeError:  # numpy is not installed
+        pass
+
+    for name, records_per_second in results.items():
+        click.echo(f"{name:<80}{records_per_second:>15,.0f} records/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Writes synthetic attendance xml of any size, records are generated and written as they go.
+Every employee has the given number of sessions a day spread over the day, a share of them starts
+before the previous one ends (overlap rate) and a share ends on the next day (midnight rate).
+Files ending with .gz are compressed with gzip.
+Usage: python -m benchmarks.generate_data --employees 1000 --days 365 --sessions 4 --output big.xml
+"""
+
+import datetime as dt
+import gzip
+import itertools
+import random
+import typing
+
+import click
+
+SECONDS_IN_DAY = 24 * 60 * 60
+DATETIME_FORMAT = "%d-%m-%Y %H:%M:%S"
+FIRST_DAY = dt.date(2011, 1, 1)
+RECORDS_IN_BLOCK = 10_000
+
+Record = typing.Tuple[str, dt.datetime, dt.datetime]
+
+
+def generate_records(
+    employees: int,
+    days: int,
+    sessions: int,
+    overlap_rate: float = 0.0,
+    midnight_rate: float = 0.0,
+    seed: int = 0,
+    first_day: dt.date = FIRST_DAY,
+) -> typing.Iterator[Record]:
+    """Records ordered by day and employee, the same arguments give the same records"""
+    rng = random.Random(seed)
+    names = [f"employee{i}" for i in range(employees)]
+    slot = SECONDS_IN_DAY // sessions
+    for day in range(days):
+        midnight = dt.datetime.combine(first_day + dt.timedelta(days=day), dt.time())
+        for name in names:
+            previous_end = None
+            for session in range(sessions):
+                if previous_end is not None and rng.random() < overlap_rate:
+                    start = previous_end - dt.timedelta(seconds=rng.randint(1, slot // 2 or 1))
+                else:
+                    start = midnight + dt.timedelta(seconds=session * slot + rng.randrange(slot // 2 or 1))
+                if rng.random() < midnight_rate:
+                    end = midnight + dt.timedelta(seconds=SECONDS_IN_DAY + rng.randint(1, slot // 2 or 1))
+                else:
+                    end = start + dt.timedelta(seconds=rng.randint(0, slot // 2))
+                previous_end = max(end, previous_end or end)
+                yield name, start, end
+
+
+def write_xml(records: typing.Iterable[Record], output: typing.TextIO) -> int:
+    """:returns number of written records"""
+    output.write('<?xml version="1.0" encoding="UTF-8"?>\n<people>\n')
+    count = 0
+    records = iter(records)
+    for block in iter(lambda: list(itertools.islice(records, RECORDS_IN_BLOCK)), []):
+        output.write(
+            "".join(
+                f'    <person full_name="{name}">'
+                f"<start>{start.strftime(DATETIME_FORMAT)}</start>"
+                f"<end>{end.strftime(DATETIME_FORMAT)}</end></person>\n"
+                for name, start, end in block
+            )
+        )
+        count += len(block)
+    output.write("</people>\n")
+    return count
+
+
+def generate_file(filename: str, *args, **kwargs) -> int:
+    """Writes records of generate_records(*args, **kwargs) to the file, :returns their number"""
+    opener = gzip.open if filename.endswith(".gz") else open
+    with opener(filename, "wt", encoding="utf-8") as output:
+        return write_xml(generate_records(*args, **kwargs), output)
+
+
+@click.command()
+@click.option("--output", "filename", type=click.Path(dir_okay=False), required=True)
+@click.option("--employees", type=click.IntRange(min=1), default=1000)
+@click.option("--days", type=click.IntRange(min=1), default=365)
+@click.option("--sessions", type=click.IntRange(min=1), default=4, help="Sessions of every employee a day.")
+@click.option("--overlap-rate", type=click.FloatRange(0, 1), default=0.05)
+@click.option("--midnight-rate", type=click.FloatRange(0, 1), default=0.01)
+@click.option("--seed", type=int, default=0)
+def main(filename: str, employees: int, days: int, sessions: int, overlap_rate: float, midnight_rate: float, seed: int):
+    records = generate_file(filename, employees, days, sessions, overlap_rate, midnight_rate, seed)
+    click.echo(f"{records:,} records are written to {filename}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares grouping throughput of GroupingService and ArrayGroupingService.
+Usage: python -m benchmarks.grouping_backends --records 1000000 --records 10000000
+"""
+
+import datetime as dt
+import time
+import typing
+
+import click
+import numpy as np
+
+from attendance_analyzer.helpers import EPOCH, PersonWithTime
+from attendance_analyzer.logic import GroupingService
+from attendance_analyzer.vectorized import ArrayGroupingService
+
+NAMES = [f"person{i}" for i in range(1000)]
+FIRST_START = (dt.datetime(2011, 1, 1) - EPOCH) // dt.timedelta(seconds=1)
+
+
+def generate_arrays(records: int) -> typing.Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    rng = np.random.default_rng(0)
+    name_codes = rng.integers(0, len(NAMES), records)
+    starts = FIRST_START + rng.integers(0, 365 * 24 * 60 * 60, records)
+    ends = starts + rng.integers(0, 12 * 60 * 60, records)
+    return name_codes, starts, ends
+
+
+def generate_people(name_codes, starts, ends) -> typing.Iterator[PersonWithTime]:
+    for code, start, end in zip(name_codes.tolist(), starts.tolist(), ends.tolist()):
+        yield PersonWithTime(NAMES[code], EPOCH + dt.timedelta(seconds=start), EPOCH + dt.timedelta(seconds=end))
+
+
+def measure(func: typing.Callable[[], typing.Any], records: int) -> float:
+    started = time.perf_counter()
+    func()
+    return records / (time.perf_counter() - started)
+
+
+@click.command()
+@click.option("--records", "records_options", type=int, multiple=True, default=(1_000_000, 10_000_000))
+def main(records_options: typing.Tuple[int]):
+    for records in records_options:
+        name_codes, starts, ends = generate_arrays(records)
+        # people are generated while grouping not to keep millions of PersonWithTime in memory,
+        # so the first measure is the cost of generation itself
+        results = {
+            "generation of PersonWithTime": measure(
+                lambda: sum(1 for _ in generate_people(name_codes, starts, ends)), records
+            ),
+        }
+        for method in ("group_people_with_time_by_day", "group_people_with_time_by_person_and_day"):
+            results[f"GroupingService.{method}"] = measure(
+                lambda: getattr(GroupingService(generate_people(name_codes, starts, ends)), method)(), records
+            )
+            results[f"ArrayGroupingService.{method} (PersonWithTime)"] = measure(
+                lambda: getattr(ArrayGroupingService(generate_people(name_codes, starts, ends)), method)(), records
+            )
+            results[f"ArrayGroupingService.{method} (arrays)"] = measure(
+                lambda: getattr(
+                    ArrayGroupingService.from_arrays(NAMES, name_codes, starts, ends, microseconds_in_unit=10**6),
+                    method,
+                )(),
+                records,
+            )
+
+        click.echo(f"{records:,} records")
+        for name, records_per_second in results.items():
+            click.echo(f"  {name:<90}{records_per_second:>15,.0f} records/sec")
+
+
+if __name__ == "__main__":
+    main()
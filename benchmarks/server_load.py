@@ -0,0 +1,87 @@
+"""
+Measures latency of the attendance server under concurrent clients keeping their connections alive.
+Start the server first, e.g. python -m attendance_analyzer.server -in resources/test.xml --port 8080
+Usage: python -m benchmarks.server_load --port 8080 --clients 32 --requests 200 \
+    --query "/attendance?group=1" --query "/attendance?person=ivan&start=01-12-2011"
+"""
+
+import asyncio
+import itertools
+import statistics
+import time
+import typing
+
+import click
+
+
+async def open_connection(
+    host: str, port: int, socket_path: typing.Optional[str]
+) -> typing.Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    if socket_path is not None:
+        return await asyncio.open_unix_connection(socket_path)
+    return await asyncio.open_connection(host, port)
+
+
+async def run_client(
+    host: str, port: int, socket_path: typing.Optional[str], queries: typing.Iterator[str], requests: int
+) -> typing.List[float]:
+    stream_reader, stream_writer = await open_connection(host, port, socket_path)
+    latencies = []
+    try:
+        for query in itertools.islice(queries, requests):
+            started = time.perf_counter()
+            stream_writer.write(f"GET {query} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            await stream_writer.drain()
+            status = await stream_reader.readline()
+            if b" 200 " not in status:
+                raise click.ClickException(f"{query} is answered with {status.decode().strip()}")
+            content_length = 0
+            while True:
+                line = await stream_reader.readline()
+                if not line.strip():
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length":
+                    content_length = int(value)
+            await stream_reader.readexactly(content_length)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        stream_writer.close()
+    return latencies
+
+
+async def run_clients(
+    host: str, port: int, socket_path: typing.Optional[str], clients: int, requests: int, queries: typing.List[str]
+) -> typing.Tuple[typing.List[float], float]:
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(
+            # every client walks the queries from its own offset, so the mix of queries is the same at any moment
+            run_client(host, port, socket_path, itertools.islice(itertools.cycle(queries), i, None), requests)
+            for i in range(clients)
+        )
+    )
+    return [latency for latencies in results for latency in latencies], time.perf_counter() - started
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1")
+@click.option("--port", type=int, default=8080)
+@click.option("--socket", "socket_path", help="Unix socket of the server instead of host and port.")
+@click.option("--clients", type=click.IntRange(min=1), default=32, help="Number of concurrent connections.")
+@click.option("--requests", type=click.IntRange(min=1), default=200, help="Number of requests of every client.")
+@click.option("--query", "queries", type=str, multiple=True, default=["/attendance", "/attendance?group=1"])
+def main(
+    host: str, port: int, socket_path: typing.Optional[str], clients: int, requests: int, queries: typing.Tuple[str]
+):
+    latencies, seconds = asyncio.run(run_clients(host, port, socket_path, clients, requests, list(queries)))
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    click.echo(f"{len(latencies):,} requests by {clients} clients in {seconds:.2f} s")
+    click.echo(f"  {'throughput':<12}{len(latencies) / seconds:>12,.0f} requests/sec")
+    for name, latency in (("p50", percentiles[49]), ("p90", percentiles[89]), ("p99", percentiles[98])):
+        click.echo(f"  {name:<12}{latency * 1000:>12.2f} ms")
+    click.echo(f"  {'max':<12}{max(latencies) * 1000:>12.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
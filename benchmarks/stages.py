@@ -0,0 +1,159 @@
+"""
+Times stages of the command for both modes (by day and by employee and day) and writes results as json,
+so they may be compared across commits. Every measurement runs in a fresh process, which runs the pipeline
+up to its stage: seconds of a stage are the difference with the previous one, peak RSS is the one of the process.
+Without --input a file is generated by benchmarks.generate_data with the given parameters.
+Usage: python -m benchmarks.stages --input big.xml --output results.json
+"""
+
+import datetime as dt
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import typing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import click
+
+from attendance_analyzer.logic import GroupingService, PeopleRepository
+from attendance_analyzer.reader import XMLPeopleReader
+from attendance_analyzer.writer import CSVWriter
+
+from .generate_data import generate_file
+
+STAGES = ("parse", "filter", "group", "write")
+MODES = {"by_day": False, "by_person_and_day": True}
+DATETIME_REGEX = "%d-%m-%Y %H:%M:%S"
+
+
+def _peak_rss() -> int:
+    """Peak resident set size of the process in bytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_stage(
+    filename: str, stage: str, group: bool, people_to_filter: typing.Tuple[str, ...]
+) -> typing.Tuple[int, float, int]:
+    """:returns number of records (rows of the grouping from the group stage), seconds up to the stage and peak RSS"""
+    records = 0
+    started = time.perf_counter()
+    if stage == "parse":
+        for _ in XMLPeopleReader(filename, DATETIME_REGEX).read_attendance():
+            records += 1
+        return records, time.perf_counter() - started, _peak_rss()
+
+    people = PeopleRepository(filename, DATETIME_REGEX).get_filtered_people(people_to_filter or None)
+    if stage == "filter":
+        for _ in people:
+            records += 1
+        return records, time.perf_counter() - started, _peak_rss()
+
+    grouping_service = GroupingService(people)
+    if group:
+        grouping = grouping_service.group_people_with_time_by_person_and_day()
+    else:
+        grouping = grouping_service.group_people_with_time_by_day()
+    seconds = time.perf_counter() - started
+    if stage == "group":
+        return len(grouping), seconds, _peak_rss()
+
+    # writing is timed alone over the grouping, so its seconds don't depend on the noise of parsing
+    started = time.perf_counter()
+    with open(os.devnull, "w") as output:
+        if group:
+            CSVWriter(output).write_out_person_and_date_to_duration_in_seconds_mapping(grouping)
+        else:
+            CSVWriter(output).write_out_date_to_duration_in_seconds_mapping(grouping)
+    return len(grouping), seconds + time.perf_counter() - started, _peak_rss()
+
+
+def measure(filename: str, group: bool, people_to_filter: typing.Tuple[str, ...], repeat: int) -> typing.List[dict]:
+    results, previous_seconds, people = [], 0.0, 0
+    size = os.path.getsize(filename)
+    for stage in STAGES:
+        measurements = []
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+                measurements.append(executor.submit(run_stage, filename, stage, group, people_to_filter).result())
+        records, seconds, peak_rss = min(measurements, key=lambda measurement: measurement[1])
+        own_seconds = max(seconds - previous_seconds, 0.0)
+        people = records if stage == "parse" else people
+        # throughput of writing is in rows of the grouping, of the other stages in parsed records
+        processed = records if stage == "write" else people
+        results.append(
+            {
+                "stage": stage,
+                "records": records,
+                "seconds": round(own_seconds, 4),
+                "cumulative_seconds": round(seconds, 4),
+                "records_per_second": round(processed / own_seconds) if own_seconds else None,
+                "megabytes_per_second": round(size / 1024 / 1024 / seconds, 2) if stage != "write" else None,
+                "peak_rss": peak_rss,
+            }
+        )
+        previous_seconds = seconds
+    return results
+
+
+def _commit() -> typing.Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@click.command()
+@click.option("--input", "filename", type=click.Path(exists=True, dir_okay=False), help="Xml file to measure.")
+@click.option("--output", type=click.File("w"), default="-", help="File for json with results.")
+@click.option("--filter-person", "people_to_filter", multiple=True)
+@click.option("--repeat", type=click.IntRange(min=1), default=1, help="Runs of every stage, the fastest one is kept.")
+@click.option("--employees", type=click.IntRange(min=1), default=1000)
+@click.option("--days", type=click.IntRange(min=1), default=30)
+@click.option("--sessions", type=click.IntRange(min=1), default=4)
+@click.option("--overlap-rate", type=click.FloatRange(0, 1), default=0.05)
+@click.option("--midnight-rate", type=click.FloatRange(0, 1), default=0.01)
+def main(
+    filename: typing.Optional[str],
+    output: typing.TextIO,
+    people_to_filter: typing.Tuple[str, ...],
+    repeat: int,
+    employees: int,
+    days: int,
+    sessions: int,
+    overlap_rate: float,
+    midnight_rate: float,
+):
+    with tempfile.TemporaryDirectory() as directory:
+        if filename is None:
+            filename = os.path.join(directory, "generated.xml")
+            generate_file(filename, employees, days, sessions, overlap_rate, midnight_rate)
+            click.echo(f"Generated {filename}", err=True)
+        report = {
+            "commit": _commit(),
+            "created": dt.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "input": {"size": os.path.getsize(filename), "people_to_filter": list(people_to_filter)},
+            "modes": {},
+        }
+        for mode, group in MODES.items():
+            report["modes"][mode] = measure(filename, group, people_to_filter, repeat)
+            for result in report["modes"][mode]:
+                click.echo(
+                    f"{mode:<20}{result['stage']:<8}{result['seconds']:>10.3f} s"
+                    f"{result['peak_rss'] / 1024 / 1024:>10.1f} MB peak RSS",
+                    err=True,
+                )
+    json.dump(report, output, indent=2)
+    output.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Measures startup of the command: wall time of --help and of a run over a small file in fresh interpreters,
+and the slowest imports reported by python -X importtime. Fails when the median time of the small run
+exceeds the budget, so it may guard short runs from cron and scripts against heavy imports.
+The first run is a warm-up writing bytecode caches, so keep PYTHONDONTWRITEBYTECODE unset.
+Usage: python -m benchmarks.startup --runs 20 --budget 150
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+import typing
+
+import click
+
+Command = typing.List[str]
+
+
+def run(command: Command) -> typing.Tuple[float, str]:
+    """:returns seconds of the run and its stderr"""
+    started = time.perf_counter()
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    return time.perf_counter() - started, result.stderr
+
+
+def slowest_imports(importtime: str, top: int) -> typing.List[typing.Tuple[int, int, str]]:
+    """Self and cumulative microseconds with names of the modules which are the slowest to import by themselves"""
+    imports = []
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")  # noqa: E203
+        imports.append((int(self_us), int(cumulative_us), name.strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+def measure(command: Command, runs: int) -> typing.List[float]:
+    run(command)  # warm-up
+    return [run(command)[0] for _ in range(runs)]
+
+
+@click.command()
+@click.option("--runs", type=click.IntRange(min=1), default=20, help="Runs of every command.")
+@click.option("--budget", type=click.FloatRange(min=0), default=150.0, help="Budget in ms for the small run.")
+@click.option("--input", "filename", type=click.Path(exists=True, dir_okay=False), default="resources/test.xml")
+@click.option("--top", type=click.IntRange(min=0), default=10, help="Number of the slowest imports to show.")
+def main(runs: int, budget: float, filename: str, top: int):
+    commands = {
+        "python": [sys.executable, "-c", "pass"],
+        "--help": [sys.executable, "-m", "attendance_analyzer", "--help"],
+        "small run": [sys.executable, "-m", "attendance_analyzer", "-in", filename, "-out", os.devnull],
+    }
+    medians = {}
+    for name, command in commands.items():
+        seconds = measure(command, runs)
+        medians[name] = statistics.median(seconds) * 1000
+        click.echo(f"{name:<12}median {medians[name]:>8.1f} ms, min {min(seconds) * 1000:>8.1f} ms")
+
+    _, importtime = run([sys.executable, "-X", "importtime", *commands["small run"][1:]])
+    click.echo("slowest imports of the small run (self / cumulative):")
+    for self_us, cumulative_us, name in slowest_imports(importtime, top):
+        click.echo(f"  {self_us / 1000:>8.1f} ms {cumulative_us / 1000:>8.1f} ms  {name}")
+
+    if medians["small run"] > budget:
+        raise click.ClickException(f"Small run takes {medians['small run']:.1f} ms, the budget is {budget:.1f} ms.")
+
+
+if __name__ == "__main__":
+    main()